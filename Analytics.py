@@ -0,0 +1,173 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import Solution
+import Utility.DBConnector as Connector
+from Business.Apartment import Apartment
+
+# in-memory reporting over a snapshot of the tables built by Solution.create_tables
+# ReportSnapshot.load() reads Owner, Apartment, OwnedBy, Reservations and Reviews once, in one REPEATABLE READ
+# transaction so they agree, into numpy columns (see ResultSet.to_columns). every report is then answered from
+# memory with the same result as the Solution function of the same name, for all owners, apartments and years
+# at no further round trips. rows are mapped to positions in the sorted owner and apartment ids, and the
+# group-bys are bincounts over those positions
+# results reflect the tables as they were when the snapshot was loaded, load a new one to see later writes
+# counts are exact, so are the profits while the prices are integer valued (their FLOAT sums are exact then). the
+# averages add floats in another order than postgres does, and AVG of the INTEGER ratings is NUMERIC there, so they
+# can differ from the SQL in the last bits, well within 1e-12 relative
+#
+# needs numpy (listed in requirements.txt), Solution doesn't import this module so the API loads without it
+#
+# usage: report = ReportSnapshot.load(); report.reservations_per_owner(); report.profit_per_month(2023)
+
+_SNAPSHOT_QUERIES = {
+    'owners': f"SELECT {Solution.M_O_id} AS id, {Solution.M_O_name} AS name"
+              f" FROM {Solution.M_O_TABLE_NAME} ORDER BY {Solution.M_O_id}",
+    'apartments': f"SELECT {Solution.M_A_id} AS id, {Solution.M_A_address} AS address, {Solution.M_A_city} AS city,"
+                  f" {Solution.M_A_country} AS country, {Solution.M_A_size} AS size"
+                  f" FROM {Solution.M_A_TABLE_NAME} ORDER BY {Solution.M_A_id}",
+    'owned_by': f"SELECT {Solution.M_OwnedBy_owner_id} AS owner_id, {Solution.M_OwnedBy_house_id} AS apartment_id"
+                f" FROM {Solution.M_OwnedBy_TABLE_NAME}",
+    'reservations': f"SELECT {Solution.M_Res_hid} AS apartment_id, {Solution.M_Res_start_date} AS start_date,"
+                    f" {Solution.M_Res_end_date} AS end_date, {Solution.M_Res_total_price} AS total_price"
+                    f" FROM {Solution.M_Res_TABLE_NAME}",
+    'reviews': f"SELECT {Solution.M_Rev_hid} AS apartment_id, {Solution.M_Rev_rating} AS rating"
+               f" FROM {Solution.M_Rev_TABLE_NAME}",
+}
+
+
+def _positions(ids: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    # keys are foreign keys into the sorted ids, so every one of them is found
+    return np.searchsorted(ids, keys)
+
+
+def _mean(total: np.ndarray, count: np.ndarray) -> np.ndarray:
+    # 0 where there is nothing to average, like the COALESCE of the views
+    return np.divide(total, count, out=np.zeros(len(total)), where=count > 0)
+
+
+class ReportSnapshot:
+    # tables - name -> columns, as read by _SNAPSHOT_QUERIES
+    def __init__(self, tables: Dict[str, Dict[str, np.ndarray]]):
+        self.owners = tables['owners']
+        self.apartments = tables['apartments']
+        owner_ids, apartment_ids = self.owners['id'], self.apartments['id']
+        n_owners, n_apartments = len(owner_ids), len(apartment_ids)
+
+        # the owner position of every apartment, -1 when it has no owner
+        owned_by = tables['owned_by']
+        self._owned_owner = _positions(owner_ids, owned_by['owner_id'])
+        self._owned_apartment = _positions(apartment_ids, owned_by['apartment_id'])
+        self._apartment_owner = np.full(n_apartments, -1)
+        self._apartment_owner[self._owned_apartment] = self._owned_owner
+
+        # average rating of every apartment, 0 without reviews
+        reviews = tables['reviews']
+        review_apartment = _positions(apartment_ids, reviews['apartment_id'])
+        self._rating = _mean(np.bincount(review_apartment, weights=reviews['rating'], minlength=n_apartments),
+                             np.bincount(review_apartment, minlength=n_apartments))
+
+        # average price per night of every apartment and its reservation count
+        reservations = tables['reservations']
+        reservation_apartment = _positions(apartment_ids, reservations['apartment_id'])
+        nights = 1 + (reservations['end_date'] - reservations['start_date']).astype(np.int64)
+        self._reservations = np.bincount(reservation_apartment, minlength=n_apartments)
+        self._price_per_night = _mean(np.bincount(reservation_apartment, weights=reservations['total_price'] / nights,
+                                                  minlength=n_apartments), self._reservations)
+
+        # reservations per owner, of the apartments it owns
+        reservation_owner = self._apartment_owner[reservation_apartment]
+        self._owner_reservations = np.bincount(reservation_owner[reservation_owner >= 0], minlength=n_owners)
+
+        # average of the apartment ratings per owner, 0 without apartments
+        self._owner_rating = _mean(np.bincount(self._owned_owner, weights=self._rating[self._owned_apartment],
+                                               minlength=n_owners),
+                                   np.bincount(self._owned_owner, minlength=n_owners))
+
+        # revenue per month of the end date, as months since 1970-01
+        end_month = reservations['end_date'].astype('datetime64[M]').astype(np.int64)
+        self._first_month = int(end_month.min()) if len(end_month) else 0
+        self._revenue = np.bincount(end_month - self._first_month, weights=reservations['total_price'])
+
+    # reads the tables in one REPEATABLE READ transaction, nothing is written
+    @classmethod
+    def load(cls) -> 'ReportSnapshot':
+        conn = Connector.DBConnector()
+        try:
+            conn.begin()
+            conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY", commit=False)
+            tables = {name: conn.execute(query, commit=False)[1].to_columns()
+                      for name, query in _SNAPSHOT_QUERIES.items()}
+            conn.end(commit=False)
+        finally:
+            conn.close()
+        return cls(tables)
+
+    def _owner(self, owner_id: int) -> int:
+        position = int(np.searchsorted(self.owners['id'], owner_id))
+        return position if position < len(self.owners['id']) and self.owners['id'][position] == owner_id else -1
+
+    def _apartment(self, apartment_id: int) -> int:
+        position = int(np.searchsorted(self.apartments['id'], apartment_id))
+        return position if position < len(self.apartments['id']) and self.apartments['id'][position] == apartment_id \
+            else -1
+
+    def _apartment_obj(self, position: int) -> Apartment:
+        columns = self.apartments
+        return Apartment(int(columns['id'][position]), columns['address'][position], columns['city'][position],
+                         columns['country'][position], int(columns['size'][position]))
+
+    # ---------------------------------- reports: ----------------------------------
+
+    # (owner name, reservations of its apartments) of every owner, by owner id
+    def reservations_per_owner(self) -> List[Tuple[str, int]]:
+        return list(zip(self.owners['name'].tolist(), self._owner_reservations.tolist()))
+
+    # (month, profit) of the 12 months of the year, profit is 15% of the revenue of the reservations ending in it
+    def profit_per_month(self, year: int) -> List[Tuple[int, float]]:
+        return [(month, profit) for _, month, profit in self.profit_per_month_range(year, year)]
+
+    def profit_per_month_range(self, start_year: int, end_year: int) -> List[Tuple[int, int, float]]:
+        months = np.arange((start_year - 1970) * 12, (end_year - 1970 + 1) * 12) - self._first_month
+        inside = (months >= 0) & (months < len(self._revenue))
+        revenue = np.zeros(len(months))
+        revenue[inside] = self._revenue[months[inside]]
+        return [(start_year + i // 12, i % 12 + 1, profit) for i, profit in enumerate((revenue * 0.15).tolist())]
+
+    # average rating of the apartment, 0 when it has no reviews or doesn't exist
+    def get_apartment_rating(self, apartment_id: int) -> float:
+        position = self._apartment(apartment_id)
+        return float(self._rating[position]) if position >= 0 else 0
+
+    # average of the ratings of the owner's apartments, an apartment without reviews counts as 0
+    def get_owner_rating(self, owner_id: int) -> float:
+        position = self._owner(owner_id)
+        return float(self._owner_rating[position]) if position >= 0 else 0
+
+    # apartment id -> get_apartment_rating and owner id -> get_owner_rating, of all of them at once
+    def apartment_ratings(self) -> Dict[int, float]:
+        return dict(zip(self.apartments['id'].tolist(), self._rating.tolist()))
+
+    def owner_ratings(self) -> Dict[int, float]:
+        return dict(zip(self.owners['id'].tolist(), self._owner_rating.tolist()))
+
+    # positions and values of the reserved apartments, the value is the rating over the average price per night
+    def _values(self) -> Tuple[np.ndarray, np.ndarray]:
+        reserved = np.flatnonzero(self._reservations > 0)
+        values = self._rating[reserved] / self._price_per_night[reserved]
+        kept = values >= 0
+        return reserved[kept], values[kept]
+
+    # (apartment, value) of every reserved apartment, best first and ties by id
+    def apartment_values(self) -> List[Tuple[Apartment, float]]:
+        reserved, values = self._values()
+        return [(self._apartment_obj(reserved[i]), float(values[i])) for i in np.lexsort((reserved, -values))]
+
+    # the apartment of the best value, ties by id, bad_apartment() when no apartment was reserved
+    def best_value_for_money(self) -> Apartment:
+        reserved, values = self._values()
+        if not len(reserved):
+            return Apartment.bad_apartment()
+        # argmax takes the first of equal values, the lowest id
+        return self._apartment_obj(reserved[int(np.argmax(values))])
@@ -0,0 +1,423 @@
+import functools
+from typing import List, Tuple
+from datetime import date
+
+import Utility.AsyncDBConnector as AsyncConnector
+import Utility.Tracing as Tracing
+from Utility.ReturnValue import ReturnValue
+from Utility.Exceptions import DatabaseException
+
+from Business.Owner import Owner
+from Business.Customer import Customer
+from Business.Apartment import Apartment
+
+import Solution
+from Solution import _Ex, _result_to_owner_obj, _result_to_customer_obj, _result_to_apartment_obj, _profit_per_month
+from Solution import _result_to_owner_objs, _result_to_customer_objs, _result_to_apartment_objs
+from Solution import _owner_row, _apartment_row, _customer_row, _positive, _valid_apartment, _valid_customer, \
+    _valid_reservation, _valid_review, _reservation_statement, _reservation_error, _owners_written, \
+    _apartments_written, _customers_written, _ownership_written, _stays_written
+
+# async version of the Solution API, for callers running on an asyncio event loop
+# every function is a coroutine with the same arguments and the same ReturnValue / Business object results,
+# it runs the same prepared statements as Solution on a connection of the loop's AsyncConnectionPool,
+# so many calls can be in flight on one thread
+# async connections commit every statement on their own, so transaction() and the bulk API are only offered
+# by Solution
+# the checks of the writes and the caches they evict are Solution's, so the cached reads of Solution see the
+# writes made here. reads don't go through the caches
+
+
+# ---------------------------------- private functions: ----------------------------------
+
+
+# like Solution._api, the call goes to the backend of Solution.use_backend when one is in use
+def _api(fn):
+    @functools.wraps(fn)
+    async def dispatch(*args, **kwargs):
+        backend = Solution._backend
+        if backend is not None:
+            return getattr(backend, fn.__name__)(*args, **kwargs)
+        return await fn(*args, **kwargs)
+
+    return Tracing.traced(dispatch)
+
+
+async def _get(query, params=None):
+    try:
+        async with AsyncConnector.AsyncDBConnector() as _conn:
+            _rows_effected, result = await _conn.execute(query, params=params)
+    except (DatabaseException.CHECK_VIOLATION, DatabaseException.NOT_NULL_VIOLATION,
+            DatabaseException.EXCLUSION_VIOLATION):
+        raise _Ex(ReturnValue.BAD_PARAMS)
+    except DatabaseException.UNIQUE_VIOLATION:
+        raise _Ex(ReturnValue.ALREADY_EXISTS)
+    except DatabaseException.FOREIGN_KEY_VIOLATION:
+        raise _Ex(ReturnValue.NOT_EXISTS)
+    except (DatabaseException, DatabaseException.ConnectionInvalid):
+        raise _Ex(ReturnValue.ERROR)
+
+    return _rows_effected, result
+
+
+async def _insert(query, params=None):
+    return await _get(query, params)
+
+
+async def _update(_query, params=None):
+    rows_updated, _ = await _insert(_query, params)
+    if not rows_updated:
+        raise _Ex(ReturnValue.NOT_EXISTS)
+    return rows_updated, _
+
+
+async def _delete(query, params=None):
+    rows_effected, _ = await _get(query, params)
+    if not rows_effected:
+        raise _Ex(ReturnValue.NOT_EXISTS)
+    return rows_effected, _
+
+
+# ---------------------------------- CRUD API: ----------------------------------
+
+
+@_api
+async def add_owner(owner: Owner) -> ReturnValue:
+    try:
+        await _insert(Solution._ADD_OWNER, _owner_row(owner))
+    except _Ex as e:
+        return e.error_code
+    _owners_written(owner.get_owner_id())
+    return ReturnValue.OK
+
+
+@_api
+async def get_owner(owner_id: int) -> Owner:
+    try:
+        rows_effected, result = await _get(Solution._GET_OWNER, (owner_id,))
+    except _Ex as e:
+        return e.error_code
+
+    if not rows_effected:
+        return Owner.bad_owner()
+
+    return _result_to_owner_obj(result)
+
+
+@_api
+async def delete_owner(owner_id: int) -> ReturnValue:
+    if not _positive(owner_id):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        await _delete(Solution._DELETE_OWNER, (owner_id,))
+    except _Ex as e:
+        return e.error_code
+    _owners_written(owner_id, deleted=True)
+    return ReturnValue.OK
+
+
+@_api
+async def add_apartment(apartment: Apartment) -> ReturnValue:
+    if not _valid_apartment(apartment):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        await _insert(Solution._ADD_APARTMENT, _apartment_row(apartment))
+    except _Ex as e:
+        return e.error_code
+    _apartments_written(apartment.get_id())
+    return ReturnValue.OK
+
+
+@_api
+async def get_apartment(apartment_id: int) -> Apartment:
+    try:
+        rows_effected, result = await _get(Solution._GET_APARTMENT, (apartment_id,))
+    except _Ex as e:
+        return Apartment.bad_apartment()
+    if not rows_effected:
+        return Apartment.bad_apartment()
+
+    return _result_to_apartment_obj(result[0])
+
+
+@_api
+async def delete_apartment(apartment_id: int) -> ReturnValue:
+    if not _positive(apartment_id):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        await _delete(Solution._DELETE_APARTMENT, (apartment_id,))
+    except _Ex as e:
+        return e.error_code
+    _apartments_written(apartment_id, deleted=True)
+    return ReturnValue.OK
+
+
+@_api
+async def add_customer(customer: Customer) -> ReturnValue:
+    if not _valid_customer(customer):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        await _insert(Solution._ADD_CUSTOMER, _customer_row(customer))
+    except _Ex as e:
+        return e.error_code
+    _customers_written(customer.get_customer_id())
+    return ReturnValue.OK
+
+
+@_api
+async def get_customer(customer_id: int) -> Customer:
+    try:
+        rows_effected, result = await _get(Solution._GET_CUSTOMER, (customer_id,))
+    except _Ex as e:
+        return e.error_code
+
+    if not rows_effected:
+        return Customer.bad_customer()
+
+    return _result_to_customer_obj(result)
+
+
+@_api
+async def delete_customer(customer_id: int) -> ReturnValue:
+    if not _positive(customer_id):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        await _delete(Solution._DELETE_CUSTOMER, (customer_id,))
+    except _Ex as e:
+        return e.error_code
+    _customers_written(customer_id, deleted=True)
+    return ReturnValue.OK
+
+
+@_api
+async def owner_owns_apartment(owner_id: int, apartment_id: int) -> ReturnValue:
+    if not _positive(owner_id, apartment_id):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        await _insert(Solution._OWNER_OWNS_APARTMENT, (owner_id, apartment_id))
+    except _Ex as e:
+        return e.error_code
+    _ownership_written(apartment_id)
+    return ReturnValue.OK
+
+
+@_api
+async def owner_drops_apartment(owner_id: int, apartment_id: int) -> ReturnValue:
+    if not _positive(owner_id, apartment_id):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        await _delete(Solution._OWNER_DROPS_APARTMENT, (owner_id, apartment_id))
+    except _Ex as e:
+        return e.error_code
+    _ownership_written(apartment_id)
+    return ReturnValue.OK
+
+
+@_api
+async def get_owner_apartments(owner_id: int) -> List[Apartment]:
+    try:
+        rows_effected, result = await _get(Solution._GET_OWNER_APARTMENTS, (owner_id,))
+    except _Ex as e:
+        return e.error_code
+    if not rows_effected:
+        return []
+
+    return _result_to_apartment_objs(result)
+
+
+@_api
+async def get_apartment_owner(apartment_id: int) -> Owner:
+    try:
+        rows_effected, result = await _get(Solution._GET_APARTMENT_OWNER, (apartment_id,))
+    except _Ex as e:
+        return e.error_code
+    if not rows_effected:
+        return Owner.bad_owner()
+
+    return _result_to_owner_obj(result)
+
+
+@_api
+async def customer_made_reservation(customer_id: int, apartment_id: int, start_date: date, end_date: date,
+                                    total_price: float) -> ReturnValue:
+    if not _valid_reservation(customer_id, apartment_id, total_price):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        num_of_rows_changed, _ = await _insert(_reservation_statement(),
+                                               (customer_id, apartment_id, start_date, end_date, total_price))
+        if num_of_rows_changed == 0: return ReturnValue.BAD_PARAMS
+    except _Ex as e:
+        return _reservation_error(e.error_code)
+    _stays_written()
+    return ReturnValue.OK
+
+
+@_api
+async def customer_cancelled_reservation(customer_id: int, apartment_id: int, start_date: date) -> ReturnValue:
+    if not _positive(customer_id, apartment_id):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        await _delete(Solution._CUSTOMER_CANCELLED_RESERVATION, (customer_id, apartment_id, start_date))
+    except _Ex as e:
+        return e.error_code
+    _stays_written()
+    return ReturnValue.OK
+
+
+@_api
+async def customer_reviewed_apartment(customer_id: int, apartment_id: int, review_date: date, rating: int,
+                                      review_text: str) -> ReturnValue:
+    if not _valid_review(customer_id, apartment_id, rating):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        _rows_effected, _ = await _insert(Solution._CUSTOMER_REVIEWED_APARTMENT,
+                                          (customer_id, apartment_id, review_date, rating, review_text))
+    except _Ex as e:
+        return e.error_code
+
+    if not _rows_effected:
+        return ReturnValue.NOT_EXISTS
+
+    _stays_written()
+    return ReturnValue.OK
+
+
+@_api
+async def customer_updated_review(customer_id: int, apartment_id: int, update_date: date, new_rating: int,
+                                  new_text: str) -> ReturnValue:
+    if not _valid_review(customer_id, apartment_id, new_rating):
+        return ReturnValue.BAD_PARAMS
+
+    try:
+        await _update(Solution._CUSTOMER_UPDATED_REVIEW, (customer_id, apartment_id, update_date, new_rating, new_text))
+    except _Ex as e:
+        return e.error_code
+    _stays_written()
+    return ReturnValue.OK
+
+
+@_api
+async def reservations_per_owner() -> List[Tuple[str, int]]:
+    try:
+        rows_effected, result = await _get(Solution._RESERVATIONS_PER_OWNER)
+    except _Ex as e:
+        return e.error_code
+
+    return [(r[Solution.M_C_name], r['res_count']) for r in result]
+
+
+@_api
+async def get_top_customer() -> Customer:
+    try:
+        rows_effected, result = await _get(Solution._GET_TOP_CUSTOMERS, (1,))
+    except _Ex as e:
+        return e.error_code
+
+    return _result_to_customer_obj(result)
+
+
+@_api
+async def get_top_customers(k: int) -> List[Customer]:
+    if k <= 0:
+        return []
+
+    try:
+        rows_effected, result = await _get(Solution._GET_TOP_CUSTOMERS, (k,))
+    except _Ex as e:
+        return e.error_code
+
+    return _result_to_customer_objs(result)
+
+
+@_api
+async def profit_per_month(year: int) -> List[Tuple[int, float]]:
+    try:
+        rows_effected, result = await _get(Solution._MONTHLY_REVENUE, (year, year))
+    except _Ex as e:
+        return e.error_code
+
+    return [(month, profit) for _, month, profit in _profit_per_month(result, year, year)]
+
+
+@_api
+async def profit_per_month_range(start_year: int, end_year: int) -> List[Tuple[int, int, float]]:
+    try:
+        rows_effected, result = await _get(Solution._MONTHLY_REVENUE, (start_year, end_year))
+    except _Ex as e:
+        return e.error_code
+
+    return _profit_per_month(result, start_year, end_year)
+
+
+@_api
+async def get_all_location_owners() -> List[Owner]:
+    try:
+        rows_effected, result = await _get(Solution._GET_ALL_LOCATION_OWNERS)
+    except _Ex as e:
+        return e.error_code
+    return _result_to_owner_objs(result)
+
+
+@_api
+async def best_value_for_money() -> Apartment:
+    try:
+        rows_effected, result = await _get(Solution._BEST_VALUE_FOR_MONEY)
+    except _Ex as e:
+        return e.error_code
+
+    return _result_to_apartment_obj(result[0])
+
+
+@_api
+async def get_apartment_rating(apartment_id: int) -> float:
+    if apartment_id <= 0:
+        return 0
+
+    try:
+        rows_effected, result = await _get(Solution._GET_APARTMENT_RATING, (apartment_id,))
+    except _Ex as e:
+        return e.error_code
+
+    if not rows_effected:
+        return 0
+
+    return result[0]["avg_rating"]
+
+
+@_api
+async def get_owner_rating(owner_id: int) -> float:
+    if owner_id <= 0:
+        return 0
+
+    try:
+        rows_effected, result = await _get(Solution._GET_OWNER_RATING, (owner_id,))
+    except _Ex as e:
+        return e.error_code
+
+    if not rows_effected:
+        return 0
+
+    return result[0]["avg_owner_rating"]
+
+
+# ---------------------------------- ADVANCED API: ----------------------------------
+
+
+@_api
+async def get_apartment_recommendation(customer_id: int) -> List[Tuple[Apartment, float]]:
+    try:
+        rows_effected, result = await _get(Solution._GET_APARTMENT_RECOMMENDATION, (customer_id,))
+    except _Ex as e:
+        return e.error_code
+
+    return [(apartment, float(row[-1])) for apartment, row in zip(_result_to_apartment_objs(result), result.rows)]
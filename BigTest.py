@@ -3,13 +3,20 @@ from Solution import *
 from Utility.ReturnValue import ReturnValue
 from datetime import date, datetime
 import time
+import Tests.Isolation as Isolation
 
 
 class TestCRUD(unittest.TestCase):
+    # drop, truncate or template, see Tests.Isolation
+    isolation = Isolation.DEFAULT_MODE
 
     @classmethod
     def setUpClass(cls):
-        create_tables()
+        Isolation.set_up_class(cls)
+        if cls.isolation == Isolation.DROP:
+            create_tables()
+        else:
+            Isolation.prepare_schema()
 
     # def setUp(self):
     # This method will be called before each test
@@ -617,7 +624,9 @@ class TestCRUD(unittest.TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        drop_tables()
+        if cls.isolation == Isolation.DROP:
+            drop_tables()
+        Isolation.tear_down_class(cls)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,12 @@
-class Apartment:
+from Business.Entity import Entity
+
+
+class Apartment(Entity):
+    __slots__ = ('__id', '__address', '__city', '__country', '__size')
+    _COLUMNS = 5
+
     def __init__(self, id: int=None, address: str=None, city: str=None, country: str=None, size: float=None) -> None:
+        super().__init__()
         self.__id = id
         self.__address = address
         self.__city = city
@@ -10,39 +17,44 @@ class Apartment:
         return self.__id
         
     def set_id(self, id):
+        self._check_mutable()
         self.__id = id
 
     def get_address(self):
         return self.__address
     
     def set_address(self, address):
+        self._check_mutable()
         self.__address = address
 
     def get_city(self):
         return self.__city
     
     def set_city(self, city):
+        self._check_mutable()
         self.__city = city
 
     def get_country(self):
         return self.__country
     
     def set_country(self, country):
+        self._check_mutable()
         self.__country = country
 
     def get_size(self):
         return self.__size
 
     def set_size(self, size):
+        self._check_mutable()
         self.__size = size
 
     @staticmethod
     def bad_apartment():
         return Apartment()
 
-    def __eq__(self, __value: object) -> bool:
-        if type(self) != type(__value): return False
-        else: return self.__id == __value.__id and self.__address == __value.__address and self.__city == __value.__city and self.__country == __value.__country
+    # size is not compared
+    def _key(self) -> tuple:
+        return self.__id, self.__address, self.__city, self.__country
 
     def __str__(self) -> str:
-        return f'apartment_id={self.__id}, address={self.__address}, city={self.__city}, country={self.__country}'
\ No newline at end of file
+        return f'apartment_id={self.__id}, address={self.__address}, city={self.__city}, country={self.__country}'
@@ -1,5 +1,12 @@
-class Customer:
+from Business.Entity import Entity
+
+
+class Customer(Entity):
+    __slots__ = ('__id', '__name')
+    _COLUMNS = 2
+
     def __init__(self, customer_id: int=None, customer_name: str=None) -> None:
+        super().__init__()
         self.__id = customer_id
         self.__name = customer_name
 
@@ -7,21 +14,22 @@ class Customer:
         return self.__id
     
     def set_customer_id(self, id):
+        self._check_mutable()
         self.__id = id
     
     def get_customer_name(self):
         return self.__name
     
     def set_customer_name(self, name):
+        self._check_mutable()
         self.__name = name
 
     @staticmethod
     def bad_customer():
         return Customer()
 
-    def __eq__(self, __value: object) -> bool:
-        if type(self) != type(__value): return False
-        else: return self.__id == __value.__id and self.__name == __value.__name
+    def _key(self) -> tuple:
+        return self.__id, self.__name
 
     def __str__(self) -> str:
-        return f'customer_id={self.__id}, customer_name={self.__name}'
\ No newline at end of file
+        return f'customer_id={self.__id}, customer_name={self.__name}'
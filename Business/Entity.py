@@ -0,0 +1,46 @@
+from typing import Iterable, List
+
+
+class Entity:
+    # base of the Business objects: no per instance __dict__, equality by the fields of _key(), freeze() to make
+    # the setters raise and from_rows to build many objects at once
+    # only a frozen object is hashable, a mutable one could change its fields while it is in a set or keys a dict
+    # _COLUMNS - how many constructor arguments from_rows takes from the front of a row
+    __slots__ = ('_frozen',)
+    _COLUMNS = 0
+
+    def __init__(self) -> None:
+        self._frozen = False
+
+    # many objects from row tuples, columns past _COLUMNS are ignored
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple], frozen: bool=False) -> List['Entity']:
+        columns = cls._COLUMNS
+        objects = [cls(*row[:columns]) for row in rows]
+        if frozen:
+            for obj in objects:
+                obj._frozen = True
+        return objects
+
+    def freeze(self) -> 'Entity':
+        self._frozen = True
+        return self
+
+    def is_frozen(self) -> bool:
+        return self._frozen
+
+    def _check_mutable(self):
+        if self._frozen:
+            raise AttributeError(f'{type(self).__name__.lower()} is frozen')
+
+    # the fields __eq__ compares and __hash__ hashes
+    def _key(self) -> tuple:
+        raise NotImplementedError
+
+    def __eq__(self, __value: object) -> bool:
+        return type(self) == type(__value) and self._key() == __value._key()
+
+    def __hash__(self) -> int:
+        if not self._frozen:
+            raise TypeError(f'unhashable {type(self).__name__}, freeze() it first')
+        return hash(self._key())
@@ -1,5 +1,12 @@
-class Owner:
+from Business.Entity import Entity
+
+
+class Owner(Entity):
+    __slots__ = ('__id', '__name')
+    _COLUMNS = 2
+
     def __init__(self, owner_id: int=None, owner_name: str=None) -> None:
+        super().__init__()
         self.__id = owner_id
         self.__name = owner_name
 
@@ -7,21 +14,22 @@ class Owner:
         return self.__id
     
     def set_owner_id(self, id):
+        self._check_mutable()
         self.__id = id
     
     def get_owner_name(self):
         return self.__name
     
     def set_owner_name(self, name):
+        self._check_mutable()
         self.__name = name
 
     @staticmethod
     def bad_owner():
         return Owner()
 
-    def __eq__(self, __value: object) -> bool:
-        if type(self) != type(__value): return False
-        else: return self.__id == __value.__id and self.__name == __value.__name
+    def _key(self) -> tuple:
+        return self.__id, self.__name
 
     def __str__(self) -> str:
-        return f'owner_id={self.__id}, owner_name={self.__name}'
\ No newline at end of file
+        return f'owner_id={self.__id}, owner_name={self.__name}'
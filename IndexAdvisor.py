@@ -0,0 +1,159 @@
+import argparse
+import json
+import random
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import List
+
+import Solution
+import Utility.DBConnector as Connector
+import Utility.PreparedStatements as Statements
+
+# index advisor for the schema built by Solution.create_tables
+# fills the tables with generated data, then EXPLAINs every registered statement and looks for sequential scans
+# with a filter. for each one it creates an index on the filtered columns inside a transaction, EXPLAINs again
+# and reports the index if the scan is gone. the transaction is rolled back, nothing is left behind
+#
+# WARNING: it drops and recreates the tables of the database configured in Utility/database.ini
+#
+# usage: python IndexAdvisor.py [--scale N] [--keep]
+
+Finding = namedtuple('Finding', ['statement', 'relation', 'filter', 'columns', 'index'])
+
+# parameters used to EXPLAIN a statement, by postgres type, unless the statement has its own below
+SAMPLE_VALUES = {
+    'INTEGER': 1,
+    'TEXT': 'advisor',
+    'DATE': date(2023, 6, 1),
+    'FLOAT': 100.0,
+}
+SAMPLE_PARAMS = {
+    'monthly_revenue': (2023, 2023),
+}
+
+_IDENTIFIER = re.compile(r'[a-z_][a-z0-9_]*')
+
+
+# rows generated per scale unit: 200 owners, 1000 apartments and customers, 5000 reservations, ~2500 reviews
+def populate(scale: int = 1, seed: int = 0):
+    rng = random.Random(seed)
+    n_owners, n_apartments, n_customers = 200 * scale, 1000 * scale, 1000 * scale
+    cities = [(f'city{c}', f'country{c % 10}') for c in range(50)]
+
+    Solution.add_owners([(i, f'owner{i}') for i in range(1, n_owners + 1)])
+    Solution.add_customers([(i, f'customer{i}') for i in range(1, n_customers + 1)])
+    Solution.add_apartments([(i, f'street {i}', *rng.choice(cities), rng.randint(20, 200))
+                             for i in range(1, n_apartments + 1)])
+
+    conn = Connector.DBConnector()
+    try:
+        conn.execute_values(f"INSERT INTO {Solution.M_OwnedBy_TABLE_NAME}"
+                            f"({Solution.M_OwnedBy_owner_id}, {Solution.M_OwnedBy_house_id}) VALUES %s",
+                            [(rng.randint(1, n_owners), i) for i in range(1, n_apartments + 1)])
+    finally:
+        conn.close()
+
+    reservations, reviews = [], {}
+    for hid in range(1, n_apartments + 1):
+        for k in range(5):
+            start = date(2023, 1, 1) + timedelta(days=k * 70 + rng.randint(0, 30))
+            end = start + timedelta(days=rng.randint(1, 7))
+            cid = rng.randint(1, n_customers)
+            reservations.append((cid, hid, start, end, float(rng.randint(100, 2000))))
+            if rng.random() < 0.5:
+                reviews[cid, hid] = (cid, hid, end + timedelta(days=1), rng.randint(1, 10), 'review')
+    Solution.add_reservations(reservations)
+    Solution.add_reviews(list(reviews.values()))
+
+    conn = Connector.DBConnector()
+    try:
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def _explain(conn: Connector.DBConnector, statement: Statements.Statement, params) -> dict:
+    _, result = conn.execute(f"EXPLAIN (FORMAT JSON) {statement.literal_query}",
+                             params=statement.literal_params(params), commit=False)
+    plan = result[0]['QUERY PLAN']
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+
+
+# (relation, filter) of every sequential scan with a filter in the plan
+def _seq_scans(plan: dict) -> List[tuple]:
+    scans = []
+    if plan['Node Type'] == 'Seq Scan' and 'Filter' in plan:
+        scans.append((plan['Relation Name'], plan['Filter']))
+    for child in plan.get('Plans', []):
+        scans += _seq_scans(child)
+    return scans
+
+
+def _columns(conn: Connector.DBConnector, relation: str) -> List[str]:
+    _, result = conn.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s "
+                             "ORDER BY ordinal_position", params=(relation,), commit=False)
+    return result['column_name']
+
+
+# columns of relation the filter compares, in the order they appear
+def _filter_columns(filter_text: str, columns: List[str]) -> List[str]:
+    found = []
+    for word in _IDENTIFIER.findall(filter_text.lower()):
+        if word in columns and word not in found:
+            found.append(word)
+    return found
+
+
+def _sample_params(statement: Statements.Statement) -> tuple:
+    if statement.name in SAMPLE_PARAMS:
+        return SAMPLE_PARAMS[statement.name]
+    return tuple(SAMPLE_VALUES[t] for t in statement.types)
+
+
+# EXPLAINs every registered statement and returns the sequential scans an index removes
+def advise() -> List[Finding]:
+    findings = []
+    conn = Connector.DBConnector(pooled=False)
+    try:
+        for statement in Statements.statements().values():
+            params = _sample_params(statement)
+            for relation, filter_text in _seq_scans(_explain(conn, statement, params)):
+                columns = _filter_columns(filter_text, _columns(conn, relation))
+                if not columns:
+                    continue
+                index = f"CREATE INDEX ON {relation} ({', '.join(columns)})"
+                conn.execute(index, commit=False)
+                removed = relation not in [r for r, _ in _seq_scans(_explain(conn, statement, params))]
+                conn.rollback()
+                if removed:
+                    findings.append(Finding(statement.name, relation, filter_text, tuple(columns), index))
+    finally:
+        conn.rollback()
+        conn.close()
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report sequential scans of the Solution queries that an index "
+                                                 "would remove. Drops and recreates the tables of the database.")
+    parser.add_argument('--scale', type=int, default=1, help="data size multiplier (1000 apartments per unit)")
+    parser.add_argument('--keep', action='store_true', help="keep the generated data")
+    args = parser.parse_args()
+
+    Solution.drop_tables()
+    Solution.create_tables()
+    try:
+        populate(args.scale)
+        findings = advise()
+    finally:
+        if not args.keep:
+            Solution.drop_tables()
+
+    for f in findings:
+        print(f"{f.statement}: Seq Scan on {f.relation} (Filter: {f.filter})\n    -> {f.index}")
+    print(f"{len(Statements.statements())} statements checked, {len(findings)} sequential scans an index removes")
+
+
+if __name__ == '__main__':
+    main()
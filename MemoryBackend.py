@@ -0,0 +1,572 @@
+import copy
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+
+from Business.Owner import Owner
+from Business.Customer import Customer
+from Business.Apartment import Apartment
+
+# in-process backend of the Solution API, for tests and local runs without postgres (see Solution.use_backend)
+# a MemoryBackend has a method for every API function with the same arguments, ReturnValues and Business objects
+# it keeps the tables of Solution.create_tables in dicts by primary key, with indexes by the foreign keys, and
+# enforces the same constraints in the order postgres checks them: the python checks of the API function,
+# then NOT NULL, CHECK, primary key / UNIQUE and last the foreign keys. deletes cascade like the schema does
+# rows are kept in insertion order (an updated review moves to the end, like its new tuple), so results that
+# postgres returns in heap order and float averages summed in that order come out the same
+# differences: ratings are floats where postgres returns numeric (equal values), and the calls that raise on an
+# empty result with postgres (get_top_customer, best_value_for_money) return bad_customer() / bad_apartment()
+# every call holds the lock of the backend, transaction() holds it until the block ends
+
+# a stay of an apartment in the reservations, by its primary key
+_Stay = namedtuple('_Stay', ['apartment_id', 'start_date', 'end_date'])
+_Column = namedtuple('_Column', ['name', 'type_code'])
+
+_RESERVATION_COLUMNS = [_Column('customer_id', 23), _Column('apartment_id', 23), _Column('start_date', 1082),
+                        _Column('end_date', 1082), _Column('total_price', 701)]
+_REVIEW_COLUMNS = [_Column('customer_id', 23), _Column('apartment_id', 23), _Column('review_date', 1082),
+                   _Column('rating', 23), _Column('review_text', 25)]
+
+
+class _Violation(Exception):
+    def __init__(self, value: ReturnValue):
+        self.error_code = value
+
+
+def _positive(*values) -> bool:
+    return all(v is not None and v > 0 for v in values)
+
+
+# ($1, $2) OVERLAPS ($3, $4) of postgres, the ends of each period are sorted first
+def _overlaps(start1: date, end1: date, start2: date, end2: date) -> bool:
+    start1, end1 = min(start1, end1), max(start1, end1)
+    start2, end2 = min(start2, end2), max(start2, end2)
+    if start1 > start2:
+        return start1 < end2
+    if start1 < start2:
+        return start2 < end1
+    return True
+
+
+class _Tables:
+    def __init__(self):
+        self.owners: Dict[int, str] = {}
+        # id -> (address, city, country, size), and (city, address) -> id for the UNIQUE constraint
+        self.apartments: Dict[int, tuple] = {}
+        self.addresses: Dict[tuple, int] = {}
+        self.customers: Dict[int, str] = {}
+        # apartment_id -> owner_id, and owner_id -> its apartment ids in insertion order
+        self.owned_by: Dict[int, int] = {}
+        self.owner_apartments: Dict[int, Dict[int, None]] = {}
+        # _Stay -> (customer_id, total_price), and the stays by apartment and by customer
+        self.reservations: Dict[_Stay, tuple] = {}
+        self.apartment_stays: Dict[int, Dict[_Stay, None]] = {}
+        self.customer_stays: Dict[int, Dict[_Stay, None]] = {}
+        # (customer_id, apartment_id) -> (review_date, rating, review_text), and the reviews by apartment and by
+        # customer
+        self.reviews: Dict[tuple, tuple] = {}
+        self.apartment_reviews: Dict[int, Dict[int, None]] = {}
+        self.customer_reviews: Dict[int, Dict[int, None]] = {}
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tables = _Tables()
+
+    # ---------------------------------- private functions: ----------------------------------
+
+    def _owner_obj(self, owner_id: int) -> Owner:
+        return Owner(owner_id, self._tables.owners[owner_id])
+
+    def _customer_obj(self, customer_id: int) -> Customer:
+        return Customer(customer_id, self._tables.customers[customer_id])
+
+    def _apartment_obj(self, apartment_id: int) -> Apartment:
+        return Apartment(apartment_id, *self._tables.apartments[apartment_id])
+
+    def _insert_owner(self, owner_id: int, name: str):
+        t = self._tables
+        if owner_id is None or name is None:
+            raise _Violation(ReturnValue.BAD_PARAMS)
+        if owner_id <= 0:
+            raise _Violation(ReturnValue.BAD_PARAMS)
+        if owner_id in t.owners:
+            raise _Violation(ReturnValue.ALREADY_EXISTS)
+        t.owners[owner_id] = name
+
+    def _insert_apartment(self, apartment_id: int, address: str, city: str, country: str, size: int):
+        t = self._tables
+        if None in (apartment_id, address, city, country, size):
+            raise _Violation(ReturnValue.BAD_PARAMS)
+        if apartment_id <= 0:
+            raise _Violation(ReturnValue.BAD_PARAMS)
+        if apartment_id in t.apartments or (city, address) in t.addresses:
+            raise _Violation(ReturnValue.ALREADY_EXISTS)
+        t.apartments[apartment_id] = (address, city, country, size)
+        t.addresses[(city, address)] = apartment_id
+
+    def _insert_customer(self, customer_id: int, name: str):
+        t = self._tables
+        if customer_id is None or name is None:
+            raise _Violation(ReturnValue.BAD_PARAMS)
+        if customer_id <= 0:
+            raise _Violation(ReturnValue.BAD_PARAMS)
+        if customer_id in t.customers:
+            raise _Violation(ReturnValue.ALREADY_EXISTS)
+        t.customers[customer_id] = name
+
+    # the stay is not inserted when it overlaps another stay of the apartment, NOT_EXISTS is the missing FK
+    def _insert_reservation(self, customer_id: int, apartment_id: int, start_date: date, end_date: date,
+                            total_price: float) -> bool:
+        t = self._tables
+        if start_date is not None and end_date is not None:
+            for stay in t.apartment_stays.get(apartment_id, ()):
+                if _overlaps(start_date, end_date, stay.start_date, stay.end_date):
+                    return False
+        if None in (customer_id, apartment_id, start_date, end_date, total_price):
+            raise _Violation(ReturnValue.BAD_PARAMS)
+        stay = _Stay(apartment_id, start_date, end_date)
+        if stay in t.reservations:
+            raise _Violation(ReturnValue.ALREADY_EXISTS)
+        if customer_id not in t.customers or apartment_id not in t.apartments:
+            raise _Violation(ReturnValue.NOT_EXISTS)
+        t.reservations[stay] = (customer_id, float(total_price))
+        t.apartment_stays.setdefault(apartment_id, {})[stay] = None
+        t.customer_stays.setdefault(customer_id, {})[stay] = None
+        return True
+
+    # the review is not inserted without a stay of the customer in the apartment that ended by the review date
+    def _insert_review(self, customer_id: int, apartment_id: int, review_date: date, rating: int,
+                       review_text: str) -> bool:
+        t = self._tables
+        if review_date is None or not any(
+                stay.apartment_id == apartment_id and stay.end_date <= review_date
+                for stay in t.customer_stays.get(customer_id, ())):
+            return False
+        if None in (rating, review_text):
+            raise _Violation(ReturnValue.BAD_PARAMS)
+        if (customer_id, apartment_id) in t.reviews:
+            raise _Violation(ReturnValue.ALREADY_EXISTS)
+        self._put_review(customer_id, apartment_id, review_date, rating, review_text)
+        return True
+
+    def _put_review(self, customer_id: int, apartment_id: int, review_date: date, rating: int, review_text: str):
+        t = self._tables
+        t.reviews[(customer_id, apartment_id)] = (review_date, rating, review_text)
+        t.apartment_reviews.setdefault(apartment_id, {})[customer_id] = None
+        t.customer_reviews.setdefault(customer_id, {})[apartment_id] = None
+
+    def _remove_review(self, customer_id: int, apartment_id: int):
+        t = self._tables
+        del t.reviews[(customer_id, apartment_id)]
+        _discard(t.apartment_reviews, apartment_id, customer_id)
+        _discard(t.customer_reviews, customer_id, apartment_id)
+
+    def _remove_reservation(self, stay: _Stay):
+        t = self._tables
+        customer_id, _ = t.reservations.pop(stay)
+        _discard(t.apartment_stays, stay.apartment_id, stay)
+        _discard(t.customer_stays, customer_id, stay)
+
+    def _remove_ownership(self, apartment_id: int):
+        t = self._tables
+        owner_id = t.owned_by.pop(apartment_id)
+        _discard(t.owner_apartments, owner_id, apartment_id)
+
+    # runs a single row write, its ReturnValue
+    def _write(self, insert, *row) -> ReturnValue:
+        try:
+            insert(*row)
+        except _Violation as e:
+            return e.error_code
+        return ReturnValue.OK
+
+    # ---------------------------------- derived values: ----------------------------------
+
+    # average rating of the apartment, 0 without reviews (ViewAptRating)
+    def _rating(self, apartment_id: int) -> float:
+        t = self._tables
+        ratings = [t.reviews[(customer_id, apartment_id)][1] for customer_id in t.apartment_reviews.get(apartment_id, ())]
+        return sum(ratings) / len(ratings) if ratings else 0
+
+    # (apartment_id, value) of every reserved apartment, best first and ties by id (ViewAptValue)
+    def _values(self) -> List[Tuple[int, float]]:
+        t = self._tables
+        values = []
+        for apartment_id, stays in t.apartment_stays.items():
+            nightly = [t.reservations[stay][1] / (1 + (stay.end_date - stay.start_date).days) for stay in stays]
+            value = self._rating(apartment_id) / (sum(nightly) / len(nightly))
+            if value >= 0:
+                values.append((apartment_id, value))
+        values.sort(key=lambda v: (-v[1], v[0]))
+        return values
+
+    # customer_id -> reservation count, of the customers with any
+    def _reservation_counts(self) -> Dict[int, int]:
+        return {customer_id: len(stays) for customer_id, stays in self._tables.customer_stays.items()}
+
+    # ---------------------------------- transactions: ----------------------------------
+
+    # the calls of the block see each other's writes, they are undone together if it raises
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            saved = copy.deepcopy(self._tables)
+            try:
+                yield
+            except BaseException:
+                self._tables = saved
+                raise
+
+    # ---------------------------------- CRUD API: ----------------------------------
+
+    def add_owner(self, owner: Owner) -> ReturnValue:
+        with self._lock:
+            return self._write(self._insert_owner, owner.get_owner_id(), owner.get_owner_name())
+
+    def get_owner(self, owner_id: int) -> Owner:
+        with self._lock:
+            return self._owner_obj(owner_id) if owner_id in self._tables.owners else Owner.bad_owner()
+
+    def delete_owner(self, owner_id: int) -> ReturnValue:
+        if not _positive(owner_id):
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            t = self._tables
+            if owner_id not in t.owners:
+                return ReturnValue.NOT_EXISTS
+            for apartment_id in list(t.owner_apartments.get(owner_id, ())):
+                self._remove_ownership(apartment_id)
+            del t.owners[owner_id]
+            return ReturnValue.OK
+
+    def add_apartment(self, apartment: Apartment) -> ReturnValue:
+        if not _positive(apartment.get_id(), apartment.get_size()):
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            return self._write(self._insert_apartment, apartment.get_id(), apartment.get_address(),
+                               apartment.get_city(), apartment.get_country(), apartment.get_size())
+
+    def get_apartment(self, apartment_id: int) -> Apartment:
+        with self._lock:
+            return self._apartment_obj(apartment_id) if apartment_id in self._tables.apartments \
+                else Apartment.bad_apartment()
+
+    def delete_apartment(self, apartment_id: int) -> ReturnValue:
+        if not _positive(apartment_id):
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            t = self._tables
+            if apartment_id not in t.apartments:
+                return ReturnValue.NOT_EXISTS
+            if apartment_id in t.owned_by:
+                self._remove_ownership(apartment_id)
+            for stay in list(t.apartment_stays.get(apartment_id, ())):
+                self._remove_reservation(stay)
+            for customer_id in list(t.apartment_reviews.get(apartment_id, ())):
+                self._remove_review(customer_id, apartment_id)
+            address, city, _, _ = t.apartments.pop(apartment_id)
+            del t.addresses[(city, address)]
+            return ReturnValue.OK
+
+    def add_customer(self, customer: Customer) -> ReturnValue:
+        if not _positive(customer.get_customer_id()):
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            return self._write(self._insert_customer, customer.get_customer_id(), customer.get_customer_name())
+
+    def get_customer(self, customer_id: int) -> Customer:
+        with self._lock:
+            return self._customer_obj(customer_id) if customer_id in self._tables.customers \
+                else Customer.bad_customer()
+
+    def delete_customer(self, customer_id: int) -> ReturnValue:
+        if not _positive(customer_id):
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            t = self._tables
+            if customer_id not in t.customers:
+                return ReturnValue.NOT_EXISTS
+            for stay in list(t.customer_stays.get(customer_id, ())):
+                self._remove_reservation(stay)
+            for apartment_id in list(t.customer_reviews.get(customer_id, ())):
+                self._remove_review(customer_id, apartment_id)
+            del t.customers[customer_id]
+            return ReturnValue.OK
+
+    def owner_owns_apartment(self, owner_id: int, apartment_id: int) -> ReturnValue:
+        if not _positive(owner_id, apartment_id):
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            t = self._tables
+            if apartment_id in t.owned_by:
+                return ReturnValue.ALREADY_EXISTS
+            if owner_id not in t.owners or apartment_id not in t.apartments:
+                return ReturnValue.NOT_EXISTS
+            t.owned_by[apartment_id] = owner_id
+            t.owner_apartments.setdefault(owner_id, {})[apartment_id] = None
+            return ReturnValue.OK
+
+    def owner_drops_apartment(self, owner_id: int, apartment_id: int) -> ReturnValue:
+        if not _positive(owner_id, apartment_id):
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            if self._tables.owned_by.get(apartment_id) != owner_id:
+                return ReturnValue.NOT_EXISTS
+            self._remove_ownership(apartment_id)
+            return ReturnValue.OK
+
+    def get_owner_apartments(self, owner_id: int) -> List[Apartment]:
+        with self._lock:
+            return [self._apartment_obj(apartment_id)
+                    for apartment_id in self._tables.owner_apartments.get(owner_id, ())]
+
+    def get_apartment_owner(self, apartment_id: int) -> Owner:
+        with self._lock:
+            owner_id = self._tables.owned_by.get(apartment_id)
+            return self._owner_obj(owner_id) if owner_id is not None else Owner.bad_owner()
+
+    def customer_made_reservation(self, customer_id: int, apartment_id: int, start_date: date, end_date: date,
+                                  total_price: float) -> ReturnValue:
+        if not _positive(customer_id, apartment_id, total_price):
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            try:
+                if not self._insert_reservation(customer_id, apartment_id, start_date, end_date, total_price):
+                    return ReturnValue.BAD_PARAMS
+            except _Violation as e:
+                return e.error_code
+            return ReturnValue.OK
+
+    def customer_cancelled_reservation(self, customer_id: int, apartment_id: int, start_date: date) -> ReturnValue:
+        if not _positive(customer_id, apartment_id):
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            t = self._tables
+            stays = [stay for stay in t.customer_stays.get(customer_id, ())
+                     if stay.apartment_id == apartment_id and stay.start_date == start_date]
+            if not stays:
+                return ReturnValue.NOT_EXISTS
+            for stay in stays:
+                self._remove_reservation(stay)
+            return ReturnValue.OK
+
+    def customer_reviewed_apartment(self, customer_id: int, apartment_id: int, review_date: date, rating: int,
+                                    review_text: str) -> ReturnValue:
+        if not _positive(customer_id, apartment_id) or rating is None or not 1 <= rating <= 10:
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            try:
+                if not self._insert_review(customer_id, apartment_id, review_date, rating, review_text):
+                    return ReturnValue.NOT_EXISTS
+            except _Violation as e:
+                return e.error_code
+            return ReturnValue.OK
+
+    def customer_updated_review(self, customer_id: int, apartment_id: int, update_date: date, new_rating: int,
+                                new_text: str) -> ReturnValue:
+        if not _positive(customer_id, apartment_id) or new_rating is None or not 1 <= new_rating <= 10:
+            return ReturnValue.BAD_PARAMS
+        with self._lock:
+            review = self._tables.reviews.get((customer_id, apartment_id))
+            if review is None or update_date is None or not review[0] <= update_date:
+                return ReturnValue.NOT_EXISTS
+            if new_text is None:
+                return ReturnValue.BAD_PARAMS
+            self._remove_review(customer_id, apartment_id)
+            self._put_review(customer_id, apartment_id, update_date, new_rating, new_text)
+            return ReturnValue.OK
+
+    # ---------------------------------- BASIC API: ----------------------------------
+
+    def reservations_per_owner(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            t = self._tables
+            return [(name, sum(len(t.apartment_stays.get(apartment_id, ()))
+                               for apartment_id in t.owner_apartments.get(owner_id, ())))
+                    for owner_id, name in t.owners.items()]
+
+    def get_top_customer(self) -> Customer:
+        top = self.get_top_customers(1)
+        return top[0] if top else Customer.bad_customer()
+
+    def get_top_customers(self, k: int) -> List[Customer]:
+        if k <= 0:
+            return []
+        with self._lock:
+            counts = self._reservation_counts()
+            return [self._customer_obj(customer_id)
+                    for customer_id in sorted(counts, key=lambda c: (-counts[c], c))[:k]]
+
+    def profit_per_month(self, year: int) -> List[Tuple[int, float]]:
+        return [(month, profit) for _, month, profit in self.profit_per_month_range(year, year)]
+
+    def profit_per_month_range(self, start_year: int, end_year: int) -> List[Tuple[int, int, float]]:
+        with self._lock:
+            revenue = {}
+            for stay, (_, total_price) in self._tables.reservations.items():
+                month = (stay.end_date.year, stay.end_date.month)
+                revenue[month] = revenue.get(month, 0) + total_price
+        return [(year, month, revenue.get((year, month), 0) * 0.15)
+                for year in range(start_year, end_year + 1) for month in range(1, 13)]
+
+    def get_all_location_owners(self) -> List[Owner]:
+        with self._lock:
+            t = self._tables
+            locations = {(city, country) for _, city, country, _ in t.apartments.values()}
+            if not locations:
+                return []
+            return [self._owner_obj(owner_id) for owner_id in sorted(t.owner_apartments)
+                    if len({t.apartments[apartment_id][1:3]
+                            for apartment_id in t.owner_apartments[owner_id]}) == len(locations)]
+
+    def best_value_for_money(self) -> Apartment:
+        with self._lock:
+            values = self._values()
+            return self._apartment_obj(values[0][0]) if values else Apartment.bad_apartment()
+
+    def best_value_apartments(self, k: int, city: str = None, country: str = None) -> List[Tuple[Apartment, float]]:
+        if k <= 0:
+            return []
+        with self._lock:
+            best = []
+            for apartment_id, value in self._values():
+                apartment = self._apartment_obj(apartment_id)
+                if (city is None or apartment.get_city() == city) and \
+                        (country is None or apartment.get_country() == country):
+                    best.append((apartment, value))
+                    if len(best) == k:
+                        break
+            return best
+
+    def get_apartment_rating(self, apartment_id: int) -> float:
+        if apartment_id <= 0:
+            return 0
+        with self._lock:
+            return self._rating(apartment_id)
+
+    def get_owner_rating(self, owner_id: int) -> float:
+        if owner_id <= 0:
+            return 0
+        with self._lock:
+            ratings = [self._rating(apartment_id) for apartment_id in self._tables.owner_apartments.get(owner_id, ())]
+            return sum(ratings) / len(ratings) if ratings else 0
+
+    # ---------------------------------- ADVANCED API: ----------------------------------
+
+    def get_apartment_recommendation(self, customer_id: int) -> List[Tuple[Apartment, float]]:
+        with self._lock:
+            t = self._tables
+            reviewed = t.customer_reviews.get(customer_id, {})
+            # the rating of the customer over the rating of each other reviewer, averaged over their common
+            # apartments (in 1/2520, which every rating divides)
+            ratios = {}
+            for apartment_id in reviewed:
+                rating = t.reviews[(customer_id, apartment_id)][1]
+                for other in t.apartment_reviews[apartment_id]:
+                    if other != customer_id:
+                        ratio_sum, pair_count = ratios.get(other, (0, 0))
+                        ratios[other] = (ratio_sum + rating * (2520 // t.reviews[(other, apartment_id)][1]),
+                                         pair_count + 1)
+            ratios = {other: float(ratio_sum) / (2520 * pair_count) for other, (ratio_sum, pair_count) in ratios.items()}
+
+            recommended = []
+            for apartment_id in sorted(t.apartment_reviews):
+                if apartment_id in reviewed:
+                    continue
+                # a reviewer without a ratio rates as 1
+                scores = [min(max(t.reviews[(other, apartment_id)][1] * ratios[other], 1), 10) if other in ratios else 1
+                          for other in t.apartment_reviews[apartment_id]]
+                recommended.append((self._apartment_obj(apartment_id), float(sum(scores)) / len(scores)))
+            return recommended
+
+    # ---------------------------------- bulk inserts: ----------------------------------
+
+    def add_owners(self, owners: Iterable[Union[Owner, Tuple]]) -> List[ReturnValue]:
+        owners = [o if isinstance(o, Owner) else Owner(*o) for o in owners]
+        with self._lock:
+            return [self._write(self._insert_owner, o.get_owner_id(), o.get_owner_name()) for o in owners]
+
+    def add_apartments(self, apartments: Iterable[Union[Apartment, Tuple]]) -> List[ReturnValue]:
+        apartments = [a if isinstance(a, Apartment) else Apartment(*a) for a in apartments]
+        with self._lock:
+            return [self._write(self._insert_apartment, a.get_id(), a.get_address(), a.get_city(), a.get_country(),
+                                a.get_size()) if _positive(a.get_id(), a.get_size()) else ReturnValue.BAD_PARAMS
+                    for a in apartments]
+
+    def add_customers(self, customers: Iterable[Union[Customer, Tuple]]) -> List[ReturnValue]:
+        customers = [c if isinstance(c, Customer) else Customer(*c) for c in customers]
+        with self._lock:
+            return [self._write(self._insert_customer, c.get_customer_id(), c.get_customer_name())
+                    if _positive(c.get_customer_id()) else ReturnValue.BAD_PARAMS for c in customers]
+
+    def add_reservations(self, reservations: Iterable[Tuple[int, int, date, date, float]]) -> List[ReturnValue]:
+        results = []
+        with self._lock:
+            for cid, hid, start_date, end_date, price in [tuple(r) for r in reservations]:
+                if not _positive(cid, hid, price):
+                    results.append(ReturnValue.BAD_PARAMS)
+                    continue
+                try:
+                    inserted = self._insert_reservation(cid, hid, start_date, end_date, price)
+                    results.append(ReturnValue.OK if inserted else ReturnValue.BAD_PARAMS)
+                except _Violation as e:
+                    results.append(e.error_code)
+        return results
+
+    def add_reviews(self, reviews: Iterable[Tuple[int, int, date, int, str]]) -> List[ReturnValue]:
+        results = []
+        with self._lock:
+            for cid, hid, review_date, rating, text in [tuple(r) for r in reviews]:
+                if not (_positive(cid, hid) and rating is not None and 1 <= rating <= 10):
+                    results.append(ReturnValue.BAD_PARAMS)
+                    continue
+                try:
+                    inserted = self._insert_review(cid, hid, review_date, rating, text)
+                    results.append(ReturnValue.OK if inserted else ReturnValue.NOT_EXISTS)
+                except _Violation as e:
+                    results.append(e.error_code)
+        return results
+
+    # ---------------------------------- EXPORTS: ----------------------------------
+
+    def export_reservations(self, itersize: int = None) -> Iterator[Connector.ResultSetRow]:
+        with self._lock:
+            rows = [(cid, stay.apartment_id, stay.start_date, stay.end_date, price)
+                    for stay, (cid, price) in self._tables.reservations.items()]
+        return iter(Connector.ResultSet(_RESERVATION_COLUMNS, rows))
+
+    def export_reviews(self, itersize: int = None) -> Iterator[Connector.ResultSetRow]:
+        with self._lock:
+            rows = [(cid, hid, review_date, rating, text)
+                    for (cid, hid), (review_date, rating, text) in self._tables.reviews.items()]
+        return iter(Connector.ResultSet(_REVIEW_COLUMNS, rows))
+
+    # ---------------------------------- 5.1 Basic Database Functions ----------------------------------
+
+    def create_tables(self):
+        with self._lock:
+            self._tables = _Tables()
+
+    def clear_tables(self):
+        with self._lock:
+            self._tables = _Tables()
+
+    def drop_tables(self):
+        with self._lock:
+            self._tables = _Tables()
+
+
+# removes item from the index entry of key, and the entry once it is empty
+def _discard(index: dict, key, item):
+    entry = index.get(key)
+    if entry is not None:
+        entry.pop(item, None)
+        if not entry:
+            del index[key]
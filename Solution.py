@@ -1,8 +1,19 @@
-from typing import List, Tuple
+import functools
+import os
+import threading
+from copy import copy
+from itertools import islice
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from psycopg2 import sql
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
+import Utility.Cache as Cache
+import Utility.ChangeListener as ChangeListener
 import Utility.DBConnector as Connector
+import Utility.Migrator as Migrator
+import Utility.PreparedStatements as Statements
+import Utility.Tracing as Tracing
 from Utility.ReturnValue import ReturnValue
 from Utility.Exceptions import DatabaseException
 
@@ -19,6 +30,39 @@ class _Ex(Exception):
         self.error_code = value
 
 
+# every public API function is wrapped by _api, a traced call records a span (see Utility.Tracing)
+# while a backend is in use (see use_backend) the call goes to its method of the same name instead of postgres
+_backend = None
+
+
+def _api(fn):
+    @functools.wraps(fn)
+    def dispatch(*args, **kwargs):
+        backend = _backend
+        if backend is not None:
+            return getattr(backend, fn.__name__)(*args, **kwargs)
+        return fn(*args, **kwargs)
+
+    return Tracing.traced(dispatch)
+
+
+# routes the API to backend, an object with a method per API function that returns the same ReturnValues and
+# Business objects (see MemoryBackend), or back to postgres with None. returns the backend that was in use
+def use_backend(backend) -> object:
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+# SOLUTION_BACKEND=memory in the environment routes the API to a new MemoryBackend, anything else leaves it as is
+# called by the test harness (see Tests.Isolation), importing Solution never changes the backend
+def init_backend_from_env():
+    if os.environ.get('SOLUTION_BACKEND') == 'memory':
+        from MemoryBackend import MemoryBackend
+
+        use_backend(MemoryBackend())
+
+
 M_O_TABLE_NAME = 'Owner'
 M_O_id = 'OwnerID'
 M_O_name = "Name"
@@ -52,73 +96,520 @@ M_RevView_owner_id = 'owner_id'
 M_RevView_rating = 'rating'
 
 
-def _get(query):
-    _conn = None
+# ---------------------------------- prepared statements: ----------------------------------
+# parameterized with $1..$n, PREPAREd once per pooled connection (see Utility.PreparedStatements)
+# select columns are listed explicitly so a prepared plan never changes its result type
+
+_ADD_OWNER = Statements.register(
+    'add_owner',
+    f"INSERT INTO {M_O_TABLE_NAME}({M_O_id}, {M_O_name}) VALUES($1, $2)",
+    ('INTEGER', 'TEXT'))
+
+_GET_OWNER = Statements.register(
+    'get_owner',
+    f"SELECT {M_O_id}, {M_O_name} FROM {M_O_TABLE_NAME} WHERE {M_O_id}=$1",
+    ('INTEGER',))
+
+_DELETE_OWNER = Statements.register(
+    'delete_owner',
+    f"DELETE FROM {M_O_TABLE_NAME} WHERE {M_O_id}=$1",
+    ('INTEGER',))
+
+_ADD_APARTMENT = Statements.register(
+    'add_apartment',
+    f"INSERT INTO {M_A_TABLE_NAME}({M_A_id}, {M_A_address}, {M_A_city}, {M_A_country}, {M_A_size}) "
+    f"VALUES($1, $2, $3, $4, $5)",
+    ('INTEGER', 'TEXT', 'TEXT', 'TEXT', 'INTEGER'))
+
+_GET_APARTMENT = Statements.register(
+    'get_apartment',
+    f"SELECT {M_A_id}, {M_A_address}, {M_A_city}, {M_A_country}, {M_A_size} FROM {M_A_TABLE_NAME} "
+    f"WHERE {M_A_id}=$1",
+    ('INTEGER',))
+
+_DELETE_APARTMENT = Statements.register(
+    'delete_apartment',
+    f"DELETE FROM {M_A_TABLE_NAME} WHERE {M_A_id}=$1",
+    ('INTEGER',))
+
+_ADD_CUSTOMER = Statements.register(
+    'add_customer',
+    f"INSERT INTO {M_C_TABLE_NAME}({M_C_id}, {M_C_name}) VALUES($1, $2)",
+    ('INTEGER', 'TEXT'))
+
+_GET_CUSTOMER = Statements.register(
+    'get_customer',
+    f"SELECT {M_C_id}, {M_C_name} FROM {M_C_TABLE_NAME} WHERE {M_C_id}=$1",
+    ('INTEGER',))
+
+_DELETE_CUSTOMER = Statements.register(
+    'delete_customer',
+    f"DELETE FROM {M_C_TABLE_NAME} WHERE {M_C_id}=$1",
+    ('INTEGER',))
+
+_OWNER_OWNS_APARTMENT = Statements.register(
+    'owner_owns_apartment',
+    f"INSERT INTO {M_OwnedBy_TABLE_NAME}({M_OwnedBy_owner_id}, {M_OwnedBy_house_id}) VALUES($1, $2)",
+    ('INTEGER', 'INTEGER'))
+
+_OWNER_DROPS_APARTMENT = Statements.register(
+    'owner_drops_apartment',
+    f"DELETE FROM {M_OwnedBy_TABLE_NAME} WHERE {M_OwnedBy_owner_id}=$1 AND {M_OwnedBy_house_id}=$2",
+    ('INTEGER', 'INTEGER'))
+
+_GET_OWNER_APARTMENTS = Statements.register(
+    'get_owner_apartments',
+    f"SELECT {M_A_id}, {M_A_address}, {M_A_city}, {M_A_country}, {M_A_size} FROM {M_OwnedBy_TABLE_NAME} "
+    f"LEFT OUTER JOIN {M_A_TABLE_NAME} ON {M_OwnedBy_house_id}={M_A_id} "
+    f"WHERE {M_OwnedBy_owner_id}=$1",
+    ('INTEGER',))
+
+_GET_APARTMENT_OWNER = Statements.register(
+    'get_apartment_owner',
+    f"SELECT {M_O_id}, {M_O_name} FROM {M_OwnedBy_TABLE_NAME} "
+    f"LEFT OUTER JOIN {M_O_TABLE_NAME} ON {M_OwnedBy_owner_id} = {M_O_id} "
+    f"WHERE {M_OwnedBy_house_id}=$1",
+    ('INTEGER',))
+
+_CUSTOMER_MADE_RESERVATION = Statements.register(
+    'customer_made_reservation',
+    f"INSERT INTO {M_Res_TABLE_NAME}({M_Res_cid}, {M_Res_hid}, {M_Res_start_date}, {M_Res_end_date}, {M_Res_total_price}) "
+    f"SELECT $1, $2, $3, $4, $5 "
+    f"WHERE NOT EXISTS (SELECT 1 FROM {M_Res_TABLE_NAME} AS Res WHERE $2 = Res.{M_Res_hid} AND "
+    f"($3, $4) OVERLAPS (Res.{M_Res_start_date}, Res.{M_Res_end_date}))",
+    ('INTEGER', 'INTEGER', 'DATE', 'DATE', 'FLOAT'))
+
+# with the exclusion_constraint schema option the constraint rejects an overlapping stay
+_CUSTOMER_MADE_RESERVATION_EXCLUSIVE = Statements.register(
+    'customer_made_reservation_exclusive',
+    f"INSERT INTO {M_Res_TABLE_NAME}({M_Res_cid}, {M_Res_hid}, {M_Res_start_date}, {M_Res_end_date}, {M_Res_total_price}) "
+    f"VALUES($1, $2, $3, $4, $5)",
+    ('INTEGER', 'INTEGER', 'DATE', 'DATE', 'FLOAT'))
+
+_CUSTOMER_CANCELLED_RESERVATION = Statements.register(
+    'customer_cancelled_reservation',
+    f"DELETE FROM {M_Res_TABLE_NAME} WHERE {M_Res_cid}=$1 AND {M_Res_hid}=$2 AND {M_Res_start_date}=$3",
+    ('INTEGER', 'INTEGER', 'DATE'))
+
+_CUSTOMER_REVIEWED_APARTMENT = Statements.register(
+    'customer_reviewed_apartment',
+    f"INSERT INTO {M_Rev_TABLE_NAME}({M_Rev_cid}, {M_Rev_hid}, {M_Rev_review_date}, {M_Rev_rating}, {M_Rev_review_text}) "
+    f"SELECT $1, $2, $3, $4, $5 "
+    f"WHERE EXISTS (SELECT 1 FROM {M_Res_TABLE_NAME} AS Res "
+    f"WHERE Res.{M_Res_hid} = $2 "
+    f"AND Res.{M_Res_end_date} <= $3 "
+    f"AND Res.{M_Res_cid} = $1 )",
+    ('INTEGER', 'INTEGER', 'DATE', 'INTEGER', 'TEXT'))
+
+_CUSTOMER_UPDATED_REVIEW = Statements.register(
+    'customer_updated_review',
+    f"UPDATE {M_Rev_TABLE_NAME} "
+    f" SET {M_Rev_rating}=$4, {M_Rev_review_text}=$5, {M_Rev_review_date}=$3"
+    f" WHERE {M_Rev_cid}=$1 AND {M_Rev_hid}=$2 AND {M_Rev_review_date} <= $3",
+    ('INTEGER', 'INTEGER', 'DATE', 'INTEGER', 'TEXT'))
+
+_GET_APARTMENT_RATING = Statements.register(
+    'get_apartment_rating',
+    f"SELECT AVG({M_RevView_rating}) as avg_rating"
+    f" FROM {M_RevView_TABLE_NAME}"
+    f" WHERE {M_RevView_house_id} = $1"
+    f" GROUP BY {M_RevView_house_id}",
+    ('INTEGER',))
+
+M_ApartmentReservations_TABLE_NAME = 'ApartmentReservations'
+M_OwnerReservations_TABLE_NAME = 'OwnerReservations'
+M_CustomerReservations_TABLE_NAME = 'CustomerReservations'
+
+# reservation counts are read from counters kept by triggers, an owner without reservations has no counter row
+_RESERVATIONS_PER_OWNER = Statements.register(
+    'reservations_per_owner',
+    f"SELECT {M_O_TABLE_NAME}.{M_O_name}, {M_O_TABLE_NAME}.{M_O_id}, COALESCE(res_count, 0) AS res_count"
+    f" FROM {M_O_TABLE_NAME} "
+    f" LEFT OUTER JOIN {M_OwnerReservations_TABLE_NAME} "
+    f" ON {M_OwnerReservations_TABLE_NAME}.owner_id = {M_O_TABLE_NAME}.{M_O_id}")
+
+# the k customers with the most reservations, ties by id, walks the (res_count DESC, customer_id) index
+_GET_TOP_CUSTOMERS = Statements.register(
+    'get_top_customers',
+    f"SELECT {M_C_id}, {M_C_name}"
+    f" FROM {M_CustomerReservations_TABLE_NAME} "
+    f" INNER JOIN {M_C_TABLE_NAME} "
+    f" ON {M_CustomerReservations_TABLE_NAME}.customer_id = {M_C_TABLE_NAME}.{M_C_id} "
+    f" ORDER BY res_count DESC, customer_id "
+    f" LIMIT $1",
+    ('INTEGER',))
+
+M_MonthlyRevenue_TABLE_NAME = 'MonthlyRevenue'
+
+# revenue of the reservations ending in each month of the years, read from the MonthlyRevenue rollup
+_MONTHLY_REVENUE = Statements.register(
+    'monthly_revenue',
+    f"SELECT year, month, revenue FROM {M_MonthlyRevenue_TABLE_NAME} WHERE year BETWEEN $1 AND $2",
+    ('INTEGER', 'INTEGER'))
+
+M_Locations_TABLE_NAME = 'Locations'
+M_OwnerLocations_TABLE_NAME = 'OwnerLocations'
+M_OwnerCoverage_TABLE_NAME = 'OwnerCoverage'
+M_LocationTotal_TABLE_NAME = 'LocationTotal'
+
+# owners whose count of distinct locations is the count of all distinct locations, both kept by triggers
+_GET_ALL_LOCATION_OWNERS = Statements.register(
+    'get_all_location_owners',
+    f"SELECT {M_O_id}, {M_O_name} FROM {M_OwnerCoverage_TABLE_NAME}"
+    f" INNER JOIN {M_O_TABLE_NAME} ON owner_id = {M_O_id}"
+    f" WHERE location_count = (SELECT location_count FROM {M_LocationTotal_TABLE_NAME})"
+    f" ORDER BY {M_O_id}")
+
+# TODO: rating are counted more than once if someone made more than one reservation
+_BEST_VALUE_FOR_MONEY = Statements.register(
+    'best_value_for_money',
+    f""" SELECT Apartment.{M_A_id}, {M_A_address}, {M_A_city}, {M_A_country}, {M_A_size} FROM
+ (SELECT * FROM viewaptvalue  WHERE value>= 0 ORDER BY VALUE DESC LIMIT 1) AS BEST
+ LEFT JOIN
+ Apartment 
+ ON Apartment.id = BEST.apartment_id
+        """)
+
+# every apartment with a value, best first and ties by id, loaded into the best value leaderboard
+_BEST_VALUE_APARTMENTS = Statements.register(
+    'best_value_apartments',
+    f"SELECT {M_A_TABLE_NAME}.{M_A_id}, {M_A_address}, {M_A_city}, {M_A_country}, {M_A_size}, value"
+    f" FROM ViewAptValue INNER JOIN {M_A_TABLE_NAME} ON {M_A_TABLE_NAME}.{M_A_id} = ViewAptValue.apartment_id"
+    f" WHERE value >= 0"
+    f" ORDER BY value DESC, {M_A_TABLE_NAME}.{M_A_id}")
+
+M_RatioPairs_TABLE_NAME = 'CustomerRatioPairs'
+
+# the rating ratio of the customer to every customer who reviewed an apartment they reviewed is read from the
+# CustomerRatioPairs table by its primary key, the other reviews of each apartment the customer did not review
+# are scaled by it and clamped to 1..10, a customer without a ratio rates as 1
+# ratio_sum holds each quotient times 2520 (divisible by 1..10) as an exact integer, so the ratio is the exact mean
+# of the quotients rounded once. the query before the table averaged the FLOAT quotients, rounding each of them and
+# each addition, so the results can differ from it in the last bits: by at most (n + m + 2) * 2^-52 relative, for n
+# the most reviews the customer shares with another customer and m the reviews averaged for the apartment
+_GET_APARTMENT_RECOMMENDATION = Statements.register(
+    'get_apartment_recommendation',
+    f"""
+        SELECT {M_A_id}, {M_A_address}, {M_A_city}, {M_A_country}, {M_A_size}, avg FROM
+    Apartment INNER JOIN
+    (
+    SELECT R.{M_Rev_hid}, AVG(LEAST(GREATEST(R.{M_Rev_rating} * P.ratio_from_user, 1), 10)) FROM
+        {M_Rev_TABLE_NAME} AS R
+        LEFT JOIN
+        (
+            SELECT c2, CAST(ratio_sum AS FLOAT) / (2520 * pair_count) AS ratio_from_user
+            FROM {M_RatioPairs_TABLE_NAME} WHERE c1 = $1
+        ) AS P
+        ON P.c2 = R.{M_Rev_cid}
+    WHERE NOT EXISTS (SELECT 1 FROM {M_Rev_TABLE_NAME} AS Own WHERE Own.{M_Rev_cid} = $1 AND Own.{M_Rev_hid} = R.{M_Rev_hid})
+    GROUP BY R.{M_Rev_hid}
+    ) AS Recommended
+    ON {M_A_id} = Recommended.{M_Rev_hid}
+    ORDER BY {M_A_id}
+    """,
+    ('INTEGER',))
+
+_EXPORT_RESERVATIONS = Statements.register(
+    'export_reservations',
+    f"SELECT {M_Res_cid}, {M_Res_hid}, {M_Res_start_date}, {M_Res_end_date}, {M_Res_total_price} "
+    f"FROM {M_Res_TABLE_NAME}")
+
+_EXPORT_REVIEWS = Statements.register(
+    'export_reviews',
+    f"SELECT {M_Rev_cid}, {M_Rev_hid}, {M_Rev_review_date}, {M_Rev_rating}, {M_Rev_review_text} "
+    f"FROM {M_Rev_TABLE_NAME}")
+
+_GET_OWNER_RATING = Statements.register(
+    'get_owner_rating',
+    f" SELECT COALESCE(AVG(average_rating),0) as avg_owner_rating "
+    f" FROM ViewAptRating "
+    f" WHERE EXISTS ("
+    f" SELECT 1 FROM {M_OwnedBy_TABLE_NAME} WHERE "
+    f" {M_OwnedBy_TABLE_NAME}.{M_OwnedBy_house_id}=ViewAptRating.{M_OwnedBy_house_id} "
+    f" AND {M_OwnedBy_TABLE_NAME}.{M_OwnedBy_owner_id}=$1"
+    f" )",
+    ('INTEGER',))
+
+
+# ---------------------------------- bulk inserts: ----------------------------------
+# multi-row versions of the add statements, the single %s is expanded to a VALUES list
+
+_ADD_OWNERS = f"INSERT INTO {M_O_TABLE_NAME}({M_O_id}, {M_O_name}) VALUES %s"
+_ADD_OWNERS_TEMPLATE = "(%s::INTEGER, %s::TEXT)"
+
+_ADD_APARTMENTS = f"INSERT INTO {M_A_TABLE_NAME}({M_A_id}, {M_A_address}, {M_A_city}, {M_A_country}, {M_A_size}) VALUES %s"
+_ADD_APARTMENTS_TEMPLATE = "(%s::INTEGER, %s::TEXT, %s::TEXT, %s::TEXT, %s::INTEGER)"
+
+_ADD_CUSTOMERS = f"INSERT INTO {M_C_TABLE_NAME}({M_C_id}, {M_C_name}) VALUES %s"
+_ADD_CUSTOMERS_TEMPLATE = "(%s::INTEGER, %s::TEXT)"
+
+_ADD_RESERVATIONS = (
+    f"INSERT INTO {M_Res_TABLE_NAME}({M_Res_cid}, {M_Res_hid}, {M_Res_start_date}, {M_Res_end_date}, {M_Res_total_price}) "
+    f"SELECT V.* FROM (VALUES %s) AS V({M_Res_cid}, {M_Res_hid}, {M_Res_start_date}, {M_Res_end_date}, {M_Res_total_price}) "
+    f"WHERE NOT EXISTS (SELECT 1 FROM {M_Res_TABLE_NAME} AS Res WHERE V.{M_Res_hid} = Res.{M_Res_hid} AND "
+    f"(V.{M_Res_start_date}, V.{M_Res_end_date}) OVERLAPS (Res.{M_Res_start_date}, Res.{M_Res_end_date}))")
+_ADD_RESERVATIONS_TEMPLATE = "(%s::INTEGER, %s::INTEGER, %s::DATE, %s::DATE, %s::FLOAT)"
+
+_ADD_REVIEWS = (
+    f"INSERT INTO {M_Rev_TABLE_NAME}({M_Rev_cid}, {M_Rev_hid}, {M_Rev_review_date}, {M_Rev_rating}, {M_Rev_review_text}) "
+    f"SELECT V.* FROM (VALUES %s) AS V({M_Rev_cid}, {M_Rev_hid}, {M_Rev_review_date}, {M_Rev_rating}, {M_Rev_review_text}) "
+    f"WHERE EXISTS (SELECT 1 FROM {M_Res_TABLE_NAME} AS Res "
+    f"WHERE Res.{M_Res_hid} = V.{M_Rev_hid} "
+    f"AND Res.{M_Res_end_date} <= V.{M_Rev_review_date} "
+    f"AND Res.{M_Res_cid} = V.{M_Rev_cid} )")
+_ADD_REVIEWS_TEMPLATE = "(%s::INTEGER, %s::INTEGER, %s::DATE, %s::INTEGER, %s::TEXT)"
+
+
+# ---------------------------------- transactions: ----------------------------------
+# inside "with transaction():" every API call of the thread runs on one shared connection and the work is
+# committed once when the block ends (rolled back if it raises)
+# each call is wrapped in a savepoint, so a call that fails still returns its ReturnValue and leaves the
+# rest of the transaction intact
+# nested blocks join the outer transaction through a savepoint of their own
+
+_local = threading.local()
+
+
+@contextmanager
+def transaction():
+    backend = _backend
+    if backend is not None:
+        with backend.transaction():
+            yield
+        return
+
+    _conn = getattr(_local, 'transaction', None)
+    if _conn is not None:
+        _local.depth += 1
+        name = f"nested_transaction_{_local.depth}"
+        _conn.savepoint(name)
+        try:
+            yield
+        except BaseException:
+            _conn.rollback_to_savepoint(name)
+            raise
+        else:
+            _conn.release_savepoint(name)
+        finally:
+            _local.depth -= 1
+        return
+
+    _conn = Connector.DBConnector()
+    _conn.begin()
+    _local.transaction = _conn
+    _local.depth = 0
+    _local.invalidations = []
     try:
+        yield
+    except BaseException:
+        _conn.end(commit=False)
+        raise
+    else:
+        _conn.end(commit=True)
+    finally:
+        _local.transaction = None
+        _conn.close()
+        for invalidate in _local.invalidations:
+            invalidate()
+
+
+def in_transaction() -> bool:
+    return getattr(_local, 'transaction', None) is not None
+
+
+# caches are shared by the threads, so a write evicts them once it is visible to the others: right away, or
+# when the transaction of the thread ends. reads inside a transaction bypass them (they may see its own writes)
+def _invalidate(invalidate: Callable[[], None]):
+    if in_transaction():
+        _local.invalidations.append(invalidate)
+    else:
+        invalidate()
+
+
+# ---------------------------------- entity cache: ----------------------------------
+# optional read-through LRU/TTL cache of get_owner, get_customer, get_apartment and get_apartment_owner, off until
+# enable_entity_cache. entries are keyed ('owner', id), ('customer', id), ('apartment', id) and
+# ('apartment_owner', apartment_id), bad_owner() and the like are cached too, errors are not
+# the writes of Solution evict the entries they change, cascades included. callers get a copy of the cached object
+
+_entities: Optional[Cache.LRUCache] = None
+
+
+def enable_entity_cache(maxsize: int = 1024, ttl: Optional[float] = 60.0):
+    global _entities
+    _entities = Cache.LRUCache(maxsize, ttl)
+
+
+def disable_entity_cache():
+    global _entities
+    _entities = None
+
+
+def entity_cache_stats() -> dict:
+    cache = _entities
+    return cache.stats() if cache is not None else {}
+
+
+def _cached(key: tuple, load: Callable, *args):
+    cache = _entities
+    if cache is None or in_transaction():
+        return load(*args)
+    return copy(cache.get_or_load(key, lambda: load(*args)))
+
+
+def _evict(*keys: tuple):
+    cache = _entities
+    if cache is not None:
+        _invalidate(lambda: cache.discard(*keys))
+
+
+# the apartment_owner entries naming the owner, its apartments are released when it is deleted
+def _evict_owned_by(owner_id: int):
+    cache = _entities
+    if cache is not None:
+        _invalidate(lambda: cache.discard_where(
+            lambda key, value: key[0] == 'apartment_owner' and value.get_owner_id() == owner_id))
+
+
+def _evict_all():
+    cache = _entities
+    if cache is not None:
+        _invalidate(cache.clear)
+
+
+# ---------------------------------- change listener: ----------------------------------
+# keeps the caches of this process current with the writes of other processes, off until start_change_listener
+# the triggers of the change_notify schema option publish every write to Owner, Apartment, Customer, OwnedBy,
+# Reservations and Reviews, a ChangeListener evicts the entity cache entries and the leaderboard they touch.
+# start_change_listener sets the option and installs them on a schema created without it. writes through this process
+# are evicted twice, which is harmless. everything is dropped when the listener (re)connects, it may have missed some
+
+_listener: Optional[ChangeListener.ChangeListener] = None
+
+
+def start_change_listener() -> ChangeListener.ChangeListener:
+    global _listener
+    if _listener is None:
+        set_schema_options(change_notify=True)
+        migrator = schema_migrator()
+        if migrator.applied_versions():
+            migrator.migrate()
+        _listener = ChangeListener.ChangeListener(_on_change, _on_reset).start()
+    return _listener
+
+
+def stop_change_listener():
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+# called from the listener thread, the change is committed so the caches are evicted right away
+def _on_change(change: ChangeListener.Change):
+    table, keys = change.table.lower(), change.keys
+    cache = _entities
+    if change.op == 'TRUNCATE':
+        _on_reset()
+    elif table == M_O_TABLE_NAME.lower():
+        owner_id = keys[M_O_id.lower()]
+        if cache is not None:
+            cache.discard(('owner', owner_id))
+            cache.discard_where(lambda key, value: key[0] == 'apartment_owner' and value.get_owner_id() == owner_id)
+    elif table == M_A_TABLE_NAME.lower():
+        if cache is not None:
+            cache.discard(('apartment', keys[M_A_id.lower()]), ('apartment_owner', keys[M_A_id.lower()]))
+        _leaderboard.invalidate()
+    elif table == M_C_TABLE_NAME.lower():
+        if cache is not None:
+            cache.discard(('customer', keys[M_C_id.lower()]))
+    elif table == M_OwnedBy_TABLE_NAME.lower():
+        if cache is not None:
+            cache.discard(('apartment_owner', keys[M_OwnedBy_house_id]))
+    elif table in (M_Res_TABLE_NAME.lower(), M_Rev_TABLE_NAME.lower()):
+        _leaderboard.invalidate()
+
+
+def _on_reset():
+    cache = _entities
+    if cache is not None:
+        cache.clear()
+    _leaderboard.invalidate()
+
+
+# connection for one API call, the transaction's connection (under a savepoint) or a pooled one
+@contextmanager
+def _connection():
+    _conn = getattr(_local, 'transaction', None)
+    if _conn is None:
         _conn = Connector.DBConnector()
-        _rows_effected, result = _conn.execute(query)
-    except (DatabaseException.CHECK_VIOLATION, DatabaseException.NOT_NULL_VIOLATION):
+        try:
+            yield _conn
+        finally:
+            _conn.close()
+        return
+
+    _conn.savepoint('api_call')
+    try:
+        yield _conn
+    except BaseException:
+        _conn.rollback_to_savepoint('api_call')
+        raise
+    else:
+        _conn.release_savepoint('api_call')
+
+
+def _get(query, params=None):
+    try:
+        with _connection() as _conn:
+            _rows_effected, result = _conn.execute(query, params=params)
+    except (DatabaseException.CHECK_VIOLATION, DatabaseException.NOT_NULL_VIOLATION,
+            DatabaseException.EXCLUSION_VIOLATION):
         raise _Ex(ReturnValue.BAD_PARAMS)
     except DatabaseException.UNIQUE_VIOLATION:
         raise _Ex(ReturnValue.ALREADY_EXISTS)
     except DatabaseException.FOREIGN_KEY_VIOLATION:
         raise _Ex(ReturnValue.NOT_EXISTS)
-    except DatabaseException:
+    except (DatabaseException, DatabaseException.ConnectionInvalid):
         raise _Ex(ReturnValue.ERROR)
-    finally:
-        try:
-            _conn.close()
-        except Exception:
-            raise _Ex(ReturnValue.ERROR)
 
     return _rows_effected, result
 
 
-def _insert(query):
-    _conn = None
+def _insert(query, params=None):
     try:
-        _conn = Connector.DBConnector()
-        _rows_effected, _ = _conn.execute(query)
-    except (DatabaseException.CHECK_VIOLATION, DatabaseException.NOT_NULL_VIOLATION):
+        with _connection() as _conn:
+            _rows_effected, _ = _conn.execute(query, params=params)
+    except (DatabaseException.CHECK_VIOLATION, DatabaseException.NOT_NULL_VIOLATION,
+            DatabaseException.EXCLUSION_VIOLATION):
         raise _Ex(ReturnValue.BAD_PARAMS)
     except DatabaseException.UNIQUE_VIOLATION:
         raise _Ex(ReturnValue.ALREADY_EXISTS)
     except DatabaseException.FOREIGN_KEY_VIOLATION:
         raise _Ex(ReturnValue.NOT_EXISTS)
-    except DatabaseException:
+    except (DatabaseException, DatabaseException.ConnectionInvalid):
         raise _Ex(ReturnValue.ERROR)
     except Exception as e:
         raise e
-    finally:
-        try:
-            _conn.close()
-        except Exception:
-            raise _Ex(ReturnValue.ERROR)
 
     return _rows_effected, _
 
 
-def _update(_query):
-    rows_updated, _ = _insert(_query)
+def _update(_query, params=None):
+    rows_updated, _ = _insert(_query, params)
     if not rows_updated:
         raise _Ex(ReturnValue.NOT_EXISTS)
     return rows_updated, _
 
 
-def _delete(query):
-    _conn = None
+def _delete(query, params=None):
     try:
-        _conn = Connector.DBConnector()
-        rows_effected, _ = _conn.execute(query)
+        with _connection() as _conn:
+            rows_effected, _ = _conn.execute(query, params=params)
     except (DatabaseException.CHECK_VIOLATION, DatabaseException.NOT_NULL_VIOLATION):
         raise _Ex(ReturnValue.BAD_PARAMS)
-    except DatabaseException:
+    except (DatabaseException, DatabaseException.ConnectionInvalid):
         raise _Ex(ReturnValue.ERROR)
-    finally:
-        try:
-            _conn.close()
-        except Exception:
-            raise _Ex(ReturnValue.ERROR)
 
     if not rows_effected:
         raise _Ex(ReturnValue.NOT_EXISTS)
@@ -126,6 +617,96 @@ def _delete(query):
     return rows_effected, _
 
 
+# a generator can't return a ReturnValue, so DatabaseException reaches the caller of the export
+def _stream(query, params=None, itersize=Connector.DEFAULT_ITERSIZE):
+    _conn = None
+    try:
+        _conn = Connector.DBConnector()
+        yield from _conn.execute_stream(query, params=params, itersize=itersize)
+    finally:
+        if _conn is not None:
+            _conn.close()
+
+
+_VIOLATIONS = (DatabaseException.CHECK_VIOLATION, DatabaseException.NOT_NULL_VIOLATION,
+               DatabaseException.UNIQUE_VIOLATION, DatabaseException.FOREIGN_KEY_VIOLATION,
+               DatabaseException.EXCLUSION_VIOLATION)
+
+
+def _violation_to_return_value(e: Exception) -> ReturnValue:
+    if isinstance(e, (DatabaseException.CHECK_VIOLATION, DatabaseException.NOT_NULL_VIOLATION,
+                      DatabaseException.EXCLUSION_VIOLATION)):
+        return ReturnValue.BAD_PARAMS
+    if isinstance(e, DatabaseException.UNIQUE_VIOLATION):
+        return ReturnValue.ALREADY_EXISTS
+    if isinstance(e, DatabaseException.FOREIGN_KEY_VIOLATION):
+        return ReturnValue.NOT_EXISTS
+    return ReturnValue.ERROR
+
+
+def _positive(*values) -> bool:
+    return all(v is not None and v > 0 for v in values)
+
+
+# does any pair of (customer_id, apartment_id, start_date, end_date, ...) rows OVERLAPS in the same apartment
+# a stay [s, e) with s == e is the single day [s, s + 1), which matches OVERLAPS for dates
+def _overlapping(reservations) -> bool:
+    stays = sorted((hid, min(s, e), max(s, e, min(s, e) + timedelta(days=1)))
+                   for _, hid, s, e, *_ in reservations if s is not None and e is not None)
+    for (hid1, _, end1), (hid2, start2, _) in zip(stays, stays[1:]):
+        if hid1 == hid2 and start2 < end1:
+            return True
+    return False
+
+
+# rows - parameters of every input row, valid - result of the python side checks of each row
+# bulk_query/template - the multi-row INSERT, row_statement - the single row statement used on replay
+# no_rows - result of a replayed row that inserted nothing
+# fast=False skips the multi-row attempt
+def _bulk_insert(rows, valid, bulk_query, template, row_statement, no_rows=ReturnValue.ERROR, fast=True):
+    results = [ReturnValue.OK if ok else ReturnValue.BAD_PARAMS for ok in valid]
+    pending = [i for i, ok in enumerate(valid) if ok]
+    if not pending:
+        return results
+
+    try:
+        with _connection() as _conn:
+            _bulk_run(_conn, rows, pending, results, bulk_query, template, row_statement, no_rows, fast)
+    except DatabaseException.ConnectionInvalid:
+        for i in pending:
+            results[i] = ReturnValue.ERROR
+
+    return results
+
+
+# fills results in place, commit() is a no-op when _conn belongs to a transaction()
+def _bulk_run(_conn, rows, pending, results, bulk_query, template, row_statement, no_rows, fast):
+    if fast:
+        _conn.savepoint('bulk')
+        try:
+            inserted = _conn.execute_values(bulk_query, [rows[i] for i in pending], template=template,
+                                            commit=False)
+        except _VIOLATIONS:
+            inserted = -1
+        if inserted == len(pending):
+            _conn.commit()
+            return
+        _conn.rollback_to_savepoint('bulk')
+
+    for i in pending:
+        _conn.savepoint('bulk_row')
+        try:
+            inserted, _ = _conn.execute(row_statement, params=rows[i], commit=False)
+            _conn.release_savepoint('bulk_row')
+            if not inserted:
+                results[i] = no_rows
+        except _VIOLATIONS as e:
+            _conn.rollback_to_savepoint('bulk_row')
+            results[i] = _violation_to_return_value(e)
+    _conn.commit()
+
+
+@Tracing.phased('build')
 def _result_to_owner_obj(result: Connector.ResultSet) -> Owner:
     return Owner(
         owner_id=result[0][M_O_id],
@@ -133,6 +714,7 @@ def _result_to_owner_obj(result: Connector.ResultSet) -> Owner:
     )
 
 
+@Tracing.phased('build')
 def _result_to_customer_obj(result: Connector.ResultSet) -> Customer:
     return Customer(
         customer_id=result[0][M_C_id],
@@ -140,6 +722,7 @@ def _result_to_customer_obj(result: Connector.ResultSet) -> Customer:
     )
 
 
+@Tracing.phased('build')
 def _result_to_apartment_obj(result: Connector.ResultSet) -> Apartment:
     return Apartment(
         id=result[M_A_id],
@@ -150,431 +733,415 @@ def _result_to_apartment_obj(result: Connector.ResultSet) -> Apartment:
     )
 
 
+# the objects of every row at once, straight from the row tuples, the queries select the object's columns first
+@Tracing.phased('build')
+def _result_to_owner_objs(result: Connector.ResultSet) -> List[Owner]:
+    return Owner.from_rows(result.rows)
+
+
+@Tracing.phased('build')
+def _result_to_customer_objs(result: Connector.ResultSet) -> List[Customer]:
+    return Customer.from_rows(result.rows)
+
+
+@Tracing.phased('build')
+def _result_to_apartment_objs(result: Connector.ResultSet) -> List[Apartment]:
+    return Apartment.from_rows(result.rows)
+
+
+# ---------------------------------- shared with AsyncSolution: ----------------------------------
+# the parameters and checks of a write and the caches it evicts, AsyncSolution calls these too so a write
+# through either API is checked the same way and is seen by the reads of both
+
+
+def _owner_row(owner: Owner) -> tuple:
+    return owner.get_owner_id(), owner.get_owner_name()
+
+
+def _apartment_row(apartment: Apartment) -> tuple:
+    return apartment.get_id(), apartment.get_address(), apartment.get_city(), apartment.get_country(), \
+        apartment.get_size()
+
+
+def _customer_row(customer: Customer) -> tuple:
+    return customer.get_customer_id(), customer.get_customer_name()
+
+
+# the owner's checks are left to the CHECK constraints of the table
+def _valid_apartment(apartment: Apartment) -> bool:
+    return _positive(apartment.get_id(), apartment.get_size())
+
+
+def _valid_customer(customer: Customer) -> bool:
+    return _positive(customer.get_customer_id())
+
+
+def _valid_reservation(customer_id: int, apartment_id: int, total_price: float) -> bool:
+    return _positive(customer_id, apartment_id, total_price)
+
+
+def _valid_review(customer_id: int, apartment_id: int, rating: int) -> bool:
+    return _positive(customer_id, apartment_id) and rating is not None and 1 <= rating <= 10
+
+
+# customer_made_reservation runs on the exclusion constraint when the schema has it
+def _reservation_statement() -> str:
+    if SCHEMA_OPTIONS['exclusion_constraint']:
+        return _CUSTOMER_MADE_RESERVATION_EXCLUSIVE
+    return _CUSTOMER_MADE_RESERVATION
+
+
+def _reservation_error(error_code: ReturnValue) -> ReturnValue:
+    # the same stay twice breaks the primary key before the constraint, it's an overlap all the same
+    if SCHEMA_OPTIONS['exclusion_constraint'] and error_code == ReturnValue.ALREADY_EXISTS:
+        return ReturnValue.BAD_PARAMS
+    return error_code
+
+
+# evictions after a successful write, a deleted row cascades to the rows referencing it
+def _owners_written(*owner_ids: int, deleted: bool = False):
+    _evict(*[('owner', owner_id) for owner_id in owner_ids])
+    if deleted:
+        for owner_id in owner_ids:
+            _evict_owned_by(owner_id)
+
+
+def _apartments_written(*apartment_ids: int, deleted: bool = False):
+    _evict(*[(kind, apartment_id) for apartment_id in apartment_ids for kind in ('apartment', 'apartment_owner')])
+    if deleted:
+        _invalidate(_leaderboard.invalidate)
+
+
+def _customers_written(*customer_ids: int, deleted: bool = False):
+    _evict(*[('customer', customer_id) for customer_id in customer_ids])
+    if deleted:
+        _invalidate(_leaderboard.invalidate)
+
+
+def _ownership_written(apartment_id: int):
+    _evict(('apartment_owner', apartment_id))
+
+
+# reservations and reviews only change the values of the leaderboard
+def _stays_written():
+    _invalidate(_leaderboard.invalidate)
+
+
 # ---------------------------------- CRUD API: ----------------------------------
 
 
+@_api
 def add_owner(owner: Owner) -> ReturnValue:
-    _query = sql.SQL(f"INSERT INTO {M_O_TABLE_NAME}({M_O_id}, {M_O_name}) VALUES({{ID}}, {{Name}})").format(
-        ID=sql.Literal(owner.get_owner_id()),
-        Name=sql.Literal(owner.get_owner_name())
-    )
     try:
-        _insert(_query)
+        _insert(_ADD_OWNER, _owner_row(owner))
     except _Ex as e:
         return e.error_code
+    _owners_written(owner.get_owner_id())
     return ReturnValue.OK
 
 
-def get_owner(owner_id: int) -> Owner:
-    _query = sql.SQL(f"SELECT * FROM {M_O_TABLE_NAME} WHERE {M_O_id}={{ID}}").format(
-        ID=sql.Literal(owner_id),
-    )
-
-    try:
-        rows_effected, result = _get(_query)
-    except _Ex as e:
-        return e.error_code
-
+def _load_owner(owner_id: int) -> Owner:
+    rows_effected, result = _get(_GET_OWNER, (owner_id,))
     if not rows_effected:
         return Owner.bad_owner()
 
     return _result_to_owner_obj(result)
 
 
+@_api
+def get_owner(owner_id: int) -> Owner:
+    try:
+        return _cached(('owner', owner_id), _load_owner, owner_id)
+    except _Ex as e:
+        return e.error_code
+
+
+@_api
 def delete_owner(owner_id: int) -> ReturnValue:
-    if owner_id <= 0:
+    if not _positive(owner_id):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(f"DELETE FROM {M_O_TABLE_NAME} WHERE {M_O_id}={{ID}}").format(
-        ID=sql.Literal(owner_id),
-    )
     try:
-        _delete(_query)
+        _delete(_DELETE_OWNER, (owner_id,))
     except _Ex as e:
         return e.error_code
+    _owners_written(owner_id, deleted=True)
     return ReturnValue.OK
 
 
+@_api
 def add_apartment(apartment: Apartment) -> ReturnValue:
-    if not apartment.get_id() or apartment.get_id() <= 0 or apartment.get_size() <= 0:
+    if not _valid_apartment(apartment):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(
-        f"INSERT INTO {M_A_TABLE_NAME}({M_A_id}, {M_A_address}, {M_A_city}, {M_A_country}, {M_A_size}) "
-        f"VALUES({{ID}}, {{Address}}, {{City}}, {{Country}}, {{Size}})").format(
-        ID=sql.Literal(apartment.get_id()),
-        Address=sql.Literal(apartment.get_address()),
-        City=sql.Literal(apartment.get_city()),
-        Country=sql.Literal(apartment.get_country()),
-        Size=sql.Literal(apartment.get_size())
-    )
     try:
-        _insert(_query)
+        _insert(_ADD_APARTMENT, _apartment_row(apartment))
     except _Ex as e:
         return e.error_code
+    _apartments_written(apartment.get_id())
     return ReturnValue.OK
 
 
-def get_apartment(apartment_id: int) -> Apartment:
-    _query = sql.SQL(f"SELECT * FROM {M_A_TABLE_NAME} WHERE {M_A_id}={{ID}}").format(
-        ID=sql.Literal(apartment_id)
-    )
-
-    try:
-        rows_effected, result = _get(_query)
-    except _Ex as e:
-        return Apartment.bad_apartment()
+def _load_apartment(apartment_id: int) -> Apartment:
+    rows_effected, result = _get(_GET_APARTMENT, (apartment_id,))
     if not rows_effected:
         return Apartment.bad_apartment()
 
     return _result_to_apartment_obj(result[0])
 
 
+@_api
+def get_apartment(apartment_id: int) -> Apartment:
+    try:
+        return _cached(('apartment', apartment_id), _load_apartment, apartment_id)
+    except _Ex as e:
+        return Apartment.bad_apartment()
+
+
+@_api
 def delete_apartment(apartment_id: int) -> ReturnValue:
-    if apartment_id <= 0:
+    if not _positive(apartment_id):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(f"DELETE FROM {M_A_TABLE_NAME} WHERE {M_A_id}={{ID}}").format(
-        ID=sql.Literal(apartment_id)
-    )
-
     try:
-        _delete(_query)
+        _delete(_DELETE_APARTMENT, (apartment_id,))
     except _Ex as e:
         return e.error_code
+    _apartments_written(apartment_id, deleted=True)
     return ReturnValue.OK
 
 
+@_api
 def add_customer(customer: Customer) -> ReturnValue:
-    if not customer.get_customer_id() or customer.get_customer_id() <= 0:
+    if not _valid_customer(customer):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(f"INSERT INTO {M_C_TABLE_NAME}({M_C_id}, {M_C_name}) VALUES({{ID}}, {{Name}})").format(
-        ID=sql.Literal(customer.get_customer_id()),
-        Name=sql.Literal(customer.get_customer_name())
-    )
     try:
-        _insert(_query)
+        _insert(_ADD_CUSTOMER, _customer_row(customer))
     except _Ex as e:
         return e.error_code
+    _customers_written(customer.get_customer_id())
     return ReturnValue.OK
 
 
-def get_customer(customer_id: int) -> Customer:
-    _query = sql.SQL(f"SELECT * FROM {M_C_TABLE_NAME} WHERE {M_C_id}={{ID}}").format(
-        ID=sql.Literal(customer_id),
-    )
-
-    try:
-        rows_effected, result = _get(_query)
-    except _Ex as e:
-        return e.error_code
-
+def _load_customer(customer_id: int) -> Customer:
+    rows_effected, result = _get(_GET_CUSTOMER, (customer_id,))
     if not rows_effected:
         return Customer.bad_customer()
 
     return _result_to_customer_obj(result)
 
 
+@_api
+def get_customer(customer_id: int) -> Customer:
+    try:
+        return _cached(('customer', customer_id), _load_customer, customer_id)
+    except _Ex as e:
+        return e.error_code
+
+
+@_api
 def delete_customer(customer_id: int) -> ReturnValue:
-    if customer_id <= 0:
+    if not _positive(customer_id):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(f"DELETE FROM {M_C_TABLE_NAME} WHERE {M_C_id}={{ID}}").format(
-        ID=sql.Literal(customer_id),
-    )
     try:
-        _delete(_query)
+        _delete(_DELETE_CUSTOMER, (customer_id,))
     except _Ex as e:
         return e.error_code
+    _customers_written(customer_id, deleted=True)
     return ReturnValue.OK
 
 
+@_api
 def owner_owns_apartment(owner_id: int, apartment_id: int) -> ReturnValue:
-    if owner_id <= 0 or apartment_id <= 0:
+    if not _positive(owner_id, apartment_id):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(
-        f"INSERT INTO {M_OwnedBy_TABLE_NAME}({M_OwnedBy_owner_id}, {M_OwnedBy_house_id}) VALUES({{OWNER_ID}}, {{HOUSE_ID}})").format(
-        OWNER_ID=sql.Literal(owner_id),
-        HOUSE_ID=sql.Literal(apartment_id)
-    )
     try:
-        _insert(_query)
+        _insert(_OWNER_OWNS_APARTMENT, (owner_id, apartment_id))
     except _Ex as e:
         return e.error_code
+    _ownership_written(apartment_id)
     return ReturnValue.OK
 
 
+@_api
 def owner_drops_apartment(owner_id: int, apartment_id: int) -> ReturnValue:
-    if owner_id <= 0 or apartment_id <= 0:
+    if not _positive(owner_id, apartment_id):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(
-        f"DELETE FROM {M_OwnedBy_TABLE_NAME} WHERE {M_OwnedBy_owner_id}={{OWNER_ID}} AND {M_OwnedBy_house_id}={{HOUSE_ID}}").format(
-        OWNER_ID=sql.Literal(owner_id),
-        HOUSE_ID=sql.Literal(apartment_id)
-    )
     try:
-        _delete(_query)
+        _delete(_OWNER_DROPS_APARTMENT, (owner_id, apartment_id))
     except _Ex as e:
         return e.error_code
+    _ownership_written(apartment_id)
     return ReturnValue.OK
 
 
+@_api
 def get_owner_apartments(owner_id: int) -> List[Apartment]:
-    _query = sql.SQL(
-        f"SELECT * FROM {M_OwnedBy_TABLE_NAME} "
-        f"LEFT OUTER JOIN {M_A_TABLE_NAME} ON "
-        f"{M_OwnedBy_house_id}={M_A_id} "
-        f"WHERE {M_OwnedBy_owner_id}={{ID}} "
-    ).format(ID=sql.Literal(owner_id), )
-
     try:
-        rows_effected, result = _get(_query)
+        rows_effected, result = _get(_GET_OWNER_APARTMENTS, (owner_id,))
     except _Ex as e:
         return e.error_code
     if not rows_effected:
         return []
 
-    return [_result_to_apartment_obj(r) for r in result if result]
+    return _result_to_apartment_objs(result)
 
 
-def get_apartment_owner(apartment_id: int) -> Owner:
-    _query = sql.SQL(
-        f"SELECT * FROM {M_OwnedBy_TABLE_NAME} LEFT OUTER JOIN {M_O_TABLE_NAME} ON {M_OwnedBy_owner_id} = {M_O_id} WHERE {M_OwnedBy_house_id}={{ID}}").format(
-        ID=sql.Literal(apartment_id),
-    )
-
-    try:
-        rows_effected, result = _get(_query)
-    except _Ex as e:
-        return e.error_code
+def _load_apartment_owner(apartment_id: int) -> Owner:
+    rows_effected, result = _get(_GET_APARTMENT_OWNER, (apartment_id,))
     if not rows_effected:
         return Owner.bad_owner()
 
     return _result_to_owner_obj(result)
 
 
+@_api
+def get_apartment_owner(apartment_id: int) -> Owner:
+    try:
+        return _cached(('apartment_owner', apartment_id), _load_apartment_owner, apartment_id)
+    except _Ex as e:
+        return e.error_code
+
+
+@_api
 def customer_made_reservation(customer_id: int, apartment_id: int, start_date: date, end_date: date,
                               total_price: float) -> ReturnValue:
-    if customer_id <= 0 or apartment_id <= 0 or total_price <= 0:
+    if not _valid_reservation(customer_id, apartment_id, total_price):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(f"INSERT INTO {M_Res_TABLE_NAME} "
-                     f"SELECT {{{M_Res_cid}}}, {{{M_Res_hid}}}, {{{M_Res_start_date}}}, {{{M_Res_end_date}}}, {{{M_Res_total_price}}} "
-                     f"WHERE NOT EXISTS (SELECT 1 FROM {M_Res_TABLE_NAME} AS Res WHERE {{{M_Res_hid}}} = Res.{M_Res_hid} AND "
-                     f"({{{M_Res_start_date}}}, {{{M_Res_end_date}}}) OVERLAPS (Res.{M_Res_start_date}, Res.{M_Res_end_date}))").format(
-        customer_id=sql.Literal(customer_id),
-        apartment_id=sql.Literal(apartment_id),
-        start_date=sql.Literal(start_date),
-        end_date=sql.Literal(end_date),
-        total_price=sql.Literal(total_price))
-    try:
-        num_of_rows_changed, _ = _insert(_query)
+    try:
+        num_of_rows_changed, _ = _insert(_reservation_statement(),
+                                         (customer_id, apartment_id, start_date, end_date, total_price))
         if num_of_rows_changed == 0: return ReturnValue.BAD_PARAMS
     except _Ex as e:
-        return e.error_code
+        return _reservation_error(e.error_code)
+    _stays_written()
     return ReturnValue.OK
 
 
+@_api
 def customer_cancelled_reservation(customer_id: int, apartment_id: int, start_date: date) -> ReturnValue:
-    if customer_id <= 0 or apartment_id <= 0:
+    if not _positive(customer_id, apartment_id):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(
-        f"DELETE FROM {M_Res_TABLE_NAME} WHERE {M_Res_cid}={{CID}} AND {M_Res_hid}={{HID}} AND {M_Res_start_date}={{START_DATE}}"
-    ).format(
-        CID=sql.Literal(customer_id),
-        HID=sql.Literal(apartment_id),
-        START_DATE=sql.Literal(start_date),
-    )
-
     try:
-        _delete(_query)
+        _delete(_CUSTOMER_CANCELLED_RESERVATION, (customer_id, apartment_id, start_date))
     except _Ex as e:
         return e.error_code
+    _stays_written()
     return ReturnValue.OK
 
 
+@_api
 def customer_reviewed_apartment(customer_id: int, apartment_id: int, review_date: date, rating: int,
                                 review_text: str) -> ReturnValue:
-    if customer_id <= 0 or apartment_id <= 0 or rating < 1 or rating > 10:
+    if not _valid_review(customer_id, apartment_id, rating):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(
-        f"INSERT INTO {M_Rev_TABLE_NAME} "
-        f"SELECT {{cid}}, {{hid}}, {{DATE}}, {{RATING}}, {{TEXT}} "
-        f"WHERE EXISTS (SELECT 1 FROM {M_Res_TABLE_NAME} AS Res "
-        f"WHERE {M_Rev_hid} = {{hid}} "
-        f"AND Res.{M_Res_end_date} <= {{DATE}} "
-        f"AND {M_Rev_cid} = {{cid}} )"
-    ).format(
-        cid=sql.Literal(customer_id),
-        hid=sql.Literal(apartment_id),
-        DATE=sql.Literal(review_date),
-        RATING=sql.Literal(rating),
-        TEXT=sql.Literal(review_text)
-    )
-
     try:
-        _rows_effected, _ = _insert(_query)
+        _rows_effected, _ = _insert(_CUSTOMER_REVIEWED_APARTMENT,
+                                    (customer_id, apartment_id, review_date, rating, review_text))
     except _Ex as e:
         return e.error_code
 
     if not _rows_effected:
         return ReturnValue.NOT_EXISTS
 
+    _stays_written()
     return ReturnValue.OK
 
 
+@_api
 def customer_updated_review(customer_id: int, apartment_id: int, update_date: date, new_rating: int,
                             new_text: str) -> ReturnValue:
-    if customer_id <= 0 or apartment_id <= 0 or new_rating < 1 or new_rating > 10:
+    if not _valid_review(customer_id, apartment_id, new_rating):
         return ReturnValue.BAD_PARAMS
 
-    _query = sql.SQL(
-        f"UPDATE {M_Rev_TABLE_NAME} "
-        f" SET "
-        f" {M_Rev_rating}={{RATING}},"
-        f" {M_Rev_review_text}={{TEXT}},"
-        f" {M_Rev_review_date}={{DATE}}"  # TODO: do we need to update time or override? and constrain update date > date 
-        f" WHERE {M_Rev_cid}={{CID}} AND {M_Rev_hid}={{HID}} AND {M_Rev_review_date} <= {{DATE}}"
-    ).format(
-        CID=sql.Literal(customer_id),
-        HID=sql.Literal(apartment_id),
-        DATE=sql.Literal(update_date),
-        RATING=sql.Literal(new_rating),
-        TEXT=sql.Literal(new_text)
-    )
     try:
-        _update(_query)
+        _update(_CUSTOMER_UPDATED_REVIEW, (customer_id, apartment_id, update_date, new_rating, new_text))
     except _Ex as e:
         return e.error_code
+    _stays_written()
     return ReturnValue.OK
 
 
+@_api
 def reservations_per_owner() -> List[Tuple[str, int]]:
-    _query = sql.SQL(
-        f"SELECT {M_O_TABLE_NAME}.{M_O_name}, {M_O_TABLE_NAME}.{M_O_id}, COUNT ({M_Res_TABLE_NAME}.{M_Res_total_price}) as res_count"
+    try:
+        rows_effected, result = _get(_RESERVATIONS_PER_OWNER)
+    except _Ex as e:
+        return e.error_code
+
+    return [(r[M_C_name], r['res_count']) for r in result]
 
-        f" FROM {M_O_TABLE_NAME} "
 
-        f" LEFT OUTER JOIN {M_OwnedBy_TABLE_NAME} "
-        f" ON {M_OwnedBy_TABLE_NAME}.{M_OwnedBy_owner_id} = {M_O_TABLE_NAME}.{M_O_id} "
+@_api
+def get_top_customer() -> Customer:
+    try:
+        rows_effected, result = _get(_GET_TOP_CUSTOMERS, (1,))
+    except _Ex as e:
+        return e.error_code
 
-        f" LEFT OUTER JOIN {M_Res_TABLE_NAME} "
-        f" ON {M_Res_TABLE_NAME}.{M_Res_hid} = {M_OwnedBy_TABLE_NAME}.{M_OwnedBy_house_id} "
+    return _result_to_customer_obj(result)
 
 
-        f" GROUP BY {M_O_TABLE_NAME}.{M_O_id}, {M_O_TABLE_NAME}.{M_O_name}"
-    )
+# the k customers with the most reservations, most first and ties by id, customers without reservations are left out
+@_api
+def get_top_customers(k: int) -> List[Customer]:
+    if k <= 0:
+        return []
 
     try:
-        rows_effected, result = _get(_query)
+        rows_effected, result = _get(_GET_TOP_CUSTOMERS, (k,))
     except _Ex as e:
         return e.error_code
 
-    return [(r[M_C_name], r['res_count']) for r in result]
+    return _result_to_customer_objs(result)
 
 
-def get_top_customer() -> Customer:
-    _query = sql.SQL(
-        f"SELECT {M_C_id}, {M_C_name}, COUNT ({M_C_id})"
-
-        f" FROM {M_Res_TABLE_NAME} "
-        f" LEFT OUTER JOIN {M_C_TABLE_NAME} "
-        f" ON {M_Res_TABLE_NAME}.{M_Res_cid} = {M_C_TABLE_NAME}.{M_C_id} "
-        f" GROUP BY {M_C_TABLE_NAME}.{M_C_id}"
-        f" ORDER BY count DESC, {M_C_id} "
-        f" LIMIT 1"
-    )
+# profit is 15% of the revenue of the reservations ending in the month, months without any are 0
+def _profit_per_month(result: Connector.ResultSet, start_year: int, end_year: int) -> List[Tuple[int, int, float]]:
+    revenue = {(r['year'], r['month']): r['revenue'] for r in result}
+    return [(year, month, revenue.get((year, month), 0) * 0.15)
+            for year in range(start_year, end_year + 1) for month in range(1, 13)]
 
-    # TODO: can we use limit here or do we need to do double select?
 
+@_api
+def profit_per_month(year: int) -> List[Tuple[int, float]]:
     try:
-        rows_effected, result = _get(_query)
+        rows_effected, result = _get(_MONTHLY_REVENUE, (year, year))
     except _Ex as e:
         return e.error_code
 
-    return _result_to_customer_obj(result)
-
+    return [(month, profit) for _, month, profit in _profit_per_month(result, year, year)]
 
-def profit_per_month(year: int) -> List[Tuple[int, float]]:
-    # we will add a dummy res with price of 0 for all houses it won't affect apt with res
-    _query = sql.SQL(
-        f'''
-SELECT EXTRACT(MONTH FROM end_date) as month, (SUM(total_price))*0.15 as profit FROM ( 
-	
-SELECT * FROM Reservations WHERE EXTRACT(YEAR FROM end_date) = {{YEAR}}
-UNION
-(
-SELECT   Reservations.customer_id, 
-	     Apartment.ID as apartment_id,
-		  Reservations.start_date, 
-	      Reservations.end_date, 
-		  Reservations.total_price
-		  FROM 
-		  Apartment 
-		 ,
-( SELECT  0 AS customer_id,  DATE('{{YEAR}}-01-01') AS start_date,
-generate_series(DATE '{{YEAR}}-01-30', DATE '{{YEAR}}-12-30', interval '1 month') AS end_date,
- 0 AS total_price) as Reservations
-)
-	
-) GROUP BY EXTRACT(MONTH FROM end_date) 
-ORDER BY EXTRACT(MONTH FROM end_date) 
-'''
-    ).format(
-        YEAR=sql.Literal(year),
-    )
 
+# (year, month, profit) of every month from start_year to end_year
+@_api
+def profit_per_month_range(start_year: int, end_year: int) -> List[Tuple[int, int, float]]:
     try:
-        rows_effected, result = _get(_query)
+        rows_effected, result = _get(_MONTHLY_REVENUE, (start_year, end_year))
     except _Ex as e:
         return e.error_code
 
-    return [(r['month'], r['profit']) for r in result]
+    return _profit_per_month(result, start_year, end_year)
 
 
+@_api
 def get_all_location_owners() -> List[Owner]:
-    # TODO: make this query look nicer
-    _query = sql.SQL(
-        f"""
-            SELECT owner_id as OwnerId,  name as Name FROM 
-        (
-        SELECT owner_id, name, COUNT(owner_id) as a FROM
-        (SELECT DISTINCT city, country  FROM public.apartment GROUP BY city, country) AS A
-        LEFT OUTER JOIN apartment
-        ON apartment.city = A.city AND apartment.country = A.country
-        LEFT OUTER JOIN Ownedby
-        ON id = Ownedby.apartment_id
-        LEFT OUTER JOIN owner 
-        ON owner_id = owner.ownerId
-        GROUP BY owner_id, name
-        )
-        WHERE a = (SELECT COUNT(*) FROM (
-        SELECT DISTINCT city, country  FROM public.apartment GROUP BY city, country 
-            ))
-        ORDER BY ownerid
-        """
-    )
-
     try:
-        rows_effected, result = _get(_query)
+        rows_effected, result = _get(_GET_ALL_LOCATION_OWNERS)
     except _Ex as e:
         return e.error_code
-    return [_result_to_owner_obj([r]) for r in result]
+    return _result_to_owner_objs(result)
 
 
+@_api
 def best_value_for_money() -> Apartment:
-    # TODO: rating are counted more than once if someone made more than one reservation
-    _query = sql.SQL(f""" SELECT * FROM
- (SELECT * FROM viewaptvalue  WHERE value>= 0 ORDER BY VALUE DESC LIMIT 1) AS BEST
- LEFT JOIN
- Apartment 
- ON Apartment.id = BEST.apartment_id
-        """)
     #     f"""
     # SELECT * FROM (
     #    SELECT * FROM (SELECT DISTINCT reservations.apartment_id,
@@ -596,29 +1163,62 @@ def best_value_for_money() -> Apartment:
     #     """
 
     try:
-        rows_effected, result = _get(_query)
+        rows_effected, result = _get(_BEST_VALUE_FOR_MONEY)
     except _Ex as e:
         return e.error_code
 
     return _result_to_apartment_obj(result[0])
 
 
+# ---------------------------------- best value leaderboard: ----------------------------------
+# every apartment with a value, best first, kept in process as a snapshot of _BEST_VALUE_APARTMENTS
+# calls inside the refresh window are answered from memory, the snapshot is loaded again once it is older
+# than its ttl or after a write through Solution that can change a value (reservations, reviews and the
+# deletes cascading to them). writes of other processes are only seen after the ttl
+
+
+def _load_leaderboard() -> List[Tuple[Apartment, float]]:
+    rows_effected, result = _get(_BEST_VALUE_APARTMENTS)
+    return [(apartment, float(row[-1])) for apartment, row in zip(_result_to_apartment_objs(result), result.rows)]
+
+
+_leaderboard = Cache.Snapshot(_load_leaderboard, ttl=60.0)
+
+
+def configure_leaderboard(ttl: Optional[float] = 60.0):
+    _leaderboard.ttl = ttl
+    _leaderboard.invalidate()
+
+
+def leaderboard_stats() -> dict:
+    return _leaderboard.stats()
+
+
+# the k apartments with the best value, in the city and country when given, best first and ties by id
+@_api
+def best_value_apartments(k: int, city: str = None, country: str = None) -> List[Tuple[Apartment, float]]:
+    if k <= 0:
+        return []
+
+    try:
+        board = _load_leaderboard() if in_transaction() else _leaderboard.get()
+    except _Ex as e:
+        return e.error_code
+
+    return list(islice(((a, value) for a, value in board
+                        if (city is None or a.get_city() == city) and (country is None or a.get_country() == country)),
+                       k))
+
+
+@_api
 def get_apartment_rating(apartment_id: int) -> float:
     if apartment_id <= 0:
         return 0
 
     # must use view (the same view as get_owner_rating and get_apartment_rating)
 
-    _query = sql.SQL(
-        f"SELECT AVG({M_RevView_rating}) as avg_rating"
-        f" FROM {M_RevView_TABLE_NAME}"
-        f" WHERE {M_RevView_house_id} = {{HID}}"
-        f" GROUP BY {M_RevView_house_id}").format(
-        HID=sql.Literal(apartment_id)
-    )
-
     try:
-        rows_effected, result = _get(_query)
+        rows_effected, result = _get(_GET_APARTMENT_RATING, (apartment_id,))
     except _Ex as e:
         return e.error_code
 
@@ -628,25 +1228,15 @@ def get_apartment_rating(apartment_id: int) -> float:
     return result[0]["avg_rating"]
 
 
+@_api
 def get_owner_rating(owner_id: int) -> float:
     # must use view (the same view as get_owner_rating and get_apartment_rating)
 
     if owner_id <= 0:
         return 0
 
-    _query = sql.SQL(
-        f" SELECT COALESCE(AVG(average_rating),0) as avg_owner_rating "
-        f" FROM ViewAptRating "
-        f" WHERE EXISTS ("
-        f" SELECT 1 FROM {M_OwnedBy_TABLE_NAME} WHERE "
-        f" {M_OwnedBy_TABLE_NAME}.{M_OwnedBy_house_id}=ViewAptRating.{M_OwnedBy_house_id} "
-        f" AND {M_OwnedBy_TABLE_NAME}.{M_OwnedBy_owner_id}={{OID}}"
-        f" )").format(
-        OID=sql.Literal(owner_id)
-    )
-
     try:
-        rows_effected, result = _get(_query)
+        rows_effected, result = _get(_GET_OWNER_RATING, (owner_id,))
     except _Ex as e:
         return e.error_code
 
@@ -659,113 +1249,730 @@ def get_owner_rating(owner_id: int) -> float:
 # ---------------------------------- ADVANCED API: ----------------------------------
 
 
+@_api
 def get_apartment_recommendation(customer_id: int) -> List[Tuple[Apartment, float]]:
-    _query = sql.SQL(
-        f"""
-        SELECT * FROM
-    Apartment INNER JOIN 
-    (
-    SELECT apartment_id, AVG(ratio_rated) FROM
-    (
-        SELECT *, rating, LEAST(GREATEST(rating*ratio_from_user, 1),10) as ratio_rated, apartment_id as hid FROM
-        (
-            Reviews
-            LEFT JOIN
-            (
-                SELECT c1, c2, AVG(ratio) as ratio_from_user FROM
-                    (
-                        SELECT r1.customer_id as c1, r2.customer_id as c2, r1.rating as c1_rate, r2.rating as c2_rate, CAST(r1.rating AS FLOAT) / CAST(r2.rating AS FLOAT) AS ratio , r1.* , r2.* FROM reviews as r1  LEFT OUTER JOIN reviews as r2 On r1.customer_id != r2.customer_id AND r1.apartment_id = r2.apartment_id WHERE r2.customer_id IS NOT NULL AND r1.customer_id = {{CID}} ORDER BY r1.apartment_id
-                    )
-                GROUP BY c1, c2
-            )
-            ON c2=customer_id
-        )
-    )
-    WHERE NOT EXISTS (SELECT * FROM Reviews WHERE Reviews.customer_id = {{CID}} AND hid=Reviews.apartment_id)
-    GROUP BY apartment_id
-    )
-    ON id=apartment_id
-    ORDER BY id
-    """
-    ).format(
-        CID=sql.Literal(customer_id)
-    )
-
     try:
-        rows_effected, result = _get(_query)
+        rows_effected, result = _get(_GET_APARTMENT_RECOMMENDATION, (customer_id,))
     except _Ex as e:
         return e.error_code
 
-    return [(_result_to_apartment_obj(r), float(r['avg'])) for r in result]
+    return [(apartment, float(row[-1])) for apartment, row in zip(_result_to_apartment_objs(result), result.rows)]
+
+
+@_api
+def add_owners(owners: Iterable[Union[Owner, Tuple]]) -> List[ReturnValue]:
+    owners = [o if isinstance(o, Owner) else Owner(*o) for o in owners]
+    rows = [_owner_row(o) for o in owners]
+    results = _bulk_insert(rows, [True] * len(rows), _ADD_OWNERS, _ADD_OWNERS_TEMPLATE, _ADD_OWNER)
+    _owners_written(*[row[0] for row in rows])
+    return results
+
+
+@_api
+def add_apartments(apartments: Iterable[Union[Apartment, Tuple]]) -> List[ReturnValue]:
+    apartments = [a if isinstance(a, Apartment) else Apartment(*a) for a in apartments]
+    rows = [_apartment_row(a) for a in apartments]
+    valid = [_valid_apartment(a) for a in apartments]
+    results = _bulk_insert(rows, valid, _ADD_APARTMENTS, _ADD_APARTMENTS_TEMPLATE, _ADD_APARTMENT)
+    _apartments_written(*[row[0] for row in rows])
+    return results
+
+
+@_api
+def add_customers(customers: Iterable[Union[Customer, Tuple]]) -> List[ReturnValue]:
+    customers = [c if isinstance(c, Customer) else Customer(*c) for c in customers]
+    rows = [_customer_row(c) for c in customers]
+    valid = [_valid_customer(c) for c in customers]
+    results = _bulk_insert(rows, valid, _ADD_CUSTOMERS, _ADD_CUSTOMERS_TEMPLATE, _ADD_CUSTOMER)
+    _customers_written(*[row[0] for row in rows])
+    return results
+
+
+# reservations are (customer_id, apartment_id, start_date, end_date, total_price) tuples
+# a reservation overlapping an existing one, or an earlier one of the batch, gets BAD_PARAMS
+@_api
+def add_reservations(reservations: Iterable[Tuple[int, int, date, date, float]]) -> List[ReturnValue]:
+    rows = [tuple(r) for r in reservations]
+    valid = [_valid_reservation(cid, hid, price) for cid, hid, _, _, price in rows]
+    # rows overlapping each other must be replayed in order, the batched NOT EXISTS only sees older rows
+    fast = not _overlapping([r for r, ok in zip(rows, valid) if ok])
+    results = _bulk_insert(rows, valid, _ADD_RESERVATIONS, _ADD_RESERVATIONS_TEMPLATE, _CUSTOMER_MADE_RESERVATION,
+                           no_rows=ReturnValue.BAD_PARAMS, fast=fast)
+    _stays_written()
+    return results
+
+
+# reviews are (customer_id, apartment_id, review_date, rating, review_text) tuples
+# a review without an earlier stay of the customer in the apartment gets NOT_EXISTS
+@_api
+def add_reviews(reviews: Iterable[Tuple[int, int, date, int, str]]) -> List[ReturnValue]:
+    rows = [tuple(r) for r in reviews]
+    valid = [_valid_review(cid, hid, rating) for cid, hid, _, rating, _ in rows]
+    results = _bulk_insert(rows, valid, _ADD_REVIEWS, _ADD_REVIEWS_TEMPLATE, _CUSTOMER_REVIEWED_APARTMENT,
+                           no_rows=ReturnValue.NOT_EXISTS)
+    _stays_written()
+    return results
+
+
+# ---------------------------------- EXPORTS: ----------------------------------
+# full table scans for offline use, rows are streamed from a server side cursor itersize at a time
+# so memory stays constant, stopping the iteration early releases the cursor and the connection
+
+
+def export_reservations(itersize: int = Connector.DEFAULT_ITERSIZE) -> Iterator[Connector.ResultSetRow]:
+    if _backend is not None:
+        return _backend.export_reservations(itersize)
+    return _stream(_EXPORT_RESERVATIONS, itersize=itersize)
+
+
+def export_reviews(itersize: int = Connector.DEFAULT_ITERSIZE) -> Iterator[Connector.ResultSetRow]:
+    if _backend is not None:
+        return _backend.export_reviews(itersize)
+    return _stream(_EXPORT_REVIEWS, itersize=itersize)
 
 
 # ---------------------------------- 5.1 Basic Database Functions ----------------------------------
 
 
 ALL_TABLES = [M_Rev_TABLE_NAME, M_Res_TABLE_NAME, M_OwnedBy_TABLE_NAME, M_C_TABLE_NAME, M_A_TABLE_NAME, M_O_TABLE_NAME,
-              ]
+              M_MonthlyRevenue_TABLE_NAME, M_RatioPairs_TABLE_NAME, M_Locations_TABLE_NAME, M_OwnerLocations_TABLE_NAME,
+              M_OwnerCoverage_TABLE_NAME, M_LocationTotal_TABLE_NAME, M_ApartmentReservations_TABLE_NAME,
+              M_OwnerReservations_TABLE_NAME, M_CustomerReservations_TABLE_NAME]
 
-ALL_VIEWS = ["ViewAptRating", 'ViewPricePerNight', "ViewAptValue", M_RevView_TABLE_NAME]
+# trigger functions, they outlive the tables of their triggers
+ALL_FUNCTIONS = ['MonthlyRevenue_reservations', 'CustomerRatioPairs_reviews', 'Locations_add', 'OwnerLocations_add',
+                 'Locations_apartment', 'OwnerCoverage_apartment', 'OwnerCoverage_ownedby', 'ReservationCounts_add',
+                 'ReservationCounts_reservations', 'ReservationCounts_ownedby', 'Changes_notify']
 
+ALL_VIEWS = ["ViewAptRating", 'ViewPricePerNight', "ViewAptValue", M_RevView_TABLE_NAME]
 
-def create_tables():
-    quries = [
-        f"CREATE TABLE {M_O_TABLE_NAME}("  # Owner
-        f"{M_O_id} INTEGER PRIMARY KEY CHECK ({M_O_id} > 0),"
-        f" {M_O_name} TEXT NOT NULL)"
-        ,
-
-        f"CREATE TABLE {M_C_TABLE_NAME}("
-        f"{M_C_id} INTEGER PRIMARY KEY CHECK ({M_C_id} > 0),"
-        f" {M_C_name} TEXT NOT NULL)",
-
-        f"CREATE TABLE {M_A_TABLE_NAME}("
-        f" {M_A_id} INTEGER PRIMARY KEY CHECK ({M_A_id} > 0),"
-        f" {M_A_address} TEXT NOT NULL,"
-        f" {M_A_city} TEXT NOT NULL,"
-        f" {M_A_country} TEXT NOT NULL,"
-        f" {M_A_size} int NOT NULL,"
-        f" UNIQUE({M_A_city}, {M_A_address})"
-        f")",
-
-        f"CREATE TABLE {M_OwnedBy_TABLE_NAME}("
-        f"{M_OwnedBy_owner_id} INTEGER NOT NULL,"
-        f" {M_OwnedBy_house_id} INTEGER NOT NULL,"
-        f" PRIMARY KEY({M_OwnedBy_house_id}),"
-        f"FOREIGN KEY ({M_OwnedBy_owner_id}) REFERENCES {M_O_TABLE_NAME}({M_O_id} ) ON DELETE CASCADE ,"
-        f"FOREIGN KEY ({M_OwnedBy_house_id}) REFERENCES {M_A_TABLE_NAME}({M_A_id} ) ON DELETE CASCADE "
-        f")",
-
-        f"CREATE TABLE {M_Res_TABLE_NAME}("
-        f" {M_Res_cid} INTEGER NOT NULL,"
-        f" {M_Res_hid} INTEGER NOT NULL,"
-        f" {M_Res_start_date} DATE NOT NULL,"
-        f" {M_Res_end_date} DATE NOT NULL,"
-        f" {M_Res_total_price} FLOAT NOT NULL,"
-        f" PRIMARY KEY({M_Res_hid}, {M_Res_start_date}, {M_Res_end_date}),"
-        f" FOREIGN KEY ({M_Res_cid}) REFERENCES {M_C_TABLE_NAME}({M_C_id} ) ON DELETE CASCADE ,"
-        f" FOREIGN KEY ({M_Res_hid}) REFERENCES {M_A_TABLE_NAME}({M_A_id} ) ON DELETE CASCADE "
-        f")",
-
-        f"CREATE TABLE {M_Rev_TABLE_NAME}("
-        f" {M_Rev_cid} INTEGER NOT NULL,"
-        f" {M_Rev_hid} INTEGER NOT NULL,"
-        f" {M_Rev_review_date} DATE NOT NULL,"
-        f" {M_Rev_rating} INTEGER NOT NULL,"
-        f" {M_Rev_review_text} TEXT NOT NULL,"
-        f" PRIMARY KEY({M_Rev_cid}, {M_Rev_hid}),"
-        f" FOREIGN KEY ({M_Rev_cid}) REFERENCES {M_C_TABLE_NAME}({M_C_id} ) ON DELETE CASCADE ,"
-        f" FOREIGN KEY ({M_Rev_hid}) REFERENCES {M_A_TABLE_NAME}({M_A_id} ) ON DELETE CASCADE "
-        f")",
-
-        f"CREATE VIEW {M_RevView_TABLE_NAME} "
-        f" AS"
-        f" SELECT {M_Rev_TABLE_NAME}.{M_Rev_hid}, {M_OwnedBy_owner_id}, {M_Rev_rating}"
-        f" FROM {M_Rev_TABLE_NAME}"
-        f" LEFT OUTER JOIN {M_OwnedBy_TABLE_NAME}"
-        f" ON {M_Rev_TABLE_NAME}.{M_Rev_hid} = {M_OwnedBy_TABLE_NAME}.{M_OwnedBy_house_id} ",
-
-        f""" CREATE VIEW ViewAptRating AS
+# secondary indexes on the columns the queries filter and join by, the primary keys cover the rest
+# (name, table, columns), dropped together with their table
+ALL_INDEXES = [
+    ('Reservations_customer_id_idx', M_Res_TABLE_NAME, (M_Res_cid,)),
+    ('Reservations_end_date_idx', M_Res_TABLE_NAME, (M_Res_end_date,)),
+    ('Reviews_apartment_id_idx', M_Rev_TABLE_NAME, (M_Rev_hid,)),
+    ('OwnedBy_owner_id_idx', M_OwnedBy_TABLE_NAME, (M_OwnedBy_owner_id,)),
+    ('Apartment_city_country_idx', M_A_TABLE_NAME, (M_A_city, M_A_country)),
+]
+
+# (year, month) -> revenue rollup of the reservations by the month of their end_date, kept current by a trigger
+# an insert adds to its month, a delete or update re-aggregates the months it touches through the end_date
+# index, subtracting floats would drift
+MONTHLY_REVENUE_DDL = [
+    f"CREATE TABLE {M_MonthlyRevenue_TABLE_NAME}("
+    f" year INTEGER NOT NULL,"
+    f" month INTEGER NOT NULL,"
+    f" revenue FLOAT NOT NULL,"
+    f" res_count INTEGER NOT NULL,"
+    f" PRIMARY KEY(year, month))",
+
+    f"""CREATE FUNCTION MonthlyRevenue_reservations() RETURNS trigger AS $$
+DECLARE
+    month_start DATE;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO {M_MonthlyRevenue_TABLE_NAME}(year, month, revenue, res_count)
+        VALUES (EXTRACT(YEAR FROM NEW.{M_Res_end_date}), EXTRACT(MONTH FROM NEW.{M_Res_end_date}), NEW.{M_Res_total_price}, 1)
+        ON CONFLICT (year, month) DO UPDATE
+        SET revenue = {M_MonthlyRevenue_TABLE_NAME}.revenue + EXCLUDED.revenue,
+            res_count = {M_MonthlyRevenue_TABLE_NAME}.res_count + 1;
+        RETURN NULL;
+    END IF;
+    FOREACH month_start IN ARRAY CASE WHEN TG_OP = 'DELETE' THEN ARRAY[date_trunc('month', OLD.{M_Res_end_date})::DATE]
+        ELSE ARRAY[date_trunc('month', OLD.{M_Res_end_date})::DATE, date_trunc('month', NEW.{M_Res_end_date})::DATE] END
+    LOOP
+        DELETE FROM {M_MonthlyRevenue_TABLE_NAME}
+        WHERE year = EXTRACT(YEAR FROM month_start) AND month = EXTRACT(MONTH FROM month_start);
+        INSERT INTO {M_MonthlyRevenue_TABLE_NAME}(year, month, revenue, res_count)
+        SELECT EXTRACT(YEAR FROM month_start), EXTRACT(MONTH FROM month_start), SUM({M_Res_total_price}), COUNT(*)
+        FROM {M_Res_TABLE_NAME}
+        WHERE {M_Res_end_date} >= month_start AND {M_Res_end_date} < (month_start + INTERVAL '1 month')::DATE
+        HAVING COUNT(*) > 0;
+    END LOOP;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+
+    f"CREATE TRIGGER MonthlyRevenue_reservations AFTER INSERT OR UPDATE OF {M_Res_end_date}, {M_Res_total_price} OR DELETE"
+    f" ON {M_Res_TABLE_NAME} FOR EACH ROW EXECUTE FUNCTION MonthlyRevenue_reservations()",
+
+    # rows already in the table
+    f"INSERT INTO {M_MonthlyRevenue_TABLE_NAME}(year, month, revenue, res_count)"
+    f" SELECT EXTRACT(YEAR FROM {M_Res_end_date}), EXTRACT(MONTH FROM {M_Res_end_date}), SUM({M_Res_total_price}), COUNT(*)"
+    f" FROM {M_Res_TABLE_NAME} GROUP BY 1, 2",
+]
+
+# (c1, c2) -> ratios of the ratings of c1 to the ratings of c2 over the apartments both reviewed, kept current
+# by statement triggers on Reviews, so a recommendation reads the ratios of one customer with an index probe on c1
+# ratings are 1..10, so rating1 / rating2 is the integer rating1 * (2520 / rating2) over 2520 (the lcm of 1..10),
+# ratio_sum holds the sum of those integers and stays exact under deletes and updates
+# the triggers see the changed rows of the whole statement through transition tables, a bulk insert counts a pair
+# of its own rows once. they lock the apartments of the changed rows for the transaction, so reviews of the same
+# apartment committing concurrently still see each other
+
+
+# ordered pairs of reviews of the same apartment in rows with at least one of the two in changed,
+# summed by (c1, c2). rows and changed are relations with the columns of Reviews
+def _ratio_pairs(rows: str, changed: str) -> str:
+    return f"""
+        SELECT A.{M_Rev_cid} AS c1, B.{M_Rev_cid} AS c2,
+            SUM(A.{M_Rev_rating} * (2520 / B.{M_Rev_rating})) AS ratio_sum, COUNT(*) AS pair_count
+        FROM {rows} AS A JOIN {rows} AS B ON A.{M_Rev_hid} = B.{M_Rev_hid} AND A.{M_Rev_cid} <> B.{M_Rev_cid}
+        WHERE A.{M_Rev_hid} IN (SELECT {M_Rev_hid} FROM {changed})
+            AND (EXISTS (SELECT 1 FROM {changed} AS C WHERE C.{M_Rev_cid} = A.{M_Rev_cid} AND C.{M_Rev_hid} = A.{M_Rev_hid})
+              OR EXISTS (SELECT 1 FROM {changed} AS C WHERE C.{M_Rev_cid} = B.{M_Rev_cid} AND C.{M_Rev_hid} = B.{M_Rev_hid}))
+        GROUP BY A.{M_Rev_cid}, B.{M_Rev_cid}"""
+
+
+def _ratio_pairs_add(changed: str) -> str:
+    return f"""
+        INSERT INTO {M_RatioPairs_TABLE_NAME} AS P(c1, c2, ratio_sum, pair_count) {_ratio_pairs(M_Rev_TABLE_NAME, changed)}
+        ON CONFLICT (c1, c2) DO UPDATE
+        SET ratio_sum = P.ratio_sum + EXCLUDED.ratio_sum, pair_count = P.pair_count + EXCLUDED.pair_count;"""
+
+
+# rows is the table as it was before the statement
+def _ratio_pairs_remove(rows: str, changed: str) -> str:
+    return f"""
+        WITH removed AS (
+            UPDATE {M_RatioPairs_TABLE_NAME} AS P
+            SET ratio_sum = P.ratio_sum - D.ratio_sum, pair_count = P.pair_count - D.pair_count
+            FROM ({_ratio_pairs(rows, changed)}) AS D
+            WHERE P.c1 = D.c1 AND P.c2 = D.c2
+            RETURNING P.c1, P.c2, P.pair_count)
+        SELECT COALESCE(array_agg(c1), '{{}}'), COALESCE(array_agg(c2), '{{}}') INTO empty_c1, empty_c2
+        FROM removed WHERE pair_count = 0;
+        DELETE FROM {M_RatioPairs_TABLE_NAME}
+        WHERE (c1, c2) IN (SELECT * FROM unnest(empty_c1, empty_c2));"""
+
+
+def _ratio_pairs_lock(changed: str) -> str:
+    return f"""
+        PERFORM pg_advisory_xact_lock('{M_RatioPairs_TABLE_NAME}'::regclass::oid::INTEGER, {M_Rev_hid})
+        FROM (SELECT DISTINCT {M_Rev_hid} FROM {changed} ORDER BY {M_Rev_hid}) AS L;"""
+
+
+_REVIEWS_BEFORE_UPDATE = f"""(
+            SELECT * FROM {M_Rev_TABLE_NAME} AS R WHERE NOT EXISTS (SELECT 1 FROM new_rows AS N
+                WHERE N.{M_Rev_cid} = R.{M_Rev_cid} AND N.{M_Rev_hid} = R.{M_Rev_hid})
+            UNION ALL SELECT * FROM old_rows)"""
+
+RATIO_PAIRS_DDL = [
+    f"CREATE TABLE {M_RatioPairs_TABLE_NAME}("
+    f" c1 INTEGER NOT NULL,"
+    f" c2 INTEGER NOT NULL,"
+    f" ratio_sum BIGINT NOT NULL,"
+    f" pair_count INTEGER NOT NULL,"
+    f" PRIMARY KEY(c1, c2))",
+
+    f"""CREATE FUNCTION CustomerRatioPairs_reviews() RETURNS trigger AS $$
+DECLARE
+    empty_c1 INTEGER[];
+    empty_c2 INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN{_ratio_pairs_lock('new_rows')}{_ratio_pairs_add('new_rows')}
+    ELSIF TG_OP = 'DELETE' THEN{_ratio_pairs_lock('old_rows')}{_ratio_pairs_remove(
+        f"(SELECT * FROM {M_Rev_TABLE_NAME} UNION ALL SELECT * FROM old_rows)", 'old_rows')}
+    ELSE{_ratio_pairs_lock(f"(SELECT {M_Rev_hid} FROM old_rows UNION SELECT {M_Rev_hid} FROM new_rows)")}{
+        _ratio_pairs_remove(_REVIEWS_BEFORE_UPDATE, 'old_rows')}{_ratio_pairs_add('new_rows')}
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+
+    f"CREATE TRIGGER CustomerRatioPairs_insert AFTER INSERT ON {M_Rev_TABLE_NAME}"
+    f" REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION CustomerRatioPairs_reviews()",
+    f"CREATE TRIGGER CustomerRatioPairs_update AFTER UPDATE ON {M_Rev_TABLE_NAME}"
+    f" REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT"
+    f" EXECUTE FUNCTION CustomerRatioPairs_reviews()",
+    f"CREATE TRIGGER CustomerRatioPairs_delete AFTER DELETE ON {M_Rev_TABLE_NAME}"
+    f" REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION CustomerRatioPairs_reviews()",
+
+    # rows already in the table
+    f"INSERT INTO {M_RatioPairs_TABLE_NAME}(c1, c2, ratio_sum, pair_count)"
+    f" SELECT R1.{M_Rev_cid}, R2.{M_Rev_cid}, SUM(R1.{M_Rev_rating} * (2520 / R2.{M_Rev_rating})), COUNT(*)"
+    f" FROM {M_Rev_TABLE_NAME} AS R1 JOIN {M_Rev_TABLE_NAME} AS R2"
+    f" ON R1.{M_Rev_hid} = R2.{M_Rev_hid} AND R1.{M_Rev_cid} <> R2.{M_Rev_cid}"
+    f" GROUP BY R1.{M_Rev_cid}, R2.{M_Rev_cid}",
+]
+
+# location coverage of the owners, kept current by triggers on Apartment and OwnedBy
+#   Locations - apartments per distinct (city, country), LocationTotal - its single row counts the locations
+#   OwnerLocations - apartments of an owner per location, OwnerCoverage - locations per owner, indexed by the count
+# a count reaching zero deletes its row. an apartment is taken off its owner before it is deleted, the cascaded
+# delete of its OwnedBy row no longer finds the apartment and does nothing
+LOCATION_COVERAGE_DDL = [
+    f"CREATE TABLE {M_Locations_TABLE_NAME}("
+    f" {M_A_city} TEXT NOT NULL,"
+    f" {M_A_country} TEXT NOT NULL,"
+    f" apartment_count INTEGER NOT NULL,"
+    f" PRIMARY KEY({M_A_city}, {M_A_country}))",
+
+    f"CREATE TABLE {M_LocationTotal_TABLE_NAME}("
+    f" id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),"
+    f" location_count INTEGER NOT NULL)",
+
+    f"CREATE TABLE {M_OwnerLocations_TABLE_NAME}("
+    f" owner_id INTEGER NOT NULL,"
+    f" {M_A_city} TEXT NOT NULL,"
+    f" {M_A_country} TEXT NOT NULL,"
+    f" apartment_count INTEGER NOT NULL,"
+    f" PRIMARY KEY(owner_id, {M_A_city}, {M_A_country}))",
+
+    f"CREATE TABLE {M_OwnerCoverage_TABLE_NAME}("
+    f" owner_id INTEGER PRIMARY KEY,"
+    f" location_count INTEGER NOT NULL)",
+
+    f"CREATE INDEX OwnerCoverage_location_count_idx ON {M_OwnerCoverage_TABLE_NAME}(location_count)",
+
+    # delta is 1 or -1, the location count moves when the apartment count leaves or reaches zero
+    f"""CREATE FUNCTION Locations_add(location_city TEXT, location_country TEXT, delta INTEGER) RETURNS void AS $$
+DECLARE
+    apartments INTEGER;
+BEGIN
+    INSERT INTO {M_Locations_TABLE_NAME} AS L({M_A_city}, {M_A_country}, apartment_count)
+    VALUES (location_city, location_country, delta)
+    ON CONFLICT ({M_A_city}, {M_A_country}) DO UPDATE SET apartment_count = L.apartment_count + delta
+    RETURNING apartment_count INTO apartments;
+    IF apartments = 0 THEN
+        DELETE FROM {M_Locations_TABLE_NAME} WHERE {M_A_city} = location_city AND {M_A_country} = location_country;
+    END IF;
+    IF apartments = 0 OR (apartments = 1 AND delta = 1) THEN
+        INSERT INTO {M_LocationTotal_TABLE_NAME} AS T(location_count) VALUES (delta)
+        ON CONFLICT (id) DO UPDATE SET location_count = T.location_count + delta;
+    END IF;
+END $$ LANGUAGE plpgsql""",
+
+    f"""CREATE FUNCTION OwnerLocations_add(owner INTEGER, location_city TEXT, location_country TEXT, delta INTEGER)
+RETURNS void AS $$
+DECLARE
+    apartments INTEGER;
+    locations INTEGER;
+BEGIN
+    INSERT INTO {M_OwnerLocations_TABLE_NAME} AS L(owner_id, {M_A_city}, {M_A_country}, apartment_count)
+    VALUES (owner, location_city, location_country, delta)
+    ON CONFLICT (owner_id, {M_A_city}, {M_A_country}) DO UPDATE SET apartment_count = L.apartment_count + delta
+    RETURNING apartment_count INTO apartments;
+    IF apartments = 0 THEN
+        DELETE FROM {M_OwnerLocations_TABLE_NAME}
+        WHERE owner_id = owner AND {M_A_city} = location_city AND {M_A_country} = location_country;
+    END IF;
+    IF apartments = 0 OR (apartments = 1 AND delta = 1) THEN
+        INSERT INTO {M_OwnerCoverage_TABLE_NAME} AS C(owner_id, location_count) VALUES (owner, delta)
+        ON CONFLICT (owner_id) DO UPDATE SET location_count = C.location_count + delta
+        RETURNING location_count INTO locations;
+        IF locations = 0 THEN
+            DELETE FROM {M_OwnerCoverage_TABLE_NAME} WHERE owner_id = owner;
+        END IF;
+    END IF;
+END $$ LANGUAGE plpgsql""",
+
+    f"""CREATE FUNCTION Locations_apartment() RETURNS trigger AS $$
+DECLARE
+    owner INTEGER;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM Locations_add(OLD.{M_A_city}, OLD.{M_A_country}, -1);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM Locations_add(NEW.{M_A_city}, NEW.{M_A_country}, 1);
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        SELECT {M_OwnedBy_owner_id} INTO owner FROM {M_OwnedBy_TABLE_NAME} WHERE {M_OwnedBy_house_id} = NEW.{M_A_id};
+        IF FOUND THEN
+            PERFORM OwnerLocations_add(owner, OLD.{M_A_city}, OLD.{M_A_country}, -1);
+            PERFORM OwnerLocations_add(owner, NEW.{M_A_city}, NEW.{M_A_country}, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+
+    f"""CREATE FUNCTION OwnerCoverage_apartment() RETURNS trigger AS $$
+DECLARE
+    owner INTEGER;
+BEGIN
+    SELECT {M_OwnedBy_owner_id} INTO owner FROM {M_OwnedBy_TABLE_NAME} WHERE {M_OwnedBy_house_id} = OLD.{M_A_id};
+    IF FOUND THEN
+        PERFORM OwnerLocations_add(owner, OLD.{M_A_city}, OLD.{M_A_country}, -1);
+    END IF;
+    RETURN OLD;
+END $$ LANGUAGE plpgsql""",
+
+    f"""CREATE FUNCTION OwnerCoverage_ownedby() RETURNS trigger AS $$
+DECLARE
+    apartment RECORD;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        SELECT {M_A_city}, {M_A_country} INTO apartment FROM {M_A_TABLE_NAME} WHERE {M_A_id} = OLD.{M_OwnedBy_house_id};
+        IF FOUND THEN
+            PERFORM OwnerLocations_add(OLD.{M_OwnedBy_owner_id}, apartment.{M_A_city}, apartment.{M_A_country}, -1);
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        SELECT {M_A_city}, {M_A_country} INTO apartment FROM {M_A_TABLE_NAME} WHERE {M_A_id} = NEW.{M_OwnedBy_house_id};
+        PERFORM OwnerLocations_add(NEW.{M_OwnedBy_owner_id}, apartment.{M_A_city}, apartment.{M_A_country}, 1);
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+
+    f"CREATE TRIGGER Locations_apartment AFTER INSERT OR UPDATE OF {M_A_city}, {M_A_country} OR DELETE"
+    f" ON {M_A_TABLE_NAME} FOR EACH ROW EXECUTE FUNCTION Locations_apartment()",
+    f"CREATE TRIGGER OwnerCoverage_apartment BEFORE DELETE"
+    f" ON {M_A_TABLE_NAME} FOR EACH ROW EXECUTE FUNCTION OwnerCoverage_apartment()",
+    f"CREATE TRIGGER OwnerCoverage_ownedby AFTER INSERT OR UPDATE OR DELETE"
+    f" ON {M_OwnedBy_TABLE_NAME} FOR EACH ROW EXECUTE FUNCTION OwnerCoverage_ownedby()",
+
+    # rows already in the tables
+    f"INSERT INTO {M_Locations_TABLE_NAME}({M_A_city}, {M_A_country}, apartment_count)"
+    f" SELECT {M_A_city}, {M_A_country}, COUNT(*) FROM {M_A_TABLE_NAME} GROUP BY {M_A_city}, {M_A_country}",
+    f"INSERT INTO {M_LocationTotal_TABLE_NAME}(location_count) SELECT COUNT(*) FROM {M_Locations_TABLE_NAME}",
+    f"INSERT INTO {M_OwnerLocations_TABLE_NAME}(owner_id, {M_A_city}, {M_A_country}, apartment_count)"
+    f" SELECT {M_OwnedBy_owner_id}, {M_A_city}, {M_A_country}, COUNT(*)"
+    f" FROM {M_OwnedBy_TABLE_NAME} INNER JOIN {M_A_TABLE_NAME} ON {M_OwnedBy_house_id} = {M_A_id}"
+    f" GROUP BY {M_OwnedBy_owner_id}, {M_A_city}, {M_A_country}",
+    f"INSERT INTO {M_OwnerCoverage_TABLE_NAME}(owner_id, location_count)"
+    f" SELECT owner_id, COUNT(*) FROM {M_OwnerLocations_TABLE_NAME} GROUP BY owner_id",
+]
+
+# reservation counters kept current by triggers on Reservations and OwnedBy
+#   ApartmentReservations and CustomerReservations - reservations per apartment and per customer
+#   OwnerReservations - reservations of the apartments an owner owns, an ownership moves the count of its apartment
+# a count reaching zero deletes its row. a deleted apartment cascades to both its reservations and its ownership,
+# in either order the owner loses each reservation once
+
+
+# plpgsql adding delta to the res_count of key, the row is created on the first and deleted on the last
+def _counter_add(table: str, key_column: str, key: str, delta: str) -> str:
+    return f"""
+    INSERT INTO {table} AS T({key_column}, res_count) VALUES ({key}, {delta})
+    ON CONFLICT ({key_column}) DO UPDATE SET res_count = T.res_count + EXCLUDED.res_count;
+    DELETE FROM {table} WHERE {key_column} = {key} AND res_count = 0;"""
+
+
+RESERVATION_COUNTS_DDL = [
+    f"CREATE TABLE {M_ApartmentReservations_TABLE_NAME}("
+    f" apartment_id INTEGER PRIMARY KEY,"
+    f" res_count INTEGER NOT NULL)",
+
+    f"CREATE TABLE {M_OwnerReservations_TABLE_NAME}("
+    f" owner_id INTEGER PRIMARY KEY,"
+    f" res_count INTEGER NOT NULL)",
+
+    f"CREATE TABLE {M_CustomerReservations_TABLE_NAME}("
+    f" customer_id INTEGER PRIMARY KEY,"
+    f" res_count INTEGER NOT NULL)",
+
+    f"CREATE INDEX CustomerReservations_res_count_idx"
+    f" ON {M_CustomerReservations_TABLE_NAME}(res_count DESC, customer_id)",
+
+    f"""CREATE FUNCTION ReservationCounts_add(customer INTEGER, apartment INTEGER, delta INTEGER) RETURNS void AS $$
+DECLARE
+    owner INTEGER;
+BEGIN{_counter_add(M_CustomerReservations_TABLE_NAME, 'customer_id', 'customer', 'delta')}{
+        _counter_add(M_ApartmentReservations_TABLE_NAME, 'apartment_id', 'apartment', 'delta')}
+    SELECT {M_OwnedBy_owner_id} INTO owner FROM {M_OwnedBy_TABLE_NAME} WHERE {M_OwnedBy_house_id} = apartment;
+    IF FOUND THEN{_counter_add(M_OwnerReservations_TABLE_NAME, 'owner_id', 'owner', 'delta')}
+    END IF;
+END $$ LANGUAGE plpgsql""",
+
+    f"""CREATE FUNCTION ReservationCounts_reservations() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM ReservationCounts_add(OLD.{M_Res_cid}, OLD.{M_Res_hid}, -1);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM ReservationCounts_add(NEW.{M_Res_cid}, NEW.{M_Res_hid}, 1);
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+
+    f"""CREATE FUNCTION ReservationCounts_ownedby() RETURNS trigger AS $$
+DECLARE
+    reservations INTEGER;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        SELECT res_count INTO reservations FROM {M_ApartmentReservations_TABLE_NAME}
+        WHERE apartment_id = OLD.{M_OwnedBy_house_id};
+        IF FOUND THEN{_counter_add(M_OwnerReservations_TABLE_NAME, 'owner_id', f'OLD.{M_OwnedBy_owner_id}', '-reservations')}
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        SELECT res_count INTO reservations FROM {M_ApartmentReservations_TABLE_NAME}
+        WHERE apartment_id = NEW.{M_OwnedBy_house_id};
+        IF FOUND THEN{_counter_add(M_OwnerReservations_TABLE_NAME, 'owner_id', f'NEW.{M_OwnedBy_owner_id}', 'reservations')}
+        END IF;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+
+    f"CREATE TRIGGER ReservationCounts_reservations AFTER INSERT OR UPDATE OF {M_Res_cid}, {M_Res_hid} OR DELETE"
+    f" ON {M_Res_TABLE_NAME} FOR EACH ROW EXECUTE FUNCTION ReservationCounts_reservations()",
+    f"CREATE TRIGGER ReservationCounts_ownedby AFTER INSERT OR UPDATE OR DELETE"
+    f" ON {M_OwnedBy_TABLE_NAME} FOR EACH ROW EXECUTE FUNCTION ReservationCounts_ownedby()",
+
+    # rows already in the tables
+    f"INSERT INTO {M_ApartmentReservations_TABLE_NAME}(apartment_id, res_count)"
+    f" SELECT {M_Res_hid}, COUNT(*) FROM {M_Res_TABLE_NAME} GROUP BY {M_Res_hid}",
+    f"INSERT INTO {M_CustomerReservations_TABLE_NAME}(customer_id, res_count)"
+    f" SELECT {M_Res_cid}, COUNT(*) FROM {M_Res_TABLE_NAME} GROUP BY {M_Res_cid}",
+    f"INSERT INTO {M_OwnerReservations_TABLE_NAME}(owner_id, res_count)"
+    f" SELECT {M_OwnedBy_owner_id}, SUM(res_count) FROM {M_OwnedBy_TABLE_NAME}"
+    f" INNER JOIN {M_ApartmentReservations_TABLE_NAME} AS A ON A.apartment_id = {M_OwnedBy_TABLE_NAME}.{M_OwnedBy_house_id}"
+    f" GROUP BY {M_OwnedBy_owner_id}",
+]
+
+# NOTIFY ChangeListener.CHANNEL with the key columns of every row written to the base tables, see Utility.ChangeListener
+# the trigger arguments name the key columns, TRUNCATE sends no keys
+CHANGE_NOTIFY_KEYS = [
+    (M_O_TABLE_NAME, [M_O_id]),
+    (M_A_TABLE_NAME, [M_A_id]),
+    (M_C_TABLE_NAME, [M_C_id]),
+    (M_OwnedBy_TABLE_NAME, [M_OwnedBy_owner_id, M_OwnedBy_house_id]),
+    (M_Res_TABLE_NAME, [M_Res_cid, M_Res_hid, M_Res_start_date]),
+    (M_Rev_TABLE_NAME, [M_Rev_cid, M_Rev_hid]),
+]
+
+CHANGE_NOTIFY_DDL = [
+    f"""CREATE FUNCTION Changes_notify() RETURNS trigger AS $$
+DECLARE
+    old_keys JSONB;
+    new_keys JSONB;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('{ChangeListener.CHANNEL}',
+                          json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'keys', NULL)::TEXT);
+        RETURN NULL;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT jsonb_object_agg(k, to_jsonb(OLD) -> k) INTO old_keys FROM unnest(TG_ARGV) AS k;
+        PERFORM pg_notify('{ChangeListener.CHANNEL}',
+                          json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'keys', old_keys)::TEXT);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        SELECT jsonb_object_agg(k, to_jsonb(NEW) -> k) INTO new_keys FROM unnest(TG_ARGV) AS k;
+        IF new_keys IS DISTINCT FROM old_keys THEN
+            PERFORM pg_notify('{ChangeListener.CHANNEL}',
+                              json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'keys', new_keys)::TEXT);
+        END IF;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+] + [
+    f"CREATE TRIGGER Changes_notify AFTER INSERT OR UPDATE OR DELETE ON {table}"
+    f" FOR EACH ROW EXECUTE FUNCTION Changes_notify({', '.join(repr(column.lower()) for column in columns)})"
+    for table, columns in CHANGE_NOTIFY_KEYS
+] + [
+    f"CREATE TRIGGER Changes_notify_truncate AFTER TRUNCATE ON {table}"
+    f" FOR EACH STATEMENT EXECUTE FUNCTION Changes_notify()"
+    for table, _ in CHANGE_NOTIFY_KEYS
+]
+
+# ---------------------------------- schema options: ----------------------------------
+# optional features of the schema, read by create_tables, so set them before the tables are created
+#   summary_views - ViewAptRating and ViewPricePerNight read summary tables kept current by triggers
+#                   instead of aggregating Reviews and Reservations on every read
+#   exclusion_constraint - Reservations stores the stay as a daterange under a GiST exclusion constraint,
+#                   customer_made_reservation inserts directly and the constraint rejects overlapping stays,
+#                   also between concurrent bookings
+#   change_notify - the base tables NOTIFY every write for the change listeners, set by start_change_listener
+
+SCHEMA_OPTIONS = {
+    'summary_views': False,
+    'exclusion_constraint': False,
+    'change_notify': False,
+}
+
+
+def set_schema_options(**options):
+    for name in options:
+        if name not in SCHEMA_OPTIONS:
+            raise ValueError(f"Unknown schema option {name}")
+    SCHEMA_OPTIONS.update(options)
+
+
+# summary tables behind ViewAptRating and ViewPricePerNight (summary_views option)
+# AptRatingSummary has a row per apartment with its owner and the running sum and count of its ratings,
+# PricePerNightSummary a row per apartment with reservations with the running sum and count of the
+# price per night of its reservations
+# the views keep their names and columns. the rating average is sum / count exactly as AVG computes it (a bigint
+# sum divided as numeric). the price per night of a reservation is summed as numeric, so a write adds or
+# subtracts its own price without any drift whatever the order of the writes, and the average is rounded to
+# float8 once. AVG over the float8 prices rounds at every row instead, the two can differ in the last bits
+SUMMARY_TABLES = ['AptRatingSummary', 'PricePerNightSummary']
+
+SUMMARY_FUNCTIONS = ['AptRatingSummary_apartment', 'AptRatingSummary_owned_by', 'AptRatingSummary_reviews',
+                     'PricePerNightSummary_reservations']
+
+SUMMARY_VIEWS_DDL = [
+    f"CREATE TABLE AptRatingSummary("
+    f" apartment_id INTEGER PRIMARY KEY REFERENCES {M_A_TABLE_NAME}({M_A_id}) ON DELETE CASCADE,"
+    f" owner_id INTEGER,"
+    f" rating_sum BIGINT NOT NULL,"
+    f" rating_count INTEGER NOT NULL)",
+
+    f"CREATE INDEX AptRatingSummary_owner_id_idx ON AptRatingSummary(owner_id)",
+
+    f"CREATE TABLE PricePerNightSummary("
+    f" apartment_id INTEGER PRIMARY KEY REFERENCES {M_A_TABLE_NAME}({M_A_id}) ON DELETE CASCADE,"
+    f" price_sum NUMERIC NOT NULL,"
+    f" res_count INTEGER NOT NULL)",
+
+    f"""CREATE FUNCTION AptRatingSummary_apartment() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO AptRatingSummary(apartment_id, owner_id, rating_sum, rating_count) VALUES (NEW.{M_A_id}, NULL, 0, 0);
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+
+    f"""CREATE FUNCTION AptRatingSummary_owned_by() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE AptRatingSummary SET owner_id = NULL WHERE apartment_id = OLD.{M_OwnedBy_house_id};
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE AptRatingSummary SET owner_id = NEW.{M_OwnedBy_owner_id} WHERE apartment_id = NEW.{M_OwnedBy_house_id};
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+
+    f"""CREATE FUNCTION AptRatingSummary_reviews() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE AptRatingSummary SET rating_sum = rating_sum - OLD.{M_Rev_rating}, rating_count = rating_count - 1
+        WHERE apartment_id = OLD.{M_Rev_hid};
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE AptRatingSummary SET rating_sum = rating_sum + NEW.{M_Rev_rating}, rating_count = rating_count + 1
+        WHERE apartment_id = NEW.{M_Rev_hid};
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+
+    f"""CREATE FUNCTION PricePerNightSummary_reservations() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE PricePerNightSummary
+        SET price_sum = price_sum - OLD.{M_Res_total_price}::NUMERIC / (1+OLD.{M_Res_end_date}-OLD.{M_Res_start_date}),
+            res_count = res_count - 1
+        WHERE apartment_id = OLD.{M_Res_hid};
+        DELETE FROM PricePerNightSummary WHERE apartment_id = OLD.{M_Res_hid} AND res_count = 0;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO PricePerNightSummary(apartment_id, price_sum, res_count)
+        VALUES (NEW.{M_Res_hid}, NEW.{M_Res_total_price}::NUMERIC / (1+NEW.{M_Res_end_date}-NEW.{M_Res_start_date}), 1)
+        ON CONFLICT (apartment_id) DO UPDATE
+        SET price_sum = PricePerNightSummary.price_sum + EXCLUDED.price_sum,
+            res_count = PricePerNightSummary.res_count + 1;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql""",
+
+    f"CREATE TRIGGER AptRatingSummary_apartment AFTER INSERT ON {M_A_TABLE_NAME}"
+    f" FOR EACH ROW EXECUTE FUNCTION AptRatingSummary_apartment()",
+
+    f"CREATE TRIGGER AptRatingSummary_owned_by AFTER INSERT OR UPDATE OR DELETE ON {M_OwnedBy_TABLE_NAME}"
+    f" FOR EACH ROW EXECUTE FUNCTION AptRatingSummary_owned_by()",
+
+    f"CREATE TRIGGER AptRatingSummary_reviews AFTER INSERT OR UPDATE OF {M_Rev_rating}, {M_Rev_hid} OR DELETE"
+    f" ON {M_Rev_TABLE_NAME} FOR EACH ROW EXECUTE FUNCTION AptRatingSummary_reviews()",
+
+    f"CREATE TRIGGER PricePerNightSummary_reservations AFTER INSERT OR UPDATE OR DELETE ON {M_Res_TABLE_NAME}"
+    f" FOR EACH ROW EXECUTE FUNCTION PricePerNightSummary_reservations()",
+
+    # rows already in the tables
+    f"INSERT INTO AptRatingSummary(apartment_id, owner_id, rating_sum, rating_count)"
+    f" SELECT A.{M_A_id}, O.{M_OwnedBy_owner_id}, COALESCE(SUM(R.{M_Rev_rating}), 0), COUNT(R.{M_Rev_rating})"
+    f" FROM {M_A_TABLE_NAME} A"
+    f" LEFT JOIN {M_OwnedBy_TABLE_NAME} O ON A.{M_A_id} = O.{M_OwnedBy_house_id}"
+    f" LEFT JOIN {M_Rev_TABLE_NAME} R ON A.{M_A_id} = R.{M_Rev_hid}"
+    f" GROUP BY A.{M_A_id}, O.{M_OwnedBy_owner_id}",
+
+    f"INSERT INTO PricePerNightSummary(apartment_id, price_sum, res_count)"
+    f" SELECT {M_Res_hid}, SUM({M_Res_total_price}::NUMERIC / (1+{M_Res_end_date}-{M_Res_start_date})), COUNT(*)"
+    f" FROM {M_Res_TABLE_NAME} GROUP BY {M_Res_hid}",
+
+    # an apartment without reviews rates 0, like AVG(COALESCE(rating, 0)) over its single NULL row
+    f"CREATE OR REPLACE VIEW ViewAptRating AS"
+    f" SELECT owner_id, apartment_id,"
+    f" CASE WHEN rating_count = 0 THEN 0 ELSE rating_sum::NUMERIC / rating_count END AS average_rating"
+    f" FROM AptRatingSummary",
+
+    f"CREATE OR REPLACE VIEW ViewPricePerNight AS"
+    f" SELECT apartment_id, (price_sum / res_count)::FLOAT AS avg_price_per_night"
+    f" FROM PricePerNightSummary",
+]
+
+# stay of a reservation as a daterange (exclusion_constraint option), the same periods OVERLAPS compares:
+# the dates in either order, half open, and a stay starting and ending on the same day covers that day
+# the apartment is compared as a single value int4range, so the GiST index needs no btree_gist extension
+EXCLUSION_CONSTRAINT_DDL = [
+    f"ALTER TABLE {M_Res_TABLE_NAME} ADD COLUMN stay DATERANGE GENERATED ALWAYS AS ("
+    f"daterange(LEAST({M_Res_start_date}, {M_Res_end_date}),"
+    f" GREATEST({M_Res_start_date}, {M_Res_end_date}, LEAST({M_Res_start_date}, {M_Res_end_date}) + 1))) STORED",
+
+    f"ALTER TABLE {M_Res_TABLE_NAME} ADD CONSTRAINT Reservations_stay_excl"
+    f" EXCLUDE USING gist (int4range({M_Res_hid}, {M_Res_hid}, '[]') WITH &&, stay WITH &&)",
+]
+
+
+# the base tables and the views the queries read, the first version of the schema (see SCHEMA_MIGRATIONS)
+SCHEMA_TABLES_DDL = [
+    f"CREATE TABLE {M_O_TABLE_NAME}("  # Owner
+    f"{M_O_id} INTEGER PRIMARY KEY CHECK ({M_O_id} > 0),"
+    f" {M_O_name} TEXT NOT NULL)"
+    ,
+
+    f"CREATE TABLE {M_C_TABLE_NAME}("
+    f"{M_C_id} INTEGER PRIMARY KEY CHECK ({M_C_id} > 0),"
+    f" {M_C_name} TEXT NOT NULL)",
+
+    f"CREATE TABLE {M_A_TABLE_NAME}("
+    f" {M_A_id} INTEGER PRIMARY KEY CHECK ({M_A_id} > 0),"
+    f" {M_A_address} TEXT NOT NULL,"
+    f" {M_A_city} TEXT NOT NULL,"
+    f" {M_A_country} TEXT NOT NULL,"
+    f" {M_A_size} int NOT NULL,"
+    f" UNIQUE({M_A_city}, {M_A_address})"
+    f")",
+
+    f"CREATE TABLE {M_OwnedBy_TABLE_NAME}("
+    f"{M_OwnedBy_owner_id} INTEGER NOT NULL,"
+    f" {M_OwnedBy_house_id} INTEGER NOT NULL,"
+    f" PRIMARY KEY({M_OwnedBy_house_id}),"
+    f"FOREIGN KEY ({M_OwnedBy_owner_id}) REFERENCES {M_O_TABLE_NAME}({M_O_id} ) ON DELETE CASCADE ,"
+    f"FOREIGN KEY ({M_OwnedBy_house_id}) REFERENCES {M_A_TABLE_NAME}({M_A_id} ) ON DELETE CASCADE "
+    f")",
+
+    f"CREATE TABLE {M_Res_TABLE_NAME}("
+    f" {M_Res_cid} INTEGER NOT NULL,"
+    f" {M_Res_hid} INTEGER NOT NULL,"
+    f" {M_Res_start_date} DATE NOT NULL,"
+    f" {M_Res_end_date} DATE NOT NULL,"
+    f" {M_Res_total_price} FLOAT NOT NULL,"
+    f" PRIMARY KEY({M_Res_hid}, {M_Res_start_date}, {M_Res_end_date}),"
+    f" FOREIGN KEY ({M_Res_cid}) REFERENCES {M_C_TABLE_NAME}({M_C_id} ) ON DELETE CASCADE ,"
+    f" FOREIGN KEY ({M_Res_hid}) REFERENCES {M_A_TABLE_NAME}({M_A_id} ) ON DELETE CASCADE "
+    f")",
+
+    f"CREATE TABLE {M_Rev_TABLE_NAME}("
+    f" {M_Rev_cid} INTEGER NOT NULL,"
+    f" {M_Rev_hid} INTEGER NOT NULL,"
+    f" {M_Rev_review_date} DATE NOT NULL,"
+    f" {M_Rev_rating} INTEGER NOT NULL,"
+    f" {M_Rev_review_text} TEXT NOT NULL,"
+    f" PRIMARY KEY({M_Rev_cid}, {M_Rev_hid}),"
+    f" FOREIGN KEY ({M_Rev_cid}) REFERENCES {M_C_TABLE_NAME}({M_C_id} ) ON DELETE CASCADE ,"
+    f" FOREIGN KEY ({M_Rev_hid}) REFERENCES {M_A_TABLE_NAME}({M_A_id} ) ON DELETE CASCADE "
+    f")",
+]
+
+SCHEMA_VIEWS_DDL = [
+    f"CREATE VIEW {M_RevView_TABLE_NAME} "
+    f" AS"
+    f" SELECT {M_Rev_TABLE_NAME}.{M_Rev_hid}, {M_OwnedBy_owner_id}, {M_Rev_rating}"
+    f" FROM {M_Rev_TABLE_NAME}"
+    f" LEFT OUTER JOIN {M_OwnedBy_TABLE_NAME}"
+    f" ON {M_Rev_TABLE_NAME}.{M_Rev_hid} = {M_OwnedBy_TABLE_NAME}.{M_OwnedBy_house_id} ",
+
+    f""" CREATE VIEW ViewAptRating AS
         SELECT 
     A.owner_id, 
     A.apartment_id, 
@@ -783,70 +1990,93 @@ LEFT JOIN
 GROUP BY 
     A.owner_id, 
     A.apartment_id;
-"""
-
-        f"CREATE VIEW ViewPricePerNight "
-        f" AS "
-        f" SELECT "
-        f" {M_Res_hid},"
-        f" AVG( {M_Res_total_price} / (1+{M_Res_end_date}-{M_Res_start_date}) ) as avg_price_per_night"
-        f" FROM"
-        f" {M_Res_TABLE_NAME} "
-        f" GROUP BY {M_Res_hid}",
-
-        f"CREATE VIEW ViewAptValue "
-        f" AS"
-        f" SELECT "
-        f" viewaptrating.apartment_id, average_rating/avg_price_per_night as value"
-        f" FROM viewpricepernight LEFT JOIN viewaptrating"
-        f" on viewpricepernight.apartment_id=viewaptrating.apartment_id",
-    ]
-
-    for q in quries:
-        try:
-            conn = Connector.DBConnector()
-            conn.execute(
-                sql.SQL(
-                    q
-                )
-            )
-        except Exception as e:
-            print(e)
-        finally:
-            conn.close()
+""",
+
+    f"CREATE VIEW ViewPricePerNight "
+    f" AS "
+    f" SELECT "
+    f" {M_Res_hid},"
+    f" AVG( {M_Res_total_price} / (1+{M_Res_end_date}-{M_Res_start_date}) ) as avg_price_per_night"
+    f" FROM"
+    f" {M_Res_TABLE_NAME} "
+    f" GROUP BY {M_Res_hid}",
+
+    f"CREATE VIEW ViewAptValue "
+    f" AS"
+    f" SELECT "
+    f" viewaptrating.apartment_id, average_rating/avg_price_per_night as value"
+    f" FROM viewpricepernight LEFT JOIN viewaptrating"
+    f" on viewpricepernight.apartment_id=viewaptrating.apartment_id",
+]
+
+# ---------------------------------- schema migrations: ----------------------------------
+# the schema as versions applied by Utility.Migrator, create_tables applies the ones the database lacks in one
+# transaction and records them in SchemaVersion, so on an up-to-date database it changes nothing
+# a released migration is never edited, a change of the schema goes in a new version
+# a schema option is the migration of its name, applied by create_tables once the option is set, unsetting it
+# takes drop_tables
+
+SCHEMA_MIGRATIONS = [
+    Migrator.Migration(1, 'tables', SCHEMA_TABLES_DDL + SCHEMA_VIEWS_DDL),
+    Migrator.Migration(2, 'indexes', [
+        f"CREATE INDEX {name} ON {table}({', '.join(columns)})" for name, table, columns in ALL_INDEXES
+    ]),
+    Migrator.Migration(3, 'monthly_revenue', MONTHLY_REVENUE_DDL),
+    Migrator.Migration(4, 'ratio_pairs', RATIO_PAIRS_DDL),
+    Migrator.Migration(5, 'location_coverage', LOCATION_COVERAGE_DDL),
+    Migrator.Migration(6, 'reservation_counts', RESERVATION_COUNTS_DDL),
+    Migrator.Migration(7, 'change_notify', CHANGE_NOTIFY_DDL),
+    Migrator.Migration(8, 'summary_views', SUMMARY_VIEWS_DDL),
+    Migrator.Migration(9, 'exclusion_constraint', EXCLUSION_CONSTRAINT_DDL),
+]
+
+
+# the tables of version 1 are those create_tables made before the migrator, a database holding them without a
+# SchemaVersion starts at version 1
+SCHEMA_BASELINE = (1, M_O_TABLE_NAME)
+
+
+# the migrations of the schema with the current options
+def schema_migrator() -> Migrator.Migrator:
+    return Migrator.Migrator([m for m in SCHEMA_MIGRATIONS if SCHEMA_OPTIONS.get(m.name, True)],
+                             baseline=SCHEMA_BASELINE)
+
+
+# the migrator runs on a connection and a transaction of its own, which would wait on the locks of the
+# thread's open transaction block, so create_tables and drop_tables refuse to run inside one
+def _check_not_in_transaction(name: str):
+    if in_transaction():
+        raise RuntimeError(f"{name} can't run inside a transaction block")
+
+
+# applies the migrations the schema is missing, a failing one raises (a MigrationError for a migration changed
+# since it was applied, a database error otherwise) and leaves the schema as it was
+@_api
+def create_tables():
+    _check_not_in_transaction('create_tables')
+    schema_migrator().migrate()
+    _evict_all()
+    _invalidate(_leaderboard.invalidate)
 
 
+# empties every table with a single TRUNCATE, CASCADE takes the summary tables of the schema options along
+# no row triggers fire, the rollups are truncated with their sources and the change listeners get TRUNCATE
+# inside a transaction block it runs on the block's connection and is undone with it
+@_api
 def clear_tables():
-    conn = None
-    for table in ALL_TABLES:
-        try:
-            conn = Connector.DBConnector()
-            query = f"DELETE FROM {table}"
-            conn.execute(query)
-        except Exception as e:
-            print(e)
-        finally:
-            conn.close()
+    with _connection() as conn:
+        conn.execute(f"TRUNCATE {', '.join(ALL_TABLES)} RESTART IDENTITY CASCADE")
+    _evict_all()
+    _invalidate(_leaderboard.invalidate)
 
 
+# drops every object of the schema, those of the options too, and its version, in one transaction, errors are raised
+@_api
 def drop_tables():
-    conn = None
-    for table in ALL_TABLES:
-        try:
-            conn = Connector.DBConnector()
-            query = f"DROP TABLE {table} CASCADE"
-            conn.execute(query)
-        except Exception as e:
-            print(e)
-        finally:
-            conn.close()
-
-    for v in ALL_VIEWS:
-        try:
-            conn = Connector.DBConnector()
-            query = f"DROP VIEW {v}"
-            conn.execute(query)
-        except Exception as e:
-            print(e)
-        finally:
-            conn.close()
+    _check_not_in_transaction('drop_tables')
+    drops = [f"DROP VIEW IF EXISTS {v} CASCADE" for v in ALL_VIEWS] + \
+            [f"DROP TABLE IF EXISTS {table} CASCADE" for table in ALL_TABLES + SUMMARY_TABLES] + \
+            [f"DROP FUNCTION IF EXISTS {function} CASCADE" for function in ALL_FUNCTIONS + SUMMARY_FUNCTIONS]
+    schema_migrator().drop(drops)
+    _evict_all()
+    _invalidate(_leaderboard.invalidate)
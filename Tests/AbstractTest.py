@@ -1,12 +1,30 @@
 import unittest
 import Solution as Solution
+import Tests.Isolation as Isolation
 
 
 class AbstractTest(unittest.TestCase):
+    # drop, truncate or template, see Tests.Isolation
+    isolation = Isolation.DEFAULT_MODE
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        Isolation.set_up_class(cls)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        Isolation.tear_down_class(cls)
+
     # before each test, setUp is executed
     def setUp(self) -> None:
-        Solution.create_tables()
+        if self.isolation == Isolation.DROP:
+            Solution.create_tables()
+        else:
+            Isolation.prepare_schema()
 
     # after each test, tearDown is executed
     def tearDown(self) -> None:
-        Solution.drop_tables()
+        if self.isolation == Isolation.DROP:
+            Solution.drop_tables()
+        else:
+            Solution.clear_tables()
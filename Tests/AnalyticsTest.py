@@ -0,0 +1,102 @@
+import unittest
+import random
+from datetime import date, timedelta
+import Solution as Solution
+from Tests.AbstractTest import AbstractTest
+
+from Business.Apartment import Apartment
+
+try:
+    import Analytics
+except ImportError:
+    Analytics = None
+
+
+@unittest.skipIf(Analytics is None, "numpy is not installed")
+class Test(AbstractTest):
+    # an average of the snapshot against the SQL one, see the bound in Analytics
+    def assertSameAverage(self, expected, actual) -> None:
+        self.assertLessEqual(abs(expected - actual), 1e-12 * abs(expected))
+
+    # the reports of a snapshot against the SQL functions over the same tables, the prices are integer valued
+    def assertReportsMatch(self, report) -> None:
+        self.assertEqual(sorted(Solution.reservations_per_owner()), sorted(report.reservations_per_owner()))
+        for year in (2022, 2023, 2024):
+            self.assertEqual(Solution.profit_per_month(year), report.profit_per_month(year))
+        self.assertEqual(Solution.profit_per_month_range(2022, 2024), report.profit_per_month_range(2022, 2024))
+        for apartment_id in range(0, 32):
+            self.assertSameAverage(float(Solution.get_apartment_rating(apartment_id)),
+                                   report.get_apartment_rating(apartment_id))
+        for owner_id in range(0, 8):
+            self.assertSameAverage(float(Solution.get_owner_rating(owner_id)), report.get_owner_rating(owner_id))
+        expected, actual = Solution.best_value_apartments(100), report.apartment_values()
+        self.assertEqual([a for a, _ in expected], [a for a, _ in actual])
+        for (_, e), (_, a) in zip(expected, actual):
+            self.assertSameAverage(e, a)
+        # ties are broken by id in the snapshot only, so the values are compared
+        if report.apartment_values():
+            values = dict((a.get_id(), v) for a, v in report.apartment_values())
+            best = Solution.best_value_for_money()
+            self.assertSameAverage(values[report.best_value_for_money().get_id()], values[best.get_id()])
+
+    def test_empty(self) -> None:
+        report = Analytics.ReportSnapshot.load()
+        self.assertEqual([], report.reservations_per_owner())
+        self.assertEqual([(m, 0) for m in range(1, 13)], report.profit_per_month(2023))
+        self.assertEqual(0, report.get_apartment_rating(1))
+        self.assertEqual(0, report.get_owner_rating(1))
+        self.assertEqual(Apartment.bad_apartment(), report.best_value_for_money())
+        self.assertReportsMatch(report)
+
+    def test_reports(self) -> None:
+        Solution.add_owners([(1, 'a'), (2, 'b'), (3, 'c')])
+        Solution.add_customers([(1, 'x'), (2, 'y')])
+        Solution.add_apartments([(1, 'a1', 'Haifa', 'ISR', 10), (2, 'a2', 'Haifa', 'ISR', 20),
+                                 (3, 'a3', 'Paris', 'France', 30)])
+        Solution.owner_owns_apartment(1, 1)
+        Solution.owner_owns_apartment(1, 2)
+        Solution.owner_owns_apartment(2, 3)
+        Solution.add_reservations([(1, 1, date(2023, 1, 1), date(2023, 1, 4), 400),
+                                   (2, 1, date(2023, 2, 28), date(2023, 3, 1), 100),
+                                   (1, 3, date(2023, 3, 5), date(2023, 3, 5), 50)])
+        Solution.add_reviews([(1, 1, date(2023, 5, 1), 8, 'r'), (2, 1, date(2023, 5, 1), 6, 'r'),
+                              (1, 3, date(2023, 5, 1), 2, 'r')])
+        report = Analytics.ReportSnapshot.load()
+        self.assertEqual([('a', 2), ('b', 1), ('c', 0)], report.reservations_per_owner())
+        self.assertEqual([(1, 60.0), (2, 0), (3, 22.5)], report.profit_per_month(2023)[:3])
+        self.assertEqual(7, report.get_apartment_rating(1))
+        self.assertEqual(3.5, report.get_owner_rating(1))
+        self.assertEqual({1: 3.5, 2: 2.0, 3: 0.0}, report.owner_ratings())
+        self.assertEqual({1: 7.0, 2: 0.0, 3: 2.0}, report.apartment_ratings())
+        # 7 / 75 a night against 2 / 50
+        self.assertEqual(Apartment(1, 'a1', 'Haifa', 'ISR', 10), report.best_value_for_money())
+        self.assertReportsMatch(report)
+
+        # the snapshot keeps the tables as loaded
+        Solution.delete_apartment(1)
+        self.assertEqual(7, report.get_apartment_rating(1))
+        self.assertReportsMatch(Analytics.ReportSnapshot.load())
+
+    def test_random(self) -> None:
+        rng = random.Random(22)
+        Solution.add_owners([(i, f'o{i}') for i in range(1, 7)])
+        Solution.add_customers([(i, f'c{i}') for i in range(1, 21)])
+        Solution.add_apartments([(i, f'a{i}', f'city{i % 4}', 'country', rng.randint(20, 90)) for i in range(1, 31)])
+        for aid in range(1, 26):
+            Solution.owner_owns_apartment(rng.randint(1, 6), aid)
+        reservations = []
+        for aid in range(1, 31):
+            start = date(2022, 1, 1) + timedelta(days=rng.randint(0, 30))
+            for _ in range(rng.randint(0, 6)):
+                end = start + timedelta(days=rng.randint(0, 9))
+                reservations.append((rng.randint(1, 20), aid, start, end, rng.randint(50, 2000)))
+                start = end + timedelta(days=rng.randint(1, 60))
+        Solution.add_reservations(reservations)
+        Solution.add_reviews([(cid, aid, end + timedelta(days=1), rng.randint(1, 10), 'r')
+                              for cid, aid, _, end, _ in reservations if rng.random() < 0.6])
+        self.assertReportsMatch(Analytics.ReportSnapshot.load())
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
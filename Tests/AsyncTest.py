@@ -0,0 +1,120 @@
+import unittest
+import asyncio
+from datetime import date
+import AsyncSolution as AsyncSolution
+import Solution as Solution
+from MemoryBackend import MemoryBackend
+import Utility.AsyncDBConnector as AsyncConnector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Owner import Owner
+from Business.Customer import Customer
+from Business.Apartment import Apartment
+
+
+class Test(AbstractTest):
+    def run_async(self, coroutine):
+        async def run():
+            try:
+                return await coroutine
+            finally:
+                await AsyncConnector.close_pool()
+
+        return asyncio.run(run())
+
+    def test_crud(self) -> None:
+        async def scenario():
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.add_owner(Owner(1, 'o')))
+            self.assertEqual(ReturnValue.ALREADY_EXISTS, await AsyncSolution.add_owner(Owner(1, 'o')))
+            self.assertEqual(ReturnValue.BAD_PARAMS, await AsyncSolution.add_owner(Owner(-1, 'o')))
+            self.assertEqual(Owner(1, 'o'), await AsyncSolution.get_owner(1))
+            self.assertEqual(Owner.bad_owner(), await AsyncSolution.get_owner(2))
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.add_apartment(Apartment(1, 'a', 'b', 'c', 10)))
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.owner_owns_apartment(1, 1))
+            self.assertEqual([Apartment(1, 'a', 'b', 'c', 10)], await AsyncSolution.get_owner_apartments(1))
+            self.assertEqual(ReturnValue.NOT_EXISTS, await AsyncSolution.owner_owns_apartment(1, 2))
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.delete_owner(1))
+            self.assertEqual(ReturnValue.NOT_EXISTS, await AsyncSolution.delete_owner(1))
+
+        self.run_async(scenario())
+
+    def test_reservations_and_reports(self) -> None:
+        async def scenario():
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.add_customer(Customer(1, 'c')))
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.add_apartment(Apartment(1, 'a', 'b', 'c', 10)))
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.customer_made_reservation(
+                1, 1, date(2023, 3, 1), date(2023, 3, 5), 100))
+            self.assertEqual(ReturnValue.BAD_PARAMS, await AsyncSolution.customer_made_reservation(
+                1, 1, date(2023, 3, 2), date(2023, 3, 4), 100))
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.customer_reviewed_apartment(
+                1, 1, date(2023, 3, 6), 8, 'ok'))
+            self.assertEqual(8, await AsyncSolution.get_apartment_rating(1))
+            self.assertEqual(Customer(1, 'c'), await AsyncSolution.get_top_customer())
+            profit = await AsyncSolution.profit_per_month(2023)
+            self.assertEqual(12, len(profit))
+            self.assertEqual((3, 15), profit[2])
+
+        self.run_async(scenario())
+
+    def test_calls_run_concurrently_on_one_thread(self) -> None:
+        AsyncConnector.configure_pool(max_size=4)
+
+        async def scenario():
+            results = await asyncio.gather(*[AsyncSolution.add_owner(Owner(i, f'o{i}')) for i in range(1, 41)])
+            self.assertEqual([ReturnValue.OK] * 40, results)
+            owners = await asyncio.gather(*[AsyncSolution.get_owner(i) for i in range(1, 41)])
+            self.assertEqual([Owner(i, f'o{i}') for i in range(1, 41)], owners)
+            stats = AsyncConnector.pool_stats()
+            self.assertLessEqual(stats['size'], 4)
+            self.assertEqual(0, stats['in_use'])
+            self.assertGreater(stats['checkouts'], stats['created'])
+
+        try:
+            self.run_async(scenario())
+        finally:
+            AsyncConnector.configure_pool(max_size=10)
+
+    def test_writes_evict_the_caches_of_solution(self) -> None:
+        Solution.enable_entity_cache()
+        try:
+            self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'o')))
+            self.assertEqual(ReturnValue.OK, Solution.add_apartment(Apartment(1, 'a', 'b', 'c', 10)))
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'c')))
+            self.assertEqual(Owner.bad_owner(), Solution.get_apartment_owner(1))
+            self.assertEqual([], Solution.best_value_apartments(5))
+
+            async def stay():
+                self.assertEqual(ReturnValue.OK, await AsyncSolution.owner_owns_apartment(1, 1))
+                self.assertEqual(ReturnValue.OK, await AsyncSolution.customer_made_reservation(
+                    1, 1, date(2023, 3, 1), date(2023, 3, 5), 100))
+
+            self.run_async(stay())
+            self.assertEqual(Owner(1, 'o'), Solution.get_apartment_owner(1))
+            self.assertEqual([1], [a.get_id() for a, _ in Solution.best_value_apartments(5)])
+
+            self.run_async(AsyncSolution.delete_customer(1))
+            self.assertEqual(Customer.bad_customer(), Solution.get_customer(1))
+            self.assertEqual([], Solution.best_value_apartments(5))
+        finally:
+            Solution.disable_entity_cache()
+
+    def test_backend(self) -> None:
+        previous = Solution.use_backend(MemoryBackend())
+        try:
+            async def scenario():
+                self.assertEqual(ReturnValue.OK, await AsyncSolution.add_owner(Owner(1, 'o')))
+                self.assertEqual(Owner(1, 'o'), await AsyncSolution.get_owner(1))
+                self.assertEqual(ReturnValue.BAD_PARAMS, await AsyncSolution.delete_owner(0))
+
+            self.run_async(scenario())
+            self.assertEqual(Owner(1, 'o'), Solution.get_owner(1))
+        finally:
+            Solution.use_backend(previous)
+        # postgres wasn't touched
+        self.assertEqual(Owner.bad_owner(), Solution.get_owner(1))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,85 @@
+import unittest
+import time
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.BatchExecutor import BatchExecutor, run_batch
+from Utility.ReturnValue import ReturnValue
+from Utility.Exceptions import DatabaseException
+from Tests.AbstractTest import AbstractTest
+
+from Business.Owner import Owner
+from Business.Apartment import Apartment
+
+
+class Test(AbstractTest):
+    def setUp(self) -> None:
+        super().setUp()
+        for i in range(1, 21):
+            self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(i, f'o{i}')))
+            self.assertEqual(ReturnValue.OK, Solution.add_apartment(Apartment(i, f'a{i}', 'city', 'country', 10)))
+            self.assertEqual(ReturnValue.OK, Solution.owner_owns_apartment(i, i))
+
+    def test_results_in_input_order(self) -> None:
+        ids = list(range(20, 0, -1))
+        owners = run_batch(Solution.get_apartment_owner, [(i,) for i in ids], max_workers=4)
+        self.assertEqual([Owner(i, f'o{i}') for i in ids], owners)
+        self.assertEqual(0, Connector.pool_stats()['in_use'])
+
+    def test_mixed_calls(self) -> None:
+        with BatchExecutor(max_workers=3) as executor:
+            results = executor.run([
+                (Solution.get_owner_apartments, (1,)),
+                (Solution.get_apartment_rating, (1,)),
+                (Solution.get_owner_rating, (2,)),
+                (Solution.get_apartment_owner, (99,)),
+            ])
+        self.assertEqual([[Apartment(1, 'a1', 'city', 'country', 10)], 0, 0, Owner.bad_owner()], results)
+
+    def test_timeout_and_errors(self) -> None:
+        def call(seconds):
+            if seconds < 0:
+                raise DatabaseException.ConnectionInvalid("down")
+            time.sleep(seconds)
+            return seconds
+
+        with BatchExecutor(max_workers=2, timeout=0.2) as executor:
+            self.assertEqual([0, ReturnValue.ERROR, 0.01, ReturnValue.ERROR],
+                             executor.map(call, [(0,), (1,), (0.01,), (-1,)]))
+            stats = executor.stats()
+        self.assertEqual(1, stats['timeouts'])
+        self.assertEqual(1, stats['errors'])
+
+    def test_other_errors_are_raised(self) -> None:
+        with BatchExecutor(max_workers=2) as executor:
+            with self.assertRaises(ZeroDivisionError):
+                executor.map(lambda x: 1 / x, [(1,), (0,)])
+
+    def test_timed_out_statement_is_cancelled(self) -> None:
+        def sleep():
+            conn = Connector.DBConnector()
+            try:
+                conn.execute("SELECT pg_sleep(10)")
+            finally:
+                conn.close()
+
+        started = time.monotonic()
+        with BatchExecutor(max_workers=1, timeout=0.2) as executor:
+            self.assertEqual([ReturnValue.ERROR], executor.run([(sleep, ())]))
+        # the worker was let go by the server long before the sleep ended
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(0, Connector.pool_stats()['in_use'])
+
+    def test_start_timeout(self) -> None:
+        ran = []
+        with BatchExecutor(max_workers=1, start_timeout=0.1) as executor:
+            self.assertEqual([1, ReturnValue.ERROR],
+                             executor.map(lambda x: ran.append(x) or time.sleep(0.3) or x, [(1,), (2,)]))
+            self.assertEqual(1, executor.stats()['timeouts'])
+        self.assertEqual([1], ran)
+        with BatchExecutor() as executor:
+            self.assertEqual(30.0, executor.start_timeout)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
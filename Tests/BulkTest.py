@@ -0,0 +1,71 @@
+import unittest
+from datetime import date
+import Solution as Solution
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Apartment import Apartment
+from Business.Owner import Owner
+from Business.Customer import Customer
+
+OK = ReturnValue.OK
+BAD_PARAMS = ReturnValue.BAD_PARAMS
+ALREADY_EXISTS = ReturnValue.ALREADY_EXISTS
+NOT_EXISTS = ReturnValue.NOT_EXISTS
+
+
+class Test(AbstractTest):
+    def test_owners(self) -> None:
+        self.assertEqual([OK, OK], Solution.add_owners([Owner(1, 'a'), (2, 'b')]))
+        self.assertEqual(Owner(2, 'b'), Solution.get_owner(2))
+        self.assertEqual([OK, ALREADY_EXISTS, BAD_PARAMS, BAD_PARAMS, ALREADY_EXISTS],
+                         Solution.add_owners([(3, 'c'), (1, 'x'), (4, None), (-1, 'y'), (3, 'z')]))
+        self.assertEqual(Owner(3, 'c'), Solution.get_owner(3))
+        self.assertEqual(Owner.bad_owner(), Solution.get_owner(4))
+        self.assertEqual([], Solution.add_owners([]))
+
+    def test_apartments_and_customers(self) -> None:
+        self.assertEqual([OK, BAD_PARAMS, BAD_PARAMS, ALREADY_EXISTS],
+                         Solution.add_apartments([Apartment(1, 'a', 'b', 'c', 10), (2, 'a', 'b', 'c', 0),
+                                                  (0, 'x', 'y', 'z', 10), (3, 'a', 'b', 'd', 10)]))
+        self.assertEqual([OK, BAD_PARAMS, BAD_PARAMS], Solution.add_customers([Customer(1, 'a'), (None, 'b'),
+                                                                               (2, None)]))
+
+    def test_reservations_keep_overlap_check(self) -> None:
+        Solution.add_apartments([(1, 'a', 'b', 'c', 10), (2, 'b', 'b', 'c', 10)])
+        Solution.add_customers([(1, 'a'), (2, 'b')])
+        self.assertEqual([OK, OK, OK], Solution.add_reservations([
+            (1, 1, date(2023, 1, 1), date(2023, 1, 5), 100),
+            (1, 1, date(2023, 1, 5), date(2023, 1, 9), 100),
+            (2, 2, date(2023, 1, 1), date(2023, 1, 9), 100),
+        ]))
+        self.assertEqual([BAD_PARAMS, OK, BAD_PARAMS, NOT_EXISTS, NOT_EXISTS, BAD_PARAMS], Solution.add_reservations([
+            (2, 1, date(2023, 1, 3), date(2023, 1, 4), 100),
+            (2, 1, date(2023, 2, 1), date(2023, 2, 5), 100),
+            (1, 1, date(2023, 2, 3), date(2023, 2, 8), 100),
+            (3, 1, date(2024, 1, 1), date(2024, 1, 2), 100),
+            (1, 3, date(2024, 1, 1), date(2024, 1, 2), 100),
+            (1, 1, date(2024, 1, 1), date(2024, 1, 2), 0),
+        ]))
+        self.assertEqual(ReturnValue.OK, Solution.customer_cancelled_reservation(2, 1, date(2023, 2, 1)))
+        self.assertEqual(ReturnValue.NOT_EXISTS, Solution.customer_cancelled_reservation(1, 1, date(2023, 2, 3)))
+
+    def test_reviews_need_a_stay(self) -> None:
+        Solution.add_apartments([(1, 'a', 'b', 'c', 10), (2, 'b', 'b', 'c', 10)])
+        Solution.add_customers([(1, 'a'), (2, 'b')])
+        Solution.add_reservations([(1, 1, date(2023, 1, 1), date(2023, 1, 5), 100),
+                                   (2, 2, date(2023, 1, 1), date(2023, 1, 5), 100)])
+        self.assertEqual([OK, OK], Solution.add_reviews([(1, 1, date(2023, 1, 5), 7, 'ok'),
+                                                         (2, 2, date(2023, 2, 1), 3, 'meh')]))
+        self.assertEqual([NOT_EXISTS, ALREADY_EXISTS, BAD_PARAMS, NOT_EXISTS], Solution.add_reviews([
+            (1, 2, date(2023, 2, 1), 7, 'never stayed'),
+            (1, 1, date(2023, 2, 1), 7, 'again'),
+            (2, 1, date(2023, 2, 1), 11, 'bad rating'),
+            (2, 1, date(2023, 2, 1), 5, 'never stayed'),
+        ]))
+        self.assertEqual(7, Solution.get_apartment_rating(1))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
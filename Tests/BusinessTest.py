@@ -0,0 +1,84 @@
+import unittest
+import pickle
+from copy import copy
+from datetime import date
+import Solution as Solution
+from Tests.AbstractTest import AbstractTest
+
+from Business.Owner import Owner
+from Business.Customer import Customer
+from Business.Apartment import Apartment
+
+
+class Test(AbstractTest):
+    def test_hashable(self) -> None:
+        self.assertEqual({Owner(1, 'a').freeze(), Owner(2, 'b').freeze()},
+                         {Owner(2, 'b').freeze(), Owner(1, 'a').freeze(), Owner(1, 'a').freeze()})
+        self.assertEqual(1, len({Customer(1, 'a').freeze(), Customer(1, 'a').freeze()}))
+        self.assertEqual(2, len({Customer(1, 'a').freeze(), Customer(1, 'b').freeze()}))
+        # size isn't compared, so it isn't hashed either
+        self.assertEqual({Apartment(1, 'x', 'c', 'd', 10).freeze(): 'first'}[Apartment(1, 'x', 'c', 'd', 20).freeze()],
+                         'first')
+        self.assertEqual(hash(Owner.bad_owner().freeze()), hash(Owner().freeze()))
+        self.assertNotEqual(Owner(1, 'a'), Customer(1, 'a'))
+        # a mutable object isn't hashable
+        for obj in (Owner(1, 'a'), Customer(1, 'a'), Apartment(1, 'x', 'c', 'd', 10)):
+            with self.assertRaises(TypeError):
+                hash(obj)
+        self.assertEqual(2, len(set(Owner.from_rows([(1, 'a'), (2, 'b'), (1, 'a')], frozen=True))))
+
+    def test_slots(self) -> None:
+        for obj in (Owner(1, 'a'), Customer(1, 'a'), Apartment(1, 'x', 'c', 'd', 10)):
+            self.assertFalse(hasattr(obj, '__dict__'))
+            with self.assertRaises(AttributeError):
+                obj.extra = 1
+            self.assertEqual(obj, copy(obj))
+            self.assertEqual(obj, pickle.loads(pickle.dumps(obj)))
+            self.assertTrue(pickle.loads(pickle.dumps(obj.freeze())).is_frozen())
+
+    def test_freeze(self) -> None:
+        owner = Owner(1, 'a')
+        owner.set_owner_name('b')
+        self.assertIs(owner, owner.freeze())
+        self.assertTrue(owner.is_frozen())
+        self.assertRaises(AttributeError, owner.set_owner_name, 'c')
+        self.assertRaises(AttributeError, Customer(1, 'a').freeze().set_customer_id, 2)
+        self.assertRaises(AttributeError, Apartment(1).freeze().set_size, 2)
+        self.assertEqual(Owner(1, 'b'), owner)
+        self.assertFalse(Owner(1, 'b').is_frozen())
+
+    def test_from_rows(self) -> None:
+        rows = [(1, 'x', 'c', 'd', 10, 0.5), (2, 'y', 'c', 'd', 20, 0.25)]
+        apartments = Apartment.from_rows(rows)
+        self.assertEqual([Apartment(1, 'x', 'c', 'd', 10), Apartment(2, 'y', 'c', 'd', 20)], apartments)
+        self.assertEqual([10, 20], [a.get_size() for a in apartments])
+        self.assertFalse(apartments[0].is_frozen())
+        owners = Owner.from_rows([(1, 'a'), (2, 'b')], frozen=True)
+        self.assertEqual([Owner(1, 'a'), Owner(2, 'b')], owners)
+        self.assertTrue(all(owner.is_frozen() for owner in owners))
+        self.assertEqual([Customer(3, 'c')], Customer.from_rows(iter([(3, 'c')])))
+        self.assertEqual([], Customer.from_rows([]))
+
+    def test_api_lists(self) -> None:
+        Solution.add_owners([(1, 'o')])
+        Solution.add_customers([(1, 'a'), (2, 'b')])
+        Solution.add_apartments([(1, 'x', 'c', 'd', 10), (2, 'y', 'c', 'd', 20)])
+        Solution.owner_owns_apartment(1, 1)
+        Solution.owner_owns_apartment(1, 2)
+        self.assertEqual([Apartment(1, 'x', 'c', 'd', 10), Apartment(2, 'y', 'c', 'd', 20)],
+                         sorted(Solution.get_owner_apartments(1), key=Apartment.get_id))
+        self.assertEqual([20], [a.get_size() for a in Solution.get_owner_apartments(1) if a.get_id() == 2])
+        self.assertEqual([Owner(1, 'o')], Solution.get_all_location_owners())
+        Solution.add_reservations([(1, 1, date(2023, 1, 1), date(2023, 1, 2), 10),
+                                   (2, 1, date(2023, 1, 3), date(2023, 1, 4), 10),
+                                   (2, 2, date(2023, 1, 3), date(2023, 1, 4), 10)])
+        self.assertEqual([Customer(2, 'b'), Customer(1, 'a')], Solution.get_top_customers(5))
+        Solution.add_reviews([(1, 1, date(2023, 2, 1), 8, 'r'), (2, 1, date(2023, 2, 1), 4, 'r'),
+                              (2, 2, date(2023, 2, 1), 6, 'r')])
+        self.assertEqual([(Apartment(2, 'y', 'c', 'd', 20), 10.0)], Solution.get_apartment_recommendation(1))
+        self.assertEqual([], Solution.get_apartment_recommendation(2))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,143 @@
+import unittest
+from datetime import date
+import Solution as Solution
+import Utility.ChangeListener as ChangeListener
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Owner import Owner
+from Business.Customer import Customer
+
+
+class Test(AbstractTest):
+    def setUp(self) -> None:
+        Solution.set_schema_options(change_notify=True)
+        super().setUp()
+        self.listeners = []
+        Solution.enable_entity_cache(maxsize=100, ttl=None)
+
+    def tearDown(self) -> None:
+        for listener in self.listeners:
+            listener.stop()
+        Solution.stop_change_listener()
+        Solution.disable_entity_cache()
+        Solution.configure_leaderboard()
+        super().tearDown()
+        Solution.set_schema_options(change_notify=False)
+
+    # a write of another process, Solution doesn't see it
+    def execute(self, query, params=None):
+        conn = Connector.DBConnector()
+        try:
+            conn.execute(query, params=params)
+        finally:
+            conn.close()
+
+    def listen(self, on_change) -> ChangeListener.ChangeListener:
+        listener = ChangeListener.ChangeListener(on_change, poll_interval=0.05).start()
+        self.listeners.append(listener)
+        return listener
+
+    def test_payloads(self) -> None:
+        changes = []
+        listener = self.listen(lambda change: changes.append((change.table, change.op, change.keys)))
+        self.execute("INSERT INTO Owner VALUES (1, 'a'), (2, 'b')")
+        self.execute("UPDATE Owner SET name = 'c' WHERE ownerid = 1")
+        self.execute("UPDATE Owner SET ownerid = 3 WHERE ownerid = 2")
+        self.execute("INSERT INTO Apartment VALUES (1, 'x', 'y', 'z', 10)")
+        self.execute("INSERT INTO OwnedBy VALUES (1, 1)")
+        self.execute("DELETE FROM Owner WHERE ownerid = 1")
+        self.execute("TRUNCATE Customer CASCADE")
+        self.assertTrue(listener.sync())
+        self.assertEqual([
+            ('owner', 'INSERT', {'ownerid': 1}),
+            ('owner', 'INSERT', {'ownerid': 2}),
+            ('owner', 'UPDATE', {'ownerid': 1}),
+            ('owner', 'UPDATE', {'ownerid': 2}),
+            ('owner', 'UPDATE', {'ownerid': 3}),
+            ('apartment', 'INSERT', {'id': 1}),
+            ('ownedby', 'INSERT', {'owner_id': 1, 'apartment_id': 1}),
+            ('owner', 'DELETE', {'ownerid': 1}),
+            ('ownedby', 'DELETE', {'owner_id': 1, 'apartment_id': 1}),
+        ], changes[:9])
+        self.assertIn(('customer', 'TRUNCATE', {}), changes[9:])
+        self.assertEqual(len(changes), listener.stats()['received'] - 1)
+
+    def test_rolled_back_writes_are_not_sent(self) -> None:
+        changes = []
+        listener = self.listen(changes.append)
+        with self.assertRaises(KeyError):
+            with Solution.transaction():
+                Solution.add_customer(Customer(1, 'c'))
+                raise KeyError()
+        self.assertTrue(listener.sync())
+        self.assertEqual([], changes)
+
+    def test_entities_evicted(self) -> None:
+        listener = Solution.start_change_listener()
+        Solution.add_owners([(1, 'a'), (2, 'b')])
+        Solution.add_customers([(1, 'c')])
+        Solution.add_apartments([(1, 'x', 'y', 'z', 10)])
+        self.assertEqual(Owner(1, 'a'), Solution.get_owner(1))
+        self.assertEqual(Customer(1, 'c'), Solution.get_customer(1))
+        self.assertEqual(Owner.bad_owner(), Solution.get_apartment_owner(1))
+
+        self.execute("UPDATE Owner SET name = 'd' WHERE ownerid = 1")
+        self.execute("DELETE FROM Customer WHERE id = 1")
+        self.execute("INSERT INTO OwnedBy VALUES (2, 1)")
+        self.assertTrue(listener.sync())
+        self.assertEqual(Owner(1, 'd'), Solution.get_owner(1))
+        self.assertEqual(Customer.bad_customer(), Solution.get_customer(1))
+        self.assertEqual(Owner(2, 'b'), Solution.get_apartment_owner(1))
+
+        # the apartment_owner entries naming the owner
+        self.execute("UPDATE Owner SET name = 'e' WHERE ownerid = 2")
+        self.assertTrue(listener.sync())
+        self.assertEqual(Owner(2, 'e'), Solution.get_apartment_owner(1))
+
+    def test_leaderboard_invalidated(self) -> None:
+        listener = Solution.start_change_listener()
+        Solution.add_customers([(1, 'c')])
+        Solution.add_apartments([(1, 'a', 'x', 'y', 10), (2, 'b', 'x', 'y', 10)])
+        Solution.add_reservations([(1, hid, date(2023, 1, 1), date(2023, 1, 1), 100) for hid in (1, 2)])
+        Solution.add_reviews([(1, 1, date(2023, 2, 1), 8, 'r'), (1, 2, date(2023, 2, 1), 6, 'r')])
+        self.assertEqual([1, 2], [a.get_id() for a, _ in Solution.best_value_apartments(2)])
+        self.execute("UPDATE Reviews SET rating = 10 WHERE apartment_id = 2")
+        self.assertTrue(listener.sync())
+        self.assertEqual([2, 1], [a.get_id() for a, _ in Solution.best_value_apartments(2)])
+
+    def test_reset_on_connect(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'a')))
+        Solution.get_owner(1)
+        self.execute("UPDATE Owner SET name = 'b' WHERE ownerid = 1")
+        self.assertEqual(Owner(1, 'a'), Solution.get_owner(1))
+        # the write was missed, the listener drops everything once it listens
+        Solution.start_change_listener()
+        self.assertEqual(Owner(1, 'b'), Solution.get_owner(1))
+
+    def test_handler_errors(self) -> None:
+        changes = []
+
+        def on_change(change):
+            changes.append(change.keys)
+            raise ValueError()
+        listener = self.listen(on_change)
+        self.execute("INSERT INTO Customer VALUES (1, 'a')")
+        self.execute("INSERT INTO Customer VALUES (2, 'b')")
+        self.assertTrue(listener.sync())
+        self.assertEqual([{'id': 1}, {'id': 2}], changes)
+        self.assertEqual(2, listener.stats()['handler_errors'])
+        self.assertTrue(listener.is_listening())
+
+    def test_sync_of_other_listeners(self) -> None:
+        first, second = self.listen(lambda change: None), self.listen(lambda change: None)
+        self.assertTrue(first.sync())
+        self.assertTrue(second.sync())
+        self.assertTrue(first.sync())
+        self.assertEqual(3, first.stats()['received'])
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
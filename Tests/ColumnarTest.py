@@ -0,0 +1,91 @@
+import unittest
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.DBConnector import ResultSet
+from Tests.AbstractTest import AbstractTest
+
+Column = namedtuple('Column', ['name', 'type_code'])
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class Test(AbstractTest):
+    def execute(self, query, params=None) -> ResultSet:
+        conn = Connector.DBConnector()
+        try:
+            return conn.execute(query, params=params)[1]
+        finally:
+            conn.close()
+
+    def test_reservations(self) -> None:
+        Solution.add_customers([(1, 'a'), (2, 'b')])
+        Solution.add_apartments([(1, 'x', 'c', 'd', 10), (2, 'y', 'c', 'd', 20)])
+        Solution.add_reservations([(1, 1, date(2023, 1, 1), date(2023, 1, 3), 150.5),
+                                   (2, 2, date(2023, 2, 1), date(2023, 2, 2), 80)])
+        result = self.execute("SELECT customer_id, apartment_id, start_date, end_date, total_price FROM Reservations"
+                              " ORDER BY customer_id")
+        columns = result.to_columns()
+        self.assertEqual(['customer_id', 'apartment_id', 'start_date', 'end_date', 'total_price'], list(columns))
+        self.assertEqual(np.dtype('int32'), columns['customer_id'].dtype)
+        self.assertEqual(np.dtype('datetime64[D]'), columns['start_date'].dtype)
+        self.assertEqual([2, 1], list((columns['end_date'] - columns['start_date']).astype(int)))
+        self.assertEqual(230.5, columns['total_price'].sum())
+
+        records = result.to_numpy()
+        self.assertEqual(2, len(records))
+        self.assertEqual(np.datetime64('2023-02-01'), records[1]['start_date'])
+        self.assertEqual(2, records['apartment_id'][1])
+
+    def test_reviews(self) -> None:
+        Solution.add_customers([(1, 'a')])
+        Solution.add_apartments([(1, 'x', 'c', 'd', 10)])
+        Solution.add_reservations([(1, 1, date(2023, 1, 1), date(2023, 1, 3), 100)])
+        Solution.add_reviews([(1, 1, date(2023, 2, 1), 7, 'nice')])
+        result = self.execute("SELECT review_date, rating, review_text, AVG(rating) OVER () AS avg FROM Reviews")
+        columns = result.to_columns()
+        self.assertEqual(np.array(['2023-02-01'], dtype='datetime64[D]'), columns['review_date'])
+        self.assertEqual(np.dtype('float64'), columns['avg'].dtype)
+        self.assertEqual(np.dtype('object'), columns['review_text'].dtype)
+        self.assertEqual('nice', columns['review_text'][0])
+
+    def test_empty(self) -> None:
+        result = self.execute("SELECT id, name FROM Customer")
+        self.assertTrue(result.isEmpty())
+        columns = result.to_columns()
+        self.assertEqual(['id', 'name'], list(columns))
+        self.assertEqual((0,), columns['id'].shape)
+        self.assertEqual(np.dtype('int32'), columns['id'].dtype)
+        self.assertEqual(('id', 'name'), result.to_numpy().dtype.names)
+        self.assertEqual({}, ResultSet().to_columns())
+
+    def test_nulls(self) -> None:
+        rs = ResultSet([Column('n', 23), Column('flag', 16), Column('day', 1082), Column('price', 1700)],
+                       [(1, True, date(2023, 1, 1), Decimal('1.5')), (None, None, None, None)])
+        columns = rs.to_columns()
+        self.assertEqual(np.dtype('float64'), columns['n'].dtype)
+        self.assertTrue(np.isnan(columns['n'][1]))
+        self.assertEqual([True, None], list(columns['flag']))
+        self.assertTrue(np.isnat(columns['day'][1]))
+        self.assertEqual(1.5, columns['price'][0])
+        self.assertTrue(np.isnan(columns['price'][1]))
+
+    def test_untyped_columns(self) -> None:
+        rs = ResultSet([namedtuple('Column', ['name'])('tags'), namedtuple('Column', ['name'])('day')],
+                       [([1, 2], date(2023, 1, 1)), ([3], date(2023, 1, 2))])
+        columns = rs.to_columns()
+        self.assertEqual((2,), columns['tags'].shape)
+        self.assertEqual([3], columns['tags'][1])
+        self.assertEqual(np.dtype('datetime64[D]'), columns['day'].dtype)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
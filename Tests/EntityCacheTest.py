@@ -0,0 +1,126 @@
+import unittest
+import Solution as Solution
+import Utility.Cache as Cache
+import Utility.Tracing as Tracing
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Owner import Owner
+from Business.Apartment import Apartment
+from Business.Customer import Customer
+
+
+class Test(AbstractTest):
+    def setUp(self) -> None:
+        super().setUp()
+        Solution.enable_entity_cache(maxsize=100, ttl=None)
+
+    def tearDown(self) -> None:
+        Tracing.disable()
+        Solution.disable_entity_cache()
+        super().tearDown()
+
+    def statements(self, call) -> int:
+        sink = Tracing.enable()
+        try:
+            call()
+            return sink.spans()[-1].statements
+        finally:
+            Tracing.disable()
+
+    def test_read_through(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'o')))
+        self.assertEqual(Owner(1, 'o'), Solution.get_owner(1))
+        self.assertEqual(0, self.statements(lambda: self.assertEqual(Owner(1, 'o'), Solution.get_owner(1))))
+        stats = Solution.entity_cache_stats()
+        self.assertEqual((1, 1, 1), (stats['hits'], stats['misses'], stats['size']))
+        # callers can't change the cached object
+        Solution.get_owner(1).set_owner_name('changed')
+        self.assertEqual(Owner(1, 'o'), Solution.get_owner(1))
+
+    def test_negative_results(self) -> None:
+        self.assertEqual(Customer.bad_customer(), Solution.get_customer(1))
+        self.assertEqual(0, self.statements(lambda: Solution.get_customer(1)))
+        self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'c')))
+        self.assertEqual(Customer(1, 'c'), Solution.get_customer(1))
+        self.assertEqual([ReturnValue.OK], Solution.add_owners([(2, 'o')]))
+        Solution.get_owner(3)
+        self.assertEqual([ReturnValue.OK], Solution.add_owners([(3, 'p')]))
+        self.assertEqual(Owner(3, 'p'), Solution.get_owner(3))
+
+    def test_writes_evict(self) -> None:
+        Solution.add_owners([(1, 'a'), (2, 'b')])
+        Solution.add_apartments([(1, 'x', 'c', 'c', 10), (2, 'y', 'c', 'c', 10)])
+        self.assertEqual(Owner.bad_owner(), Solution.get_apartment_owner(1))
+        self.assertEqual(ReturnValue.OK, Solution.owner_owns_apartment(1, 1))
+        self.assertEqual(ReturnValue.OK, Solution.owner_owns_apartment(1, 2))
+        self.assertEqual(Owner(1, 'a'), Solution.get_apartment_owner(1))
+        self.assertEqual(Owner(1, 'a'), Solution.get_apartment_owner(2))
+        self.assertEqual(ReturnValue.OK, Solution.owner_drops_apartment(1, 1))
+        self.assertEqual(Owner.bad_owner(), Solution.get_apartment_owner(1))
+
+        # the ownership cascades with the owner
+        self.assertEqual(ReturnValue.OK, Solution.delete_owner(1))
+        self.assertEqual(Owner.bad_owner(), Solution.get_owner(1))
+        self.assertEqual(Owner.bad_owner(), Solution.get_apartment_owner(2))
+
+        self.assertEqual(Apartment(2, 'y', 'c', 'c', 10), Solution.get_apartment(2))
+        self.assertEqual(ReturnValue.OK, Solution.owner_owns_apartment(2, 2))
+        self.assertEqual(Owner(2, 'b'), Solution.get_apartment_owner(2))
+        self.assertEqual(ReturnValue.OK, Solution.delete_apartment(2))
+        self.assertEqual(Apartment.bad_apartment(), Solution.get_apartment(2))
+        self.assertEqual(Owner.bad_owner(), Solution.get_apartment_owner(2))
+
+        Solution.get_owner(2)
+        Solution.clear_tables()
+        self.assertEqual(Owner.bad_owner(), Solution.get_owner(2))
+
+    def test_transaction(self) -> None:
+        Solution.add_customers([(1, 'c')])
+        self.assertEqual(Customer(1, 'c'), Solution.get_customer(1))
+        with Solution.transaction():
+            self.assertEqual(ReturnValue.OK, Solution.delete_customer(1))
+            # the transaction sees its own delete, other threads still see the committed customer
+            self.assertEqual(Customer.bad_customer(), Solution.get_customer(1))
+            self.assertEqual(1, Solution.entity_cache_stats()['size'])
+        self.assertEqual(Customer.bad_customer(), Solution.get_customer(1))
+
+        with self.assertRaises(KeyError):
+            with Solution.transaction():
+                Solution.add_customer(Customer(1, 'd'))
+                raise KeyError()
+        self.assertEqual(Customer.bad_customer(), Solution.get_customer(1))
+
+    def test_errors_are_not_cached(self) -> None:
+        cache = Cache.LRUCache(maxsize=2)
+
+        def fail():
+            raise KeyError()
+        self.assertRaises(KeyError, cache.get_or_load, 1, fail)
+        self.assertEqual(0, len(cache))
+        self.assertEqual(2, cache.get_or_load(1, lambda: 2))
+
+    def test_lru(self) -> None:
+        now = [0.0]
+        cache = Cache.LRUCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        loads = []
+        load = (lambda key: lambda: loads.append(key) or key * 2)
+        self.assertEqual(2, cache.get_or_load(1, load(1)))
+        self.assertEqual(4, cache.get_or_load(2, load(2)))
+        self.assertEqual(2, cache.get_or_load(1, load(1)))
+        self.assertEqual(6, cache.get_or_load(3, load(3)))
+        # 2 was the least recently used
+        self.assertEqual(4, cache.get_or_load(2, load(2)))
+        self.assertEqual([1, 2, 3, 2], loads)
+        now[0] = 11
+        cache.get_or_load(2, load(2))
+        self.assertEqual(None, cache.get_or_load(4, lambda: None, keep=lambda v: v is not None))
+        cache.get_or_load(4, load(4))
+        stats = cache.stats()
+        self.assertEqual((1, 7, 3, 1, 2), (stats['hits'], stats['misses'], stats['evictions'],
+                                           stats['expirations'], stats['size']))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
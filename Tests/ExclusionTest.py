@@ -0,0 +1,92 @@
+import unittest
+import threading
+from datetime import date
+import BigTest
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.Exceptions import DatabaseException
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Apartment import Apartment
+from Business.Customer import Customer
+
+
+# the whole BigTest suite, on the exclusion constraint
+class TestBigTest(BigTest.TestCRUD):
+    @classmethod
+    def setUpClass(cls):
+        Solution.set_schema_options(exclusion_constraint=True)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        Solution.set_schema_options(exclusion_constraint=False)
+
+
+class Test(AbstractTest):
+    def setUp(self) -> None:
+        Solution.set_schema_options(exclusion_constraint=True)
+        super().setUp()
+        self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'c')))
+        self.assertEqual(ReturnValue.OK, Solution.add_apartment(Apartment(1, 'a', 'b', 'c', 10)))
+        self.assertEqual(ReturnValue.OK, Solution.add_apartment(Apartment(2, 'd', 'e', 'f', 10)))
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        Solution.set_schema_options(exclusion_constraint=False)
+
+    def test_overlaps(self) -> None:
+        book = Solution.customer_made_reservation
+        self.assertEqual(ReturnValue.OK, book(1, 1, date(2023, 1, 1), date(2023, 1, 5), 100))
+        self.assertEqual(ReturnValue.BAD_PARAMS, book(1, 1, date(2023, 1, 1), date(2023, 1, 5), 100))
+        self.assertEqual(ReturnValue.BAD_PARAMS, book(1, 1, date(2023, 1, 4), date(2023, 1, 8), 100))
+        self.assertEqual(ReturnValue.BAD_PARAMS, book(1, 1, date(2023, 1, 3), date(2023, 1, 3), 100))
+        self.assertEqual(ReturnValue.BAD_PARAMS, book(1, 1, date(2023, 1, 9), date(2022, 12, 30), 100))
+        self.assertEqual(ReturnValue.OK, book(1, 1, date(2023, 1, 5), date(2023, 1, 7), 100))
+        self.assertEqual(ReturnValue.OK, book(1, 2, date(2023, 1, 1), date(2023, 1, 5), 100))
+        self.assertEqual(ReturnValue.OK, book(1, 1, date(2023, 1, 8), date(2023, 1, 8), 100))
+        self.assertEqual(ReturnValue.BAD_PARAMS, book(1, 1, date(2023, 1, 8), date(2023, 1, 8), 100))
+        self.assertEqual(ReturnValue.NOT_EXISTS, book(1, 3, date(2023, 1, 1), date(2023, 1, 5), 100))
+
+    def test_bulk(self) -> None:
+        self.assertEqual([ReturnValue.OK, ReturnValue.BAD_PARAMS, ReturnValue.OK], Solution.add_reservations([
+            (1, 1, date(2023, 1, 1), date(2023, 1, 5), 100),
+            (1, 1, date(2023, 1, 2), date(2023, 1, 3), 100),
+            (1, 2, date(2023, 1, 2), date(2023, 1, 3), 100),
+        ]))
+
+    def test_concurrent_bookings(self) -> None:
+        first = Connector.DBConnector()
+        try:
+            first.execute(Solution._CUSTOMER_MADE_RESERVATION_EXCLUSIVE,
+                          params=(1, 1, date(2023, 1, 1), date(2023, 1, 5), 100), commit=False)
+            results = []
+            # the second booking waits for the first transaction and fails once it commits
+            second = threading.Thread(target=lambda: results.append(
+                Solution.customer_made_reservation(1, 1, date(2023, 1, 3), date(2023, 1, 9), 100)))
+            second.start()
+            second.join(0.2)
+            self.assertTrue(second.is_alive())
+            first.commit()
+            second.join()
+        finally:
+            first.close()
+        self.assertEqual([ReturnValue.BAD_PARAMS], results)
+
+    def test_violation_is_mapped(self) -> None:
+        conn = Connector.DBConnector()
+        try:
+            conn.execute(Solution._CUSTOMER_MADE_RESERVATION_EXCLUSIVE,
+                         params=(1, 1, date(2023, 1, 1), date(2023, 1, 5), 100))
+            self.assertRaises(DatabaseException.EXCLUSION_VIOLATION, conn.execute,
+                              Solution._CUSTOMER_MADE_RESERVATION_EXCLUSIVE,
+                              params=(1, 1, date(2023, 1, 2), date(2023, 1, 6), 100))
+        finally:
+            conn.close()
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,40 @@
+import unittest
+import IndexAdvisor
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Tests.AbstractTest import AbstractTest
+import Tests.Isolation as Isolation
+
+
+class Test(AbstractTest):
+    # test_advisor drops an index of the schema
+    isolation = Isolation.DROP
+
+    def execute(self, query, params=None):
+        conn = Connector.DBConnector()
+        try:
+            return conn.execute(query, params=params)[1]
+        finally:
+            conn.close()
+
+    def test_indexes_are_created(self) -> None:
+        names = self.execute("SELECT indexname FROM pg_indexes WHERE schemaname = 'public'")['indexname']
+        for name, _, _ in Solution.ALL_INDEXES:
+            self.assertIn(name.lower(), names)
+
+    def test_advisor(self) -> None:
+        IndexAdvisor.populate(1)
+        self.assertEqual([], IndexAdvisor.advise())
+
+        self.execute("DROP INDEX OwnedBy_owner_id_idx")
+        findings = IndexAdvisor.advise()
+        self.assertIn('get_owner_apartments', [f.statement for f in findings])
+        self.assertEqual({('ownedby', ('owner_id',))}, {(f.relation, f.columns) for f in findings})
+        # the candidate indexes were rolled back
+        names = self.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'ownedby'")['indexname']
+        self.assertEqual(['ownedby_pkey'], names)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
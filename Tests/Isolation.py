@@ -0,0 +1,115 @@
+import itertools
+import os
+
+import psycopg2
+
+import Solution as Solution
+import Utility.DBConnector as Connector
+import Utility.Migrator as Migrator
+
+# how the tests of a class are kept apart, the isolation attribute of AbstractTest and BigTest.TestCRUD
+#   drop - the schema is created and dropped around every test (every class for BigTest)
+#   truncate - the schema is created once and kept, after every test its tables are emptied by clear_tables
+#   template - like truncate, in a database of the class cloned with CREATE DATABASE ... TEMPLATE from a
+#              template database that already has the schema, and dropped after the class
+# SOLUTION_TEST_ISOLATION in the environment sets the default, drop when unset
+# a schema left with a schema option the next test doesn't set is dropped and created again (see prepare_schema)
+
+DROP = 'drop'
+TRUNCATE = 'truncate'
+TEMPLATE = 'template'
+MODES = (DROP, TRUNCATE, TEMPLATE)
+
+DEFAULT_MODE = os.environ.get('SOLUTION_TEST_ISOLATION', DROP)
+
+# SOLUTION_BACKEND=memory runs the tests on a MemoryBackend
+Solution.init_backend_from_env()
+
+# CREATE and DROP DATABASE run on a connection to this database, never on the one they create or drop
+MAINTENANCE_DATABASE = 'postgres'
+
+_clones = itertools.count()
+_template_ready = False
+
+
+# brings the schema to the current options: created when missing, migrated when behind, and dropped and
+# created again when it has migrations the options don't want or that changed since
+def prepare_schema():
+    migrator = Solution.schema_migrator()
+    wanted = {m.version for m in migrator.migrations}
+    stale = bool(set(migrator.applied_versions()) - wanted)
+    if not stale:
+        try:
+            migrator.migrate()
+        except Migrator.MigrationError:
+            stale = True
+    if stale:
+        Solution.drop_tables()
+    Solution.create_tables()
+
+
+def _maintenance(*statements: str):
+    conn = psycopg2.connect(**dict(Connector.connection_params(), database=MAINTENANCE_DATABASE))
+    try:
+        # CREATE and DROP DATABASE can't run in a transaction
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    finally:
+        conn.close()
+
+
+def _database_exists(name: str) -> bool:
+    conn = psycopg2.connect(**dict(Connector.connection_params(), database=MAINTENANCE_DATABASE))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+            return cursor.fetchone() is not None
+    finally:
+        conn.close()
+
+
+# the template of the clones, checked once per process: created when missing and brought to the schema of the
+# current options, a template left by an earlier run that is up to date is used as is
+def _template() -> str:
+    global _template_ready
+    name = f"{Connector.connection_params(configured=True)['database']}_template"
+    if not _template_ready:
+        if not _database_exists(name):
+            _maintenance(f"CREATE DATABASE {name}")
+        previous = Connector.use_database(name)
+        try:
+            prepare_schema()
+        finally:
+            # closes the pool, a template can't be cloned while anyone is connected to it
+            Connector.use_database(previous)
+        _template_ready = True
+    return name
+
+
+# a new database cloned from the template, the connections go to it until drop_clone
+# returns its name and the database to go back to
+def clone() -> tuple:
+    template = _template()
+    name = f"{Connector.connection_params(configured=True)['database']}_{os.getpid()}_{next(_clones)}"
+    _maintenance(f"DROP DATABASE IF EXISTS {name}", f"CREATE DATABASE {name} TEMPLATE {template}")
+    return name, Connector.use_database(name)
+
+
+def drop_clone(name: str, previous):
+    Connector.use_database(previous)
+    _maintenance(f"DROP DATABASE IF EXISTS {name}")
+
+
+# class hooks of the isolation of test_class, called by setUpClass and tearDownClass
+def set_up_class(test_class):
+    if test_class.isolation not in MODES:
+        raise ValueError(f"Unknown isolation {test_class.isolation}")
+    test_class.clone = clone() if test_class.isolation == TEMPLATE else None
+
+
+def tear_down_class(test_class):
+    if getattr(test_class, 'clone', None) is not None:
+        drop_clone(*test_class.clone)
+        test_class.clone = None
@@ -0,0 +1,90 @@
+import unittest
+from datetime import date
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+import Tests.Isolation as Isolation
+
+from Business.Owner import Owner
+
+
+def current_database() -> str:
+    conn = Connector.DBConnector()
+    try:
+        return conn.execute("SELECT current_database()")[1].rows[0][0]
+    finally:
+        conn.close()
+
+
+def count(table: str) -> int:
+    conn = Connector.DBConnector()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}")[1].rows[0][0]
+    finally:
+        conn.close()
+
+
+# each test starts from empty tables, whichever runs first
+class IsolatedTests:
+    def fill(self) -> None:
+        self.assertEqual(0, count('Owner'))
+        self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'a')))
+        Solution.add_customers([(1, 'c')])
+        Solution.add_apartments([(1, 'x', 'Haifa', 'ISR', 10)])
+        Solution.owner_owns_apartment(1, 1)
+        Solution.add_reservations([(1, 1, date(2023, 1, 1), date(2023, 1, 3), 100)])
+        self.assertEqual((1, 15.0), Solution.profit_per_month(2023)[0])
+
+    def test_first(self) -> None:
+        self.fill()
+
+    def test_second(self) -> None:
+        self.fill()
+
+    def test_clear_tables(self) -> None:
+        self.fill()
+        Solution.clear_tables()
+        for table in Solution.ALL_TABLES:
+            self.assertEqual(0, count(table), table)
+        self.assertEqual([], Solution.reservations_per_owner())
+        self.assertEqual(Owner.bad_owner(), Solution.get_owner(1))
+        self.assertEqual([1, 2, 3, 4, 5, 6], Solution.schema_migrator().applied_versions())
+
+
+class TruncateTest(IsolatedTests, AbstractTest):
+    isolation = Isolation.TRUNCATE
+
+
+class TemplateTest(IsolatedTests, AbstractTest):
+    isolation = Isolation.TEMPLATE
+
+    def test_clone(self) -> None:
+        name, _ = self.clone
+        self.assertEqual(name, current_database())
+
+
+class Test(AbstractTest):
+    def test_clone_is_dropped(self) -> None:
+        home = current_database()
+        name, previous = Isolation.clone()
+        try:
+            self.assertEqual(name, current_database())
+            # the clone comes with the schema of the template
+            self.assertEqual([1, 2, 3, 4, 5, 6], Solution.schema_migrator().applied_versions())
+        finally:
+            Isolation.drop_clone(name, previous)
+        self.assertEqual(home, current_database())
+        self.assertFalse(Isolation._database_exists(name))
+
+    def test_unknown_isolation(self) -> None:
+        class Unknown(AbstractTest):
+            isolation = 'none'
+
+        with self.assertRaises(ValueError):
+            Unknown.setUpClass()
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,87 @@
+import unittest
+from datetime import date
+import Solution as Solution
+import Utility.Tracing as Tracing
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Apartment import Apartment
+
+
+class Test(AbstractTest):
+    def setUp(self) -> None:
+        super().setUp()
+        Solution.add_customers([(1, 'a'), (2, 'b')])
+        Solution.add_apartments([(1, 'a1', 'Haifa', 'ISR', 10), (2, 'a2', 'Haifa', 'ISR', 10),
+                                 (3, 'a3', 'Paris', 'France', 10), (4, 'a4', 'Haifa', 'USA', 10)])
+        # a night at 100 in each apartment, rated 8, 6, 9 and 4
+        Solution.add_reservations([(1, hid, date(2023, 1, 1), date(2023, 1, 1), 100) for hid in range(1, 5)])
+        Solution.add_reviews([(1, hid, date(2023, 2, 1), rating, 'r') for hid, rating in zip(range(1, 5), (8, 6, 9, 4))])
+
+    def tearDown(self) -> None:
+        Tracing.disable()
+        Solution.configure_leaderboard()
+        super().tearDown()
+
+    def ids(self, board):
+        return [a.get_id() for a, _ in board]
+
+    def test_ranking(self) -> None:
+        board = Solution.best_value_apartments(10)
+        self.assertEqual([3, 1, 2, 4], self.ids(board))
+        self.assertEqual((Apartment(3, 'a3', 'Paris', 'France', 10), 9 / 100), board[0])
+        self.assertEqual([3, 1], self.ids(Solution.best_value_apartments(2)))
+        self.assertEqual([1, 2, 4], self.ids(Solution.best_value_apartments(5, city='Haifa')))
+        self.assertEqual([1, 2], self.ids(Solution.best_value_apartments(5, city='Haifa', country='ISR')))
+        self.assertEqual([3], self.ids(Solution.best_value_apartments(5, country='France')))
+        self.assertEqual([], Solution.best_value_apartments(5, city='Rome'))
+        self.assertEqual([], Solution.best_value_apartments(0))
+        self.assertEqual(Solution.best_value_for_money(), board[0][0])
+
+    def test_ties_by_id(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.customer_updated_review(1, 1, date(2023, 3, 1), 9, 'r'))
+        self.assertEqual([1, 3], self.ids(Solution.best_value_apartments(2)))
+
+    def test_snapshot_is_reused(self) -> None:
+        before = Solution.leaderboard_stats()
+        sink = Tracing.enable()
+        Solution.best_value_apartments(1)
+        Solution.best_value_apartments(2, city='Haifa')
+        Solution.best_value_apartments(3, country='ISR')
+        first, *others = [span.statements for span in sink.spans()]
+        self.assertGreater(first, 0)
+        self.assertEqual([0, 0], others)
+        stats = Solution.leaderboard_stats()
+        self.assertEqual((1, 2), (stats['loads'] - before['loads'], stats['hits'] - before['hits']))
+
+        Solution.configure_leaderboard(ttl=0)
+        Solution.best_value_apartments(1)
+        Solution.best_value_apartments(1)
+        self.assertEqual(2, Solution.leaderboard_stats()['loads'] - stats['loads'])
+
+    def test_writes_refresh(self) -> None:
+        self.assertEqual([3, 1, 2, 4], self.ids(Solution.best_value_apartments(10)))
+        self.assertEqual(ReturnValue.OK, Solution.customer_updated_review(1, 4, date(2023, 3, 1), 10, 'r'))
+        self.assertEqual([4, 3, 1, 2], self.ids(Solution.best_value_apartments(10)))
+        self.assertEqual(ReturnValue.OK, Solution.delete_apartment(4))
+        self.assertEqual([3, 1, 2], self.ids(Solution.best_value_apartments(10)))
+        self.assertEqual([ReturnValue.OK], Solution.add_reservations([(2, 3, date(2023, 5, 1), date(2023, 5, 1), 1000)]))
+        self.assertEqual([1, 2, 3], self.ids(Solution.best_value_apartments(10)))
+        # the reservations and reviews of the customer go with it, apartment 3 keeps an unrated stay
+        self.assertEqual(ReturnValue.OK, Solution.delete_customer(1))
+        self.assertEqual([(Apartment(3, 'a3', 'Paris', 'France', 10), 0.0)], Solution.best_value_apartments(10))
+
+    def test_transaction(self) -> None:
+        self.assertEqual([3, 1, 2, 4], self.ids(Solution.best_value_apartments(10)))
+        with Solution.transaction():
+            self.assertEqual(ReturnValue.OK, Solution.customer_updated_review(1, 4, date(2023, 3, 1), 10, 'r'))
+            # the transaction reads its own write, the shared snapshot is left alone until it commits
+            self.assertEqual([4, 3, 1, 2], self.ids(Solution.best_value_apartments(10)))
+            self.assertTrue(Solution.leaderboard_stats()['fresh'])
+        self.assertFalse(Solution.leaderboard_stats()['fresh'])
+        self.assertEqual([4, 3, 1, 2], self.ids(Solution.best_value_apartments(10)))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,92 @@
+import unittest
+import random
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Owner import Owner
+from Business.Apartment import Apartment
+
+
+class Test(AbstractTest):
+    def execute(self, query, params=None):
+        conn = Connector.DBConnector()
+        try:
+            return conn.execute(query, params=params)[1]
+        finally:
+            conn.close()
+
+    # the counters against the same counts taken from Apartment and OwnedBy
+    def assertCountsMatch(self) -> None:
+        total = self.execute("SELECT COALESCE(SUM(location_count), 0) AS total FROM LocationTotal")[0]['total']
+        locations = self.execute("SELECT COUNT(*) FROM (SELECT DISTINCT city, country FROM Apartment)")[0]['count']
+        self.assertEqual(locations, total)
+        coverage = self.execute("SELECT owner_id, location_count FROM OwnerCoverage")
+        expected = self.execute(
+            "SELECT owner_id, COUNT(DISTINCT (city, country)) FROM OwnedBy INNER JOIN Apartment ON apartment_id = id"
+            " GROUP BY owner_id")
+        self.assertEqual(sorted(tuple(r.values()) for r in expected), sorted(tuple(r.values()) for r in coverage))
+        owners = [o.get_owner_id() for o in Solution.get_all_location_owners()]
+        self.assertEqual(sorted(r['owner_id'] for r in expected if r['count'] == locations), owners)
+
+    def test_distinct_locations(self) -> None:
+        Solution.add_owners([(1, 'a'), (2, 'b')])
+        Solution.add_apartments([(1, 'a', 'x', 'y', 10), (2, 'b', 'x', 'y', 10), (3, 'c', 'z', 'y', 10)])
+        for aid in (1, 2):
+            self.assertEqual(ReturnValue.OK, Solution.owner_owns_apartment(1, aid))
+        # two apartments in the same city are one location
+        self.assertEqual([], Solution.get_all_location_owners())
+        self.assertEqual(ReturnValue.OK, Solution.owner_owns_apartment(2, 3))
+        self.assertEqual(ReturnValue.OK, Solution.delete_apartment(3))
+        self.assertEqual([Owner(1, 'a')], Solution.get_all_location_owners())
+        self.assertEqual(ReturnValue.OK, Solution.owner_drops_apartment(1, 1))
+        self.assertEqual([Owner(1, 'a')], Solution.get_all_location_owners())
+        self.assertEqual(ReturnValue.OK, Solution.delete_owner(1))
+        self.assertEqual([], Solution.get_all_location_owners())
+        self.assertCountsMatch()
+
+    def test_counts_follow_changes(self) -> None:
+        rng = random.Random(15)
+        cities = [(f'city{i}', f'country{i % 2}') for i in range(4)]
+        Solution.add_owners([(i, f'o{i}') for i in range(1, 9)])
+        Solution.add_apartments([(i, f'a{i}', *rng.choice(cities), 10) for i in range(1, 61)])
+        for aid in range(1, 61):
+            Solution.owner_owns_apartment(rng.randint(1, 8), aid)
+        self.assertCountsMatch()
+        for _ in range(40):
+            action = rng.random()
+            if action < 0.4:
+                owner = Solution.get_apartment_owner(aid := rng.randint(1, 60))
+                if owner.get_owner_id() is not None:
+                    self.assertEqual(ReturnValue.OK, Solution.owner_drops_apartment(owner.get_owner_id(), aid))
+            elif action < 0.7:
+                Solution.delete_apartment(rng.randint(1, 60))
+            elif action < 0.8:
+                Solution.delete_owner(rng.randint(1, 8))
+            else:
+                aid = rng.randint(61, 200)
+                if Solution.add_apartment(Apartment(aid, f'a{aid}', *rng.choice(cities), 10)) == ReturnValue.OK:
+                    Solution.owner_owns_apartment(rng.randint(1, 8), aid)
+            self.assertCountsMatch()
+
+        Solution.clear_tables()
+        self.assertTrue(self.execute("SELECT * FROM OwnerCoverage").isEmpty())
+        self.assertCountsMatch()
+
+    def test_backfill(self) -> None:
+        Solution.add_owners([(1, 'a')])
+        Solution.add_apartments([(1, 'a', 'x', 'y', 10), (2, 'b', 'z', 'y', 10)])
+        Solution.owner_owns_apartment(1, 1)
+        Solution.owner_owns_apartment(1, 2)
+        for table in ('Locations', 'LocationTotal', 'OwnerLocations', 'OwnerCoverage'):
+            self.execute(f"DELETE FROM {table}")
+        for query in Solution.LOCATION_COVERAGE_DDL[-4:]:
+            self.execute(query)
+        self.assertCountsMatch()
+        self.assertEqual([Owner(1, 'a')], Solution.get_all_location_owners())
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,180 @@
+import unittest
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+import BigTest
+import Solution as Solution
+from MemoryBackend import MemoryBackend
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+import Tests.Isolation as Isolation
+
+from Business.Owner import Owner
+from Business.Customer import Customer
+from Business.Apartment import Apartment
+
+
+# numeric results of postgres are compared as floats
+def _normalized(value):
+    if isinstance(value, Decimal):
+        return round(float(value), 9)
+    if isinstance(value, float):
+        return round(value, 9)
+    if isinstance(value, (list, tuple)):
+        return type(value)(_normalized(v) for v in value)
+    return value
+
+
+class Test(AbstractTest):
+    def setUp(self) -> None:
+        super().setUp()
+        self.memory = MemoryBackend()
+
+    # calls the API function of both backends with the same arguments, their results must match
+    def call(self, name: str, *args):
+        expected = getattr(Solution, name)(*args)
+        actual = getattr(self.memory, name)(*args)
+        self.assertEqual(_normalized(expected), _normalized(actual), f"{name}{args}")
+        return actual
+
+    def assertQueriesMatch(self) -> None:
+        for owner_id in range(0, 6):
+            self.call('get_owner', owner_id)
+            self.assertEqual(sorted(Solution.get_owner_apartments(owner_id), key=Apartment.get_id),
+                             sorted(self.memory.get_owner_apartments(owner_id), key=Apartment.get_id))
+            self.call('get_owner_rating', owner_id)
+        for apartment_id in range(0, 13):
+            self.call('get_apartment', apartment_id)
+            self.call('get_apartment_owner', apartment_id)
+            self.call('get_apartment_rating', apartment_id)
+        for customer_id in range(0, 9):
+            self.call('get_customer', customer_id)
+            self.call('get_apartment_recommendation', customer_id)
+        # these come without an order from postgres
+        self.assertEqual(sorted(Solution.reservations_per_owner()), sorted(self.memory.reservations_per_owner()))
+        self.call('get_top_customers', 3)
+        self.call('get_all_location_owners')
+        self.call('profit_per_month', 2023)
+        self.call('profit_per_month_range', 2022, 2024)
+        self.call('best_value_apartments', 5)
+        self.call('best_value_apartments', 5, 'city1')
+        # postgres raises on these without any reservation
+        if self.memory.get_top_customers(1):
+            self.call('get_top_customer')
+        if self.memory.best_value_apartments(1):
+            # postgres doesn't break ties of the best value, so the values are compared
+            values = dict((a.get_id(), v) for a, v in self.memory.best_value_apartments(100))
+            self.assertAlmostEqual(values[Solution.best_value_for_money().get_id()],
+                                   values[self.memory.best_value_for_money().get_id()])
+        self.assertEqual(sorted(tuple(r) for r in Solution.export_reservations()),
+                         sorted(tuple(r) for r in self.memory.export_reservations()))
+        self.assertEqual(sorted(tuple(r) for r in Solution.export_reviews()),
+                         sorted(tuple(r) for r in self.memory.export_reviews()))
+
+    def test_constraints(self) -> None:
+        self.assertEqual(ReturnValue.OK, self.call('add_owner', Owner(1, 'a')))
+        self.assertEqual(ReturnValue.ALREADY_EXISTS, self.call('add_owner', Owner(1, 'b')))
+        self.assertEqual(ReturnValue.BAD_PARAMS, self.call('add_owner', Owner(-1, 'b')))
+        self.assertEqual(ReturnValue.OK, self.call('add_apartment', Apartment(1, 'x', 'c', 'd', 10)))
+        self.assertEqual(ReturnValue.ALREADY_EXISTS, self.call('add_apartment', Apartment(2, 'x', 'c', 'e', 10)))
+        self.assertEqual(ReturnValue.BAD_PARAMS, self.call('add_apartment', Apartment(2, 'y', 'c', 'd', 0)))
+        self.assertEqual(ReturnValue.OK, self.call('add_customer', Customer(1, 'c')))
+        self.assertEqual(ReturnValue.NOT_EXISTS, self.call('owner_owns_apartment', 2, 1))
+        self.assertEqual(ReturnValue.OK, self.call('owner_owns_apartment', 1, 1))
+        self.assertEqual(ReturnValue.ALREADY_EXISTS, self.call('owner_owns_apartment', 1, 1))
+        self.assertEqual(ReturnValue.OK,
+                         self.call('customer_made_reservation', 1, 1, date(2023, 1, 1), date(2023, 1, 5), 100))
+        # the overlap is found before the missing customer
+        self.assertEqual(ReturnValue.BAD_PARAMS,
+                         self.call('customer_made_reservation', 2, 1, date(2023, 1, 4), date(2023, 1, 8), 100))
+        self.assertEqual(ReturnValue.NOT_EXISTS,
+                         self.call('customer_made_reservation', 2, 1, date(2023, 1, 5), date(2023, 1, 8), 100))
+        # a review needs a stay that ended by its date
+        self.assertEqual(ReturnValue.NOT_EXISTS,
+                         self.call('customer_reviewed_apartment', 1, 1, date(2023, 1, 4), 5, 'early'))
+        self.assertEqual(ReturnValue.BAD_PARAMS,
+                         self.call('customer_reviewed_apartment', 1, 1, date(2023, 1, 5), 11, 'high'))
+        self.assertEqual(ReturnValue.OK, self.call('customer_reviewed_apartment', 1, 1, date(2023, 1, 5), 5, 'ok'))
+        self.assertEqual(ReturnValue.ALREADY_EXISTS,
+                         self.call('customer_reviewed_apartment', 1, 1, date(2023, 2, 1), 6, 'again'))
+        self.assertEqual(ReturnValue.NOT_EXISTS, self.call('customer_updated_review', 1, 1, date(2023, 1, 4), 6, 'u'))
+        self.assertEqual(ReturnValue.OK, self.call('customer_updated_review', 1, 1, date(2023, 1, 6), 6, 'u'))
+        # a missing id is a bad parameter, not a TypeError
+        for name in ('delete_owner', 'delete_apartment', 'delete_customer'):
+            self.assertEqual(ReturnValue.BAD_PARAMS, self.call(name, None))
+        self.assertEqual(ReturnValue.BAD_PARAMS, self.call('owner_drops_apartment', None, 1))
+        self.assertEqual(ReturnValue.BAD_PARAMS, self.call('customer_cancelled_reservation', 1, None, date(2023, 1, 1)))
+        self.assertEqual(ReturnValue.BAD_PARAMS, self.call('customer_updated_review', 1, 1, date(2023, 1, 6), None, 'u'))
+        self.assertQueriesMatch()
+
+        # deleting the apartment takes its ownership, reservations and reviews with it
+        self.assertEqual(ReturnValue.OK, self.call('delete_apartment', 1))
+        self.assertEqual(ReturnValue.NOT_EXISTS, self.call('delete_apartment', 1))
+        self.assertEqual([], self.memory.get_owner_apartments(1))
+        self.assertEqual([], list(self.memory.export_reservations()))
+        self.assertEqual([], list(self.memory.export_reviews()))
+        self.assertQueriesMatch()
+
+    def test_transaction(self) -> None:
+        with self.assertRaises(ZeroDivisionError):
+            with self.memory.transaction():
+                self.assertEqual(ReturnValue.OK, self.memory.add_owner(Owner(1, 'a')))
+                1 / 0
+        self.assertEqual(Owner.bad_owner(), self.memory.get_owner(1))
+        with self.memory.transaction():
+            self.memory.add_owner(Owner(1, 'a'))
+        self.assertEqual(Owner(1, 'a'), self.memory.get_owner(1))
+
+    def test_random(self) -> None:
+        rng = random.Random(23)
+        day = lambda: date(2023, 1, 1) + timedelta(days=rng.randint(-40, 400))
+        for _ in range(12):
+            self.call('add_owners', [(rng.randint(-1, 5), rng.choice(['a', 'b', None])) for _ in range(3)])
+            self.call('add_customers', [(rng.randint(-1, 8), rng.choice(['x', 'y'])) for _ in range(3)])
+            self.call('add_apartments', [(rng.randint(-1, 12), f'a{rng.randint(1, 15)}', f'city{rng.randint(1, 3)}',
+                                          'country', rng.randint(-5, 90)) for _ in range(3)])
+            for _ in range(4):
+                self.call('owner_owns_apartment', rng.randint(0, 5), rng.randint(0, 12))
+            reservations = []
+            for _ in range(8):
+                start = day()
+                reservations.append((rng.randint(0, 8), rng.randint(0, 12), start,
+                                     start + timedelta(days=rng.randint(0, 12)), rng.randint(-10, 2000)))
+            self.call('add_reservations', reservations[:4])
+            for reservation in reservations[4:]:
+                self.call('customer_made_reservation', *reservation)
+            for cid, hid, _, end, _ in reservations:
+                self.call('customer_reviewed_apartment', cid, hid, end + timedelta(days=rng.randint(-2, 3)),
+                          rng.randint(0, 11), rng.choice(['r', None]))
+            self.call('add_reviews', [(rng.randint(1, 8), rng.randint(1, 12), day(), rng.randint(1, 10), 'r')
+                                      for _ in range(4)])
+            for _ in range(3):
+                self.call('customer_updated_review', rng.randint(1, 8), rng.randint(1, 12), day(),
+                          rng.randint(1, 10), 'u')
+            cid, hid, start, _, _ = rng.choice(reservations)
+            self.call('customer_cancelled_reservation', cid, hid, start)
+            if rng.random() < 0.3:
+                self.call('owner_drops_apartment', rng.randint(1, 5), rng.randint(1, 12))
+                self.call(rng.choice(['delete_owner', 'delete_customer', 'delete_apartment']), rng.randint(0, 8))
+            self.assertQueriesMatch()
+
+
+# BigTest, run against a MemoryBackend
+class BigTestOnMemory(BigTest.TestCRUD):
+    # the schema is the backend's, postgres isn't touched
+    isolation = Isolation.DROP
+
+    @classmethod
+    def setUpClass(cls):
+        cls.previous_backend = Solution.use_backend(MemoryBackend())
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        Solution.use_backend(cls.previous_backend)
+        super().tearDownClass()
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
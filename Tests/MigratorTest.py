@@ -0,0 +1,151 @@
+import unittest
+import threading
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.Migrator import Migration, Migrator, MigrationError
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Owner import Owner
+from Business.Apartment import Apartment
+
+
+class Test(AbstractTest):
+    def tearDown(self) -> None:
+        Migrator([], table='MigratorTestVersion').drop(["DROP TABLE IF EXISTS MigratorTest_t"])
+        super().tearDown()
+
+    def exists(self, relation: str) -> bool:
+        conn = Connector.DBConnector()
+        try:
+            return conn.execute("SELECT to_regclass(%s) IS NOT NULL", params=(relation,))[1].rows[0][0]
+        finally:
+            conn.close()
+
+    def exists_trigger(self, name: str) -> bool:
+        conn = Connector.DBConnector()
+        try:
+            return conn.execute("SELECT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = lower(%s))",
+                                params=(name,))[1].rows[0][0]
+        finally:
+            conn.close()
+
+    def test_versions(self) -> None:
+        self.assertEqual([1, 2, 3, 4, 5, 6], Solution.schema_migrator().applied_versions())
+        self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'a')))
+        # up to date, nothing is applied and the data stays
+        self.assertEqual([], Solution.schema_migrator().migrate())
+        Solution.create_tables()
+        self.assertEqual(Owner(1, 'a'), Solution.get_owner(1))
+        for name in ['ViewAptRating', 'ViewPricePerNight', 'ViewAptValue']:
+            self.assertTrue(self.exists(name))
+
+        Solution.drop_tables()
+        self.assertEqual([], Solution.schema_migrator().applied_versions())
+        self.assertFalse(self.exists('Owner'))
+        self.assertFalse(self.exists('SchemaVersion'))
+        # for tearDown
+        Solution.create_tables()
+
+    def test_option(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_apartment(Apartment(1, 'a', 'b', 'c', 10)))
+        Solution.set_schema_options(summary_views=True)
+        try:
+            self.assertEqual(['summary_views'], [m.name for m in Solution.schema_migrator().migrate()])
+            self.assertEqual([1, 2, 3, 4, 5, 6, 8], Solution.schema_migrator().applied_versions())
+            # the summary of the existing apartment was filled
+            self.assertEqual(0, Solution.get_apartment_rating(1))
+            self.assertTrue(self.exists('AptRatingSummary'))
+        finally:
+            Solution.set_schema_options(summary_views=False)
+
+    def test_change_listener_installs_its_triggers(self) -> None:
+        self.assertFalse(self.exists_trigger('Changes_notify'))
+        try:
+            Solution.start_change_listener()
+            self.assertEqual([1, 2, 3, 4, 5, 6, 7], Solution.schema_migrator().applied_versions())
+            self.assertTrue(self.exists_trigger('Changes_notify'))
+        finally:
+            Solution.stop_change_listener()
+            Solution.set_schema_options(change_notify=False)
+
+    def test_create_tables_raises(self) -> None:
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("UPDATE SchemaVersion SET checksum = 'changed' WHERE version = 1")
+        finally:
+            conn.close()
+        with self.assertRaises(MigrationError):
+            Solution.create_tables()
+
+    def test_pre_migrator_schema(self) -> None:
+        Solution.drop_tables()
+        # the schema create_tables built before the migrator, with its data
+        conn = Connector.DBConnector()
+        try:
+            for statement in Solution.SCHEMA_TABLES_DDL + Solution.SCHEMA_VIEWS_DDL:
+                conn.execute(statement)
+            conn.execute("INSERT INTO Owner VALUES (1, 'a')")
+        finally:
+            conn.close()
+        self.assertFalse(self.exists('SchemaVersion'))
+
+        self.assertEqual([2, 3, 4, 5, 6], [m.version for m in Solution.schema_migrator().migrate()])
+        self.assertEqual([1, 2, 3, 4, 5, 6], Solution.schema_migrator().applied_versions())
+        self.assertEqual(Owner(1, 'a'), Solution.get_owner(1))
+        Solution.create_tables()
+        self.assertEqual([1, 2, 3, 4, 5, 6], Solution.schema_migrator().applied_versions())
+
+    def test_baseline(self) -> None:
+        migrator = Migrator([Migration(1, 'one', ["CREATE TABLE MigratorTest_t(x INTEGER)"]),
+                             Migration(2, 'two', ["ALTER TABLE MigratorTest_t ADD COLUMN y INTEGER"])],
+                            table='MigratorTestVersion', baseline=(1, 'MigratorTest_t'))
+        # an empty database runs every migration
+        self.assertEqual([1, 2], [m.version for m in migrator.migrate()])
+        Migrator([], table='MigratorTestVersion').drop(["DROP TABLE MigratorTest_t"])
+
+        # the table of version 1 without the version table starts at version 1
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("CREATE TABLE MigratorTest_t(x INTEGER)")
+        finally:
+            conn.close()
+        self.assertEqual([2], [m.version for m in migrator.migrate()])
+        self.assertEqual([1, 2], migrator.applied_versions())
+        self.assertEqual([], migrator.migrate())
+
+    def test_failure_rolls_back(self) -> None:
+        migrator = Migrator([Migration(1, 'one', ["CREATE TABLE MigratorTest_t(x INTEGER)"]),
+                             Migration(2, 'two', ["CREATE TABLE MigratorTest_t(x INTEGER)"])],
+                            table='MigratorTestVersion')
+        with self.assertRaises(Exception):
+            migrator.migrate()
+        self.assertFalse(self.exists('MigratorTest_t'))
+        self.assertFalse(self.exists('MigratorTestVersion'))
+
+    def test_changed_migration(self) -> None:
+        Migrator([Migration(1, 'one', ["CREATE TABLE MigratorTest_t(x INTEGER)"])],
+                 table='MigratorTestVersion').migrate()
+        with self.assertRaises(MigrationError):
+            Migrator([Migration(1, 'one', ["CREATE TABLE MigratorTest_t(y INTEGER)"])],
+                     table='MigratorTestVersion').migrate()
+        with self.assertRaises(ValueError):
+            Migrator([Migration(1, 'one', []), Migration(1, 'two', [])])
+
+    def test_concurrent(self) -> None:
+        migrator = Migrator([Migration(1, 'one', ["CREATE TABLE MigratorTest_t(x INTEGER)"])],
+                            table='MigratorTestVersion')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(migrator.migrate())) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # applied once, the others waited and found it applied
+        self.assertEqual([1, 0, 0, 0], sorted((len(r) for r in results), reverse=True))
+        self.assertEqual([1], migrator.applied_versions())
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
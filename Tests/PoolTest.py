@@ -0,0 +1,77 @@
+import unittest
+import threading
+import Utility.DBConnector as Connector
+from Utility.Exceptions import DatabaseException
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+import Solution as Solution
+from Business.Owner import Owner
+
+
+class Test(AbstractTest):
+    def setUp(self) -> None:
+        self.settings = Connector.pool_settings()
+        Connector.enable_pool(min_size=1, max_size=4, timeout=1.0)
+        super().setUp()
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        # the settings are kept by enable_pool, put back those the other tests run with
+        Connector.enable_pool(**self.settings)
+
+    def test_connections_are_reused(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'a')))
+        for _ in range(20):
+            self.assertEqual(Owner(1, 'a'), Solution.get_owner(1))
+        stats = Connector.pool_stats()
+        self.assertLessEqual(stats['size'], 4)
+        self.assertEqual(0, stats['in_use'])
+        self.assertGreater(stats['checkouts'], stats['created'])
+
+    def test_exhausted_pool_times_out(self) -> None:
+        borrowed = [Connector.DBConnector() for _ in range(4)]
+        try:
+            self.assertRaises(DatabaseException.ConnectionInvalid, Connector.DBConnector)
+            self.assertEqual(1, Connector.pool_stats()['timeouts'])
+        finally:
+            for conn in borrowed:
+                conn.close()
+        self.assertEqual(4, Connector.pool_stats()['idle'])
+
+    def test_failed_statement_is_rolled_back(self) -> None:
+        conn = Connector.DBConnector()
+        try:
+            self.assertRaises(Exception, conn.execute, "SELECT * FROM no_such_table")
+        finally:
+            conn.close()
+        self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'a')))
+
+    def test_max_lifetime_recycles(self) -> None:
+        Connector.enable_pool(min_size=0, max_size=2, max_lifetime=0)
+        conn = Connector.DBConnector()
+        conn.close()
+        stats = Connector.pool_stats()
+        self.assertEqual(1, stats['recycled'])
+        self.assertEqual(0, stats['size'])
+
+    def test_threads_share_the_pool(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'a')))
+        results = []
+
+        def worker():
+            for _ in range(10):
+                results.append(Solution.get_owner(1))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([Owner(1, 'a')] * 80, results)
+        self.assertLessEqual(Connector.pool_stats()['size'], 4)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,76 @@
+import unittest
+import BigTest
+import Solution as Solution
+import Utility.DBConnector as Connector
+import Utility.PreparedStatements as Statements
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Owner import Owner
+
+
+# the whole BigTest suite, with the parameters interpolated client side
+class TestBigTestLiteral(BigTest.TestCRUD):
+    @classmethod
+    def setUpClass(cls):
+        Statements.set_enabled(False)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        Statements.set_enabled(True)
+
+
+class Test(AbstractTest):
+    def tearDown(self) -> None:
+        Statements.set_enabled(True)
+        super().tearDown()
+
+    def execute(self, statement, params):
+        conn = Connector.DBConnector()
+        try:
+            return conn.execute(statement, params=params)[1].rows
+        finally:
+            conn.close()
+
+    def test_registry(self) -> None:
+        statement = Statements.register('PreparedStatementsTest_get', "SELECT $1::INTEGER + $2", ['INTEGER', 'INTEGER'])
+        self.assertIs(statement, Statements.get('PreparedStatementsTest_get'))
+        self.assertIn('PreparedStatementsTest_get', Statements.statements())
+        # the same query again is fine, another one under the name isn't
+        Statements.register('PreparedStatementsTest_get', "SELECT $1::INTEGER + $2", ['INTEGER', 'INTEGER'])
+        with self.assertRaises(ValueError):
+            Statements.register('PreparedStatementsTest_get', "SELECT $1", ['INTEGER'])
+        with self.assertRaises(KeyError):
+            Statements.get('PreparedStatementsTest_missing')
+
+        self.assertEqual("PREPARE PreparedStatementsTest_get (INTEGER, INTEGER) AS SELECT $1::INTEGER + $2",
+                         statement.prepare_query)
+        self.assertEqual("EXECUTE PreparedStatementsTest_get (%s, %s)", statement.execute_query)
+        self.assertEqual("SELECT %(1)s::INTEGER + %(2)s", statement.literal_query)
+        self.assertEqual({'1': 3, '2': 4}, statement.literal_params((3, 4)))
+
+    def test_both_modes(self) -> None:
+        statement = Statements.register('PreparedStatementsTest_like',
+                                        "SELECT $1 LIKE '10%', $1 LIKE '%x%', $2::INTEGER % 3", ['TEXT', 'INTEGER'])
+        self.assertEqual("SELECT %(1)s LIKE '10%%', %(1)s LIKE '%%x%%', %(2)s::INTEGER %% 3",
+                         statement.literal_query)
+        for enabled in (True, False):
+            Statements.set_enabled(enabled)
+            self.assertEqual([(True, False, 1)], self.execute(statement, ('100', 7)), enabled)
+            self.assertEqual([(False, True, 0)], self.execute(statement, ('x', 9)), enabled)
+
+    def test_api_in_both_modes(self) -> None:
+        for enabled in (True, False):
+            Statements.set_enabled(enabled)
+            self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, '100% owner')))
+            self.assertEqual(Owner(1, '100% owner'), Solution.get_owner(1))
+            self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.add_owner(Owner(1, 'a')))
+            self.assertEqual(ReturnValue.OK, Solution.delete_owner(1))
+            self.assertEqual(Owner.bad_owner(), Solution.get_owner(1))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
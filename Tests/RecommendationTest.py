@@ -0,0 +1,112 @@
+import unittest
+import random
+from datetime import date
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+# the recommendation query before CustomerRatioPairs, aggregating the ratios from Reviews on every call
+RATIOS_FROM_REVIEWS = """
+    SELECT id, avg FROM
+    Apartment INNER JOIN
+    (
+    SELECT apartment_id, AVG(ratio_rated) FROM
+    (
+        SELECT *, LEAST(GREATEST(rating*ratio_from_user, 1),10) as ratio_rated, apartment_id as hid FROM
+        (
+            Reviews
+            LEFT JOIN
+            (
+                SELECT c1, c2, AVG(ratio) as ratio_from_user FROM
+                    (
+                        SELECT r1.customer_id as c1, r2.customer_id as c2,
+                        CAST(r1.rating AS FLOAT) / CAST(r2.rating AS FLOAT) AS ratio
+                        FROM reviews as r1 JOIN reviews as r2
+                        ON r1.customer_id != r2.customer_id AND r1.apartment_id = r2.apartment_id
+                        WHERE r1.customer_id = %(cid)s
+                    )
+                GROUP BY c1, c2
+            )
+            ON c2=customer_id
+        )
+    )
+    WHERE NOT EXISTS (SELECT * FROM Reviews WHERE Reviews.customer_id = %(cid)s AND hid=Reviews.apartment_id)
+    GROUP BY apartment_id
+    )
+    ON id=apartment_id
+    ORDER BY id
+"""
+
+
+class Test(AbstractTest):
+    def execute(self, query, params=None):
+        conn = Connector.DBConnector()
+        try:
+            return conn.execute(query, params=params)[1]
+        finally:
+            conn.close()
+
+    def assertPairsMatch(self) -> None:
+        pairs = self.execute("SELECT c1, c2, ratio_sum, pair_count FROM CustomerRatioPairs")
+        expected = self.execute(
+            "SELECT R1.customer_id AS c1, R2.customer_id AS c2, SUM(R1.rating * (2520 / R2.rating)) AS ratio_sum,"
+            " COUNT(*) AS pair_count FROM Reviews R1 JOIN Reviews R2"
+            " ON R1.apartment_id = R2.apartment_id AND R1.customer_id <> R2.customer_id GROUP BY 1, 2")
+        self.assertEqual(sorted(tuple(r.values()) for r in expected), sorted(tuple(r.values()) for r in pairs))
+
+    # within the bound documented above Solution._GET_APARTMENT_RECOMMENDATION
+    def assertRecommendationsMatch(self, customers) -> None:
+        reviews = {r['apartment_id']: r['m'] for r in self.execute(
+            "SELECT apartment_id, COUNT(*) AS m FROM Reviews GROUP BY apartment_id")}
+        for cid in customers:
+            shared = self.execute("SELECT COALESCE(MAX(pair_count), 0) AS n FROM CustomerRatioPairs WHERE c1 = %s",
+                                  (cid,))[0]['n']
+            expected = [(r['id'], r['avg']) for r in self.execute(RATIOS_FROM_REVIEWS, {'cid': cid})]
+            actual = [(a.get_id(), avg) for a, avg in Solution.get_apartment_recommendation(cid)]
+            self.assertEqual([hid for hid, _ in expected], [hid for hid, _ in actual])
+            for (hid, e), (_, a) in zip(expected, actual):
+                self.assertLessEqual(abs(e - a), (shared + reviews[hid] + 2) * 2 ** -52 * e)
+
+    def test_pairs_follow_changes(self) -> None:
+        rng = random.Random(14)
+        Solution.add_customers([(i, f'c{i}') for i in range(1, 21)])
+        Solution.add_apartments([(i, f'a{i}', 'city', 'country', 50) for i in range(1, 16)])
+        stays = [(cid, hid) for cid in range(1, 21) for hid in range(1, 16) if rng.random() < 0.4]
+        Solution.add_reservations([(cid, hid, date(2023, 1, 1 + cid), date(2023, 1, 1 + cid), 100)
+                                   for cid, hid in stays])
+        self.assertEqual([ReturnValue.OK] * len(stays), Solution.add_reviews(
+            [(cid, hid, date(2023, 3, 1), rng.randint(1, 10), 'r') for cid, hid in stays]))
+        self.assertPairsMatch()
+        self.assertRecommendationsMatch(range(1, 22))
+
+        for cid, hid in rng.sample(stays, 30):
+            self.assertEqual(ReturnValue.OK, Solution.customer_updated_review(
+                cid, hid, date(2023, 4, 1), rng.randint(1, 10), 'u'))
+        self.assertPairsMatch()
+
+        self.assertEqual(ReturnValue.OK, Solution.delete_customer(3))
+        self.assertEqual(ReturnValue.OK, Solution.delete_apartment(7))
+        self.execute("DELETE FROM Reviews WHERE customer_id = 5")
+        self.assertPairsMatch()
+        self.assertRecommendationsMatch(range(1, 22))
+
+    def test_backfill(self) -> None:
+        Solution.add_customers([(1, 'a'), (2, 'b')])
+        Solution.add_apartments([(1, 'a', 'city', 'country', 50), (2, 'b', 'city', 'country', 50)])
+        Solution.add_reservations([(1, 1, date(2023, 1, 1), date(2023, 1, 2), 10),
+                                   (2, 1, date(2023, 1, 3), date(2023, 1, 4), 10),
+                                   (2, 2, date(2023, 1, 3), date(2023, 1, 4), 10)])
+        Solution.add_reviews([(1, 1, date(2023, 2, 1), 8, 'x'), (2, 1, date(2023, 2, 1), 6, 'x'),
+                              (2, 2, date(2023, 2, 1), 3, 'x')])
+        self.execute("DELETE FROM CustomerRatioPairs")
+        self.execute(Solution.RATIO_PAIRS_DDL[-1])
+        self.assertPairsMatch()
+        recommendation = Solution.get_apartment_recommendation(1)
+        self.assertEqual([2], [a.get_id() for a, _ in recommendation])
+        self.assertEqual(3 * 8 / 6, recommendation[0][1])
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,101 @@
+import unittest
+import random
+from datetime import date, timedelta
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Customer import Customer
+
+
+class Test(AbstractTest):
+    def execute(self, query, params=None):
+        conn = Connector.DBConnector()
+        try:
+            return conn.execute(query, params=params)[1]
+        finally:
+            conn.close()
+
+    # the API against the same counts aggregated from the tables
+    def assertCountsMatch(self) -> None:
+        expected = self.execute(
+            "SELECT O.name, COUNT(R.apartment_id) AS res_count FROM Owner O"
+            " LEFT JOIN OwnedBy B ON B.owner_id = O.ownerid LEFT JOIN Reservations R ON R.apartment_id = B.apartment_id"
+            " GROUP BY O.ownerid, O.name")
+        self.assertEqual(sorted((r['name'], r['res_count']) for r in expected), sorted(Solution.reservations_per_owner()))
+        expected = self.execute(
+            "SELECT C.id FROM Reservations R INNER JOIN Customer C ON C.id = R.customer_id"
+            " GROUP BY C.id ORDER BY COUNT(*) DESC, C.id")
+        expected = [r['id'] for r in expected]
+        for k in (1, 3, 100):
+            self.assertEqual(expected[:k], [c.get_customer_id() for c in Solution.get_top_customers(k)])
+
+    def test_top_customers(self) -> None:
+        Solution.add_customers([(i, f'c{i}') for i in range(1, 5)])
+        Solution.add_apartments([(1, 'a', 'x', 'y', 10), (2, 'b', 'x', 'y', 10)])
+        self.assertEqual([], Solution.get_top_customers(3))
+        Solution.add_reservations([(3, 1, date(2023, 1, 1), date(2023, 1, 2), 10),
+                                   (3, 2, date(2023, 1, 1), date(2023, 1, 2), 10),
+                                   (2, 1, date(2023, 1, 3), date(2023, 1, 4), 10),
+                                   (1, 2, date(2023, 1, 3), date(2023, 1, 4), 10)])
+        self.assertEqual([Customer(3, 'c3'), Customer(1, 'c1'), Customer(2, 'c2')], Solution.get_top_customers(5))
+        self.assertEqual([Customer(3, 'c3'), Customer(1, 'c1')], Solution.get_top_customers(2))
+        self.assertEqual(Customer(3, 'c3'), Solution.get_top_customer())
+        self.assertEqual([], Solution.get_top_customers(0))
+        self.assertEqual(ReturnValue.OK, Solution.customer_cancelled_reservation(3, 1, date(2023, 1, 1)))
+        self.assertEqual([Customer(1, 'c1'), Customer(2, 'c2'), Customer(3, 'c3')], Solution.get_top_customers(5))
+
+    def test_counts_follow_changes(self) -> None:
+        rng = random.Random(16)
+        Solution.add_owners([(i, f'o{i}') for i in range(1, 6)])
+        Solution.add_customers([(i, f'c{i}') for i in range(1, 16)])
+        Solution.add_apartments([(i, f'a{i}', 'city', 'country', 10) for i in range(1, 21)])
+        for aid in range(1, 17):
+            Solution.owner_owns_apartment(rng.randint(1, 5), aid)
+        stays = []
+        for _ in range(150):
+            start = date(2023, 1, 1) + timedelta(days=rng.randint(0, 300))
+            stays.append((rng.randint(1, 15), rng.randint(1, 20), start, start + timedelta(days=rng.randint(0, 5)), 10))
+        Solution.add_reservations(stays)
+        self.assertCountsMatch()
+
+        for _ in range(40):
+            action = rng.random()
+            if action < 0.3:
+                aid = rng.randint(1, 20)
+                owner = Solution.get_apartment_owner(aid)
+                if owner.get_owner_id() is not None:
+                    self.assertEqual(ReturnValue.OK, Solution.owner_drops_apartment(owner.get_owner_id(), aid))
+                else:
+                    Solution.owner_owns_apartment(rng.randint(1, 5), aid)
+            elif action < 0.6:
+                cid, aid, start, _, _ = rng.choice(stays)
+                Solution.customer_cancelled_reservation(cid, aid, start)
+            elif action < 0.75:
+                Solution.delete_apartment(rng.randint(1, 20))
+            elif action < 0.9:
+                Solution.delete_customer(rng.randint(1, 15))
+            else:
+                Solution.delete_owner(rng.randint(1, 5))
+            self.assertCountsMatch()
+
+    def test_backfill(self) -> None:
+        Solution.add_owners([(1, 'o')])
+        Solution.add_customers([(1, 'a'), (2, 'b')])
+        Solution.add_apartments([(1, 'a', 'x', 'y', 10)])
+        Solution.owner_owns_apartment(1, 1)
+        Solution.add_reservations([(2, 1, date(2023, 1, 1), date(2023, 1, 2), 10),
+                                   (1, 1, date(2023, 1, 3), date(2023, 1, 4), 10),
+                                   (2, 1, date(2023, 1, 5), date(2023, 1, 6), 10)])
+        for table in ('ApartmentReservations', 'OwnerReservations', 'CustomerReservations'):
+            self.execute(f"DELETE FROM {table}")
+        for query in Solution.RESERVATION_COUNTS_DDL[-3:]:
+            self.execute(query)
+        self.assertEqual([('o', 3)], Solution.reservations_per_owner())
+        self.assertEqual([Customer(2, 'b'), Customer(1, 'a')], Solution.get_top_customers(2))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,49 @@
+import unittest
+from collections import namedtuple
+
+from Utility.DBConnector import ResultSet, ResultSetDict
+
+Column = namedtuple('Column', ['name'])
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.rows = [(1, 'Nosh', 150), (2, 'Marv', 120)]
+        self.rs = ResultSet([Column('id'), Column('address'), Column('size')], self.rows)
+
+    def test_rows_are_not_copied(self) -> None:
+        self.assertIs(self.rows, self.rs.rows)
+        self.assertIs(self.rows[1], self.rs[1].raw())
+
+    def test_row_access(self) -> None:
+        self.assertEqual(2, self.rs.size())
+        self.assertEqual('Nosh', self.rs[0]['address'])
+        self.assertEqual('Nosh', self.rs[0]['Address'])
+        self.assertEqual(120, self.rs[1]['SIZE'])
+        self.assertIsNone(self.rs[0][0])
+        self.assertRaises(KeyError, lambda: self.rs[0]['missing'])
+        self.assertEqual({'id': 1, 'address': 'Nosh', 'size': 150}, self.rs[0])
+
+    def test_column_access(self) -> None:
+        self.assertEqual([1, 2], self.rs['ID'])
+        self.assertEqual(['Nosh', 'Marv'], self.rs['address'])
+
+    def test_iteration(self) -> None:
+        self.assertEqual([150, 120], [r['size'] for r in self.rs])
+        self.assertEqual([('id', 2), ('address', 'Marv'), ('size', 120)], list(self.rs)[1].items())
+
+    def test_repeated_column_takes_last_value(self) -> None:
+        rs = ResultSet([Column('apartment_id'), Column('id'), Column('apartment_id')], [(1, 5, 7)])
+        self.assertEqual(7, rs[0]['apartment_id'])
+        self.assertEqual(['apartment_id', 'id'], rs[0].keys())
+
+    def test_empty(self) -> None:
+        rs = ResultSet()
+        self.assertTrue(rs.isEmpty())
+        self.assertEqual([], list(rs))
+        self.assertEqual(ResultSetDict(), rs[0])
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,74 @@
+import unittest
+import random
+from datetime import date, timedelta
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Apartment import Apartment
+from Business.Customer import Customer
+
+
+class Test(AbstractTest):
+    def setUp(self) -> None:
+        super().setUp()
+        Solution.add_customers([(i, f'c{i}') for i in range(1, 6)])
+        Solution.add_apartments([(i, f'a{i}', 'city', 'country', 50) for i in range(1, 6)])
+
+    def rollup(self):
+        conn = Connector.DBConnector()
+        try:
+            _, result = conn.execute("SELECT year, month, revenue, res_count FROM MonthlyRevenue")
+            rollup = sorted(tuple(r.values()) for r in result)
+            _, result = conn.execute(
+                "SELECT EXTRACT(YEAR FROM end_date)::INTEGER AS year, EXTRACT(MONTH FROM end_date)::INTEGER AS month,"
+                " SUM(total_price), COUNT(*)::INTEGER FROM Reservations GROUP BY 1, 2")
+            return rollup, sorted(tuple(r.values()) for r in result)
+        finally:
+            conn.close()
+
+    def test_zero_filled(self) -> None:
+        self.assertEqual([(m, 0) for m in range(1, 13)], Solution.profit_per_month(2023))
+        self.assertEqual(ReturnValue.OK, Solution.customer_made_reservation(
+            1, 1, date(2022, 12, 30), date(2023, 2, 2), 1000))
+        self.assertEqual([(m, 1000 * 0.15 if m == 2 else 0) for m in range(1, 13)], Solution.profit_per_month(2023))
+        self.assertEqual([(m, 0) for m in range(1, 13)], Solution.profit_per_month(2022))
+
+    def test_range(self) -> None:
+        Solution.add_reservations([(1, 1, date(2022, 3, 1), date(2022, 3, 4), 100),
+                                   (2, 2, date(2024, 12, 1), date(2024, 12, 31), 200)])
+        profits = Solution.profit_per_month_range(2022, 2024)
+        self.assertEqual(36, len(profits))
+        self.assertEqual((2022, 3, 100 * 0.15), profits[2])
+        self.assertEqual((2024, 12, 200 * 0.15), profits[35])
+        self.assertEqual(100 * 0.15 + 200 * 0.15, sum(p for _, _, p in profits))
+        self.assertEqual([], Solution.profit_per_month_range(2024, 2023))
+
+    def test_rollup_follows_changes(self) -> None:
+        rng = random.Random(3)
+        stays = []
+        for _ in range(200):
+            cid, hid = rng.randint(1, 5), rng.randint(1, 5)
+            start = date(2023, 1, 1) + timedelta(days=rng.randint(0, 700))
+            end = start + timedelta(days=rng.randint(0, 40))
+            price = rng.randint(1, 10 ** 6) / 7
+            if Solution.customer_made_reservation(cid, hid, start, end, price) == ReturnValue.OK:
+                stays.append((cid, hid, start))
+        rollup, expected = self.rollup()
+        self.assertEqual(expected, rollup)
+
+        for cid, hid, start in rng.sample(stays, len(stays) // 2):
+            self.assertEqual(ReturnValue.OK, Solution.customer_cancelled_reservation(cid, hid, start))
+        self.assertEqual(ReturnValue.OK, Solution.delete_customer(1))
+        self.assertEqual(ReturnValue.OK, Solution.delete_apartment(2))
+        rollup, expected = self.rollup()
+        self.assertEqual(expected, rollup)
+
+        Solution.clear_tables()
+        self.assertEqual(([], []), self.rollup())
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,42 @@
+import unittest
+from datetime import date
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Apartment import Apartment
+from Business.Customer import Customer
+
+
+class Test(AbstractTest):
+    def setUp(self) -> None:
+        super().setUp()
+        self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'c')))
+        self.assertEqual(ReturnValue.OK, Solution.add_apartment(Apartment(1, 'a', 'b', 'c', 10)))
+        for month in range(1, 13):
+            self.assertEqual(ReturnValue.OK, Solution.customer_made_reservation(
+                1, 1, date(2023, month, 1), date(2023, month, 5), 100 * month))
+
+    def test_stream_all_rows(self) -> None:
+        rows = list(Solution.export_reservations(itersize=5))
+        self.assertEqual(12, len(rows))
+        self.assertEqual(sum(100 * m for m in range(1, 13)), sum(r['total_price'] for r in rows))
+        self.assertEqual(0, Connector.pool_stats()['in_use'])
+
+    def test_stop_early_releases_connection(self) -> None:
+        stream = Solution.export_reservations(itersize=2)
+        first = [next(stream) for _ in range(3)]
+        self.assertEqual(3, len(first))
+        self.assertEqual(1, Connector.pool_stats()['in_use'])
+        stream.close()
+        self.assertEqual(0, Connector.pool_stats()['in_use'])
+        self.assertEqual(ReturnValue.OK, Solution.customer_cancelled_reservation(1, 1, date(2023, 1, 1)))
+
+    def test_empty_stream(self) -> None:
+        self.assertEqual([], list(Solution.export_reviews()))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
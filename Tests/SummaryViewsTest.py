@@ -0,0 +1,115 @@
+import unittest
+import random
+from datetime import date, timedelta
+import BigTest
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+import Tests.Isolation as Isolation
+
+from Business.Apartment import Apartment
+
+
+# the whole BigTest suite, on the summary tables
+class TestBigTest(BigTest.TestCRUD):
+    @classmethod
+    def setUpClass(cls):
+        Solution.set_schema_options(summary_views=True)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        Solution.set_schema_options(summary_views=False)
+
+
+class Test(AbstractTest):
+    # test_summaries_backfill_existing_rows builds the summaries outside of the migrations
+    isolation = Isolation.DROP
+
+    def setUp(self) -> None:
+        Solution.set_schema_options(summary_views=True)
+        super().setUp()
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        Solution.set_schema_options(summary_views=False)
+
+    def query(self, query):
+        conn = Connector.DBConnector()
+        try:
+            return sorted((tuple(r.values()) for r in conn.execute(query)[1]), key=repr)
+        finally:
+            conn.close()
+
+    # the views over the summary tables against the aggregates they replace
+    def assertSummariesMatch(self) -> None:
+        self.assertEqual(self.query(
+            "SELECT O.owner_id, A.id, AVG(COALESCE(R.rating, 0)) FROM Apartment A"
+            " LEFT JOIN OwnedBy O ON A.id = O.apartment_id LEFT JOIN Reviews R ON A.id = R.apartment_id"
+            " GROUP BY O.owner_id, A.id"),
+            self.query("SELECT owner_id, apartment_id, average_rating FROM ViewAptRating"))
+        # exactly the average of the numeric prices, and AVG over the float8 prices up to its rounding
+        prices = self.query("SELECT apartment_id, avg_price_per_night FROM ViewPricePerNight")
+        self.assertEqual(self.query(
+            "SELECT apartment_id, AVG(total_price::NUMERIC / (1+end_date-start_date))::FLOAT FROM Reservations"
+            " GROUP BY apartment_id"), prices)
+        averages = self.query(
+            "SELECT apartment_id, AVG(total_price / (1+end_date-start_date)) FROM Reservations GROUP BY apartment_id")
+        self.assertEqual([hid for hid, _ in averages], [hid for hid, _ in prices])
+        for (_, average), (_, price) in zip(averages, prices):
+            self.assertAlmostEqual(average, price, delta=abs(average) * 1e-12)
+
+    def test_random_changes(self) -> None:
+        rng = random.Random(7)
+        Solution.add_owners([(i, f'o{i}') for i in range(1, 6)])
+        Solution.add_customers([(i, f'c{i}') for i in range(1, 21)])
+        Solution.add_apartments([(i, f'a{i}', 'city', 'country', 50) for i in range(1, 16)])
+        for hid in range(1, 13):
+            self.assertEqual(ReturnValue.OK, Solution.owner_owns_apartment(rng.randint(1, 5), hid))
+        stays = []
+        for _ in range(120):
+            cid, hid = rng.randint(1, 20), rng.randint(1, 15)
+            start = date(2023, 1, 1) + timedelta(days=rng.randint(0, 300))
+            end = start + timedelta(days=rng.randint(0, 5))
+            if Solution.customer_made_reservation(cid, hid, start, end, rng.randint(100, 999)) == ReturnValue.OK:
+                stays.append((cid, hid, start, end))
+                Solution.customer_reviewed_apartment(cid, hid, end, rng.randint(1, 10), 'r')
+        self.assertSummariesMatch()
+
+        for cid, hid, start, end in rng.sample(stays, 20):
+            Solution.customer_updated_review(cid, hid, end + timedelta(days=1), rng.randint(1, 10), 'u')
+            Solution.customer_cancelled_reservation(cid, hid, start)
+        Solution.owner_drops_apartment(Solution.get_apartment_owner(1).get_owner_id(), 1)
+        self.assertEqual(ReturnValue.OK, Solution.delete_customer(3))
+        self.assertEqual(ReturnValue.OK, Solution.delete_apartment(2))
+        self.assertEqual(ReturnValue.OK, Solution.delete_owner(4))
+        self.assertSummariesMatch()
+
+        # moved and repriced stays leave the sums of both apartments exact
+        self.query("UPDATE Reservations SET apartment_id = 13 WHERE apartment_id = 5")
+        self.query("UPDATE Reservations SET total_price = total_price / 3 WHERE apartment_id IN (6, 13)")
+        self.assertSummariesMatch()
+
+    def test_summaries_backfill_existing_rows(self) -> None:
+        Solution.drop_tables()
+        Solution.set_schema_options(summary_views=False)
+        Solution.create_tables()
+        Solution.add_apartments([(1, 'a', 'b', 'c', 10), (2, 'd', 'e', 'f', 10)])
+        Solution.add_customers([(1, 'c')])
+        Solution.add_reservations([(1, 1, date(2023, 1, 1), date(2023, 1, 3), 300)])
+        Solution.add_reviews([(1, 1, date(2023, 1, 4), 7, 'r')])
+        for q in Solution.SUMMARY_VIEWS_DDL:
+            conn = Connector.DBConnector()
+            try:
+                conn.execute(q)
+            finally:
+                conn.close()
+        self.assertSummariesMatch()
+        self.assertEqual(Apartment(1, 'a', 'b', 'c', 10), Solution.best_value_for_money())
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
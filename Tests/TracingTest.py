@@ -0,0 +1,84 @@
+import unittest
+import json
+import os
+import tempfile
+import Solution as Solution
+import Utility.DBConnector as Connector
+import Utility.Tracing as Tracing
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Owner import Owner
+from Business.Apartment import Apartment
+
+
+class Test(AbstractTest):
+    def tearDown(self) -> None:
+        Tracing.disable()
+        super().tearDown()
+
+    def test_disabled_records_nothing(self) -> None:
+        self.assertFalse(Tracing.is_enabled())
+        self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'o')))
+        self.assertIsNone(Tracing.current_span())
+
+    def test_span_per_call(self) -> None:
+        sink = Tracing.enable()
+        self.assertEqual(ReturnValue.OK, Solution.add_apartment(Apartment(1, 'a', 'b', 'c', 10)))
+        self.assertEqual(Apartment(1, 'a', 'b', 'c', 10), Solution.get_apartment(1))
+        self.assertEqual(Apartment(1, 'a', 'b', 'c', 10), Solution.get_apartment(1))
+        self.assertEqual(ReturnValue.BAD_PARAMS, Solution.add_apartment(Apartment(-1, 'a', 'b', 'c', 10)))
+
+        spans = sink.spans()
+        self.assertEqual(['add_apartment', 'get_apartment', 'get_apartment', 'add_apartment'], [s.name for s in spans])
+        # a call PREPAREs its statement only on a pooled connection that hasn't yet, so the PREPAREs
+        # depend on the tests that ran before, every call EXECUTEs once
+        for span in spans[:3]:
+            self.assertEqual(1, span.statements - span.prepares)
+            self.assertIn(span.prepares, (0, 1))
+        get = spans[2]
+        for phase in ('connect', 'execute', 'fetch', 'materialize', 'build', 'other'):
+            self.assertIn(phase, get.phases)
+        self.assertAlmostEqual(get.duration, sum(get.phases.values()), delta=1e-6)
+        self.assertEqual(0, spans[3].statements)
+        self.assertEqual(0, spans[3].prepares)
+        self.assertIsNone(spans[3].error)
+
+    def test_prepare_phase(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_apartment(Apartment(1, 'a', 'b', 'c', 10)))
+        # a new pool, its connection hasn't prepared anything
+        Connector.enable_pool()
+        sink = Tracing.enable()
+        self.assertEqual(Apartment(1, 'a', 'b', 'c', 10), Solution.get_apartment(1))
+        self.assertEqual(Apartment(1, 'a', 'b', 'c', 10), Solution.get_apartment(1))
+
+        cold, warm = sink.spans()
+        self.assertEqual((2, 1), (cold.statements, cold.prepares))
+        self.assertIn('prepare', cold.phases)
+        self.assertEqual((1, 0), (warm.statements, warm.prepares))
+        self.assertNotIn('prepare', warm.phases)
+
+    def test_nested_calls_share_the_outer_span(self) -> None:
+        sink = Tracing.enable()
+        Solution.add_owners([(1, 'a'), (2, 'b')])
+        self.assertEqual(['add_owners'], [s.name for s in sink.spans()])
+
+    def test_jsonl_sink(self) -> None:
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        try:
+            sink = Tracing.enable(Tracing.JsonlSink(path))
+            Solution.add_owner(Owner(1, 'o'))
+            Solution.get_owner(1)
+            sink.close()
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual(['add_owner', 'get_owner'], [line['name'] for line in lines])
+            self.assertIn('execute', lines[1]['phases'])
+        finally:
+            os.remove(path)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,85 @@
+import unittest
+from datetime import date
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+from Business.Apartment import Apartment
+from Business.Owner import Owner
+from Business.Customer import Customer
+
+
+class Test(AbstractTest):
+    def test_commit_once(self) -> None:
+        with Solution.transaction():
+            self.assertTrue(Solution.in_transaction())
+            self.assertEqual(ReturnValue.OK, Solution.add_apartment(Apartment(1, 'a', 'b', 'c', 10)))
+            self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'o')))
+            self.assertEqual(ReturnValue.OK, Solution.owner_owns_apartment(1, 1))
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'c')))
+            self.assertEqual(ReturnValue.OK, Solution.customer_made_reservation(1, 1, date(2023, 1, 1),
+                                                                                date(2023, 1, 5), 100))
+            self.assertEqual(1, Connector.pool_stats()['in_use'])
+        self.assertFalse(Solution.in_transaction())
+        self.assertEqual(Owner(1, 'o'), Solution.get_apartment_owner(1))
+
+    def test_failed_calls_keep_the_transaction(self) -> None:
+        with Solution.transaction():
+            self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'o')))
+            self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.add_owner(Owner(1, 'x')))
+            self.assertEqual(ReturnValue.BAD_PARAMS, Solution.add_owner(Owner(2, None)))
+            self.assertEqual(ReturnValue.NOT_EXISTS, Solution.owner_owns_apartment(1, 1))
+            self.assertEqual(Owner(1, 'o'), Solution.get_owner(1))
+            self.assertEqual([ReturnValue.OK, ReturnValue.ALREADY_EXISTS], Solution.add_owners([(3, 'c'), (1, 'd')]))
+        self.assertEqual(Owner(1, 'o'), Solution.get_owner(1))
+        self.assertEqual(Owner(3, 'c'), Solution.get_owner(3))
+
+    def test_rollback_on_exception(self) -> None:
+        with self.assertRaises(RuntimeError):
+            with Solution.transaction():
+                self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'o')))
+                raise RuntimeError()
+        self.assertEqual(Owner.bad_owner(), Solution.get_owner(1))
+        self.assertEqual(0, Connector.pool_stats()['in_use'])
+
+    def test_nested_block_rolls_back_alone(self) -> None:
+        with Solution.transaction():
+            self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'o')))
+            try:
+                with Solution.transaction():
+                    self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(2, 'p')))
+                    raise RuntimeError()
+            except RuntimeError:
+                pass
+        self.assertEqual(Owner(1, 'o'), Solution.get_owner(1))
+        self.assertEqual(Owner.bad_owner(), Solution.get_owner(2))
+
+    def test_clear_tables_joins_the_transaction(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(2, 'p')))
+        with self.assertRaises(RuntimeError):
+            with Solution.transaction():
+                self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'o')))
+                Solution.clear_tables()
+                self.assertEqual(Owner.bad_owner(), Solution.get_owner(2))
+                self.assertEqual(1, Connector.pool_stats()['in_use'])
+                raise RuntimeError()
+        self.assertEqual(Owner(2, 'p'), Solution.get_owner(2))
+        with Solution.transaction():
+            self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'o')))
+            Solution.clear_tables()
+        self.assertEqual(Owner.bad_owner(), Solution.get_owner(2))
+        self.assertEqual(Owner.bad_owner(), Solution.get_owner(1))
+
+    def test_schema_changes_refuse_the_transaction(self) -> None:
+        with Solution.transaction():
+            self.assertEqual(ReturnValue.OK, Solution.add_owner(Owner(1, 'o')))
+            self.assertRaises(RuntimeError, Solution.create_tables)
+            self.assertRaises(RuntimeError, Solution.drop_tables)
+            self.assertEqual(Owner(1, 'o'), Solution.get_owner(1))
+        self.assertEqual(Owner(1, 'o'), Solution.get_owner(1))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,266 @@
+import asyncio
+import time
+import weakref
+from typing import Union
+
+import psycopg2
+from psycopg2 import extensions, sql
+
+import Utility.DBConnector as Connector
+import Utility.PreparedStatements as PreparedStatements
+import Utility.Tracing as Tracing
+from Utility.ConnectionPool import PooledConnection
+from Utility.DBConnector import ResultSet
+from Utility.Exceptions import DatabaseException
+
+# asyncio counterpart of DBConnector, built on psycopg2's asynchronous connections
+# the socket of a connection is polled from the event loop, so a coroutine waiting on postgres lets
+# the other coroutines of the loop run
+# asynchronous connections are always in autocommit mode, every execute is its own transaction
+
+# every event loop has its own pool, created on first use
+_pools = weakref.WeakKeyDictionary()
+_pool_settings = {
+    'max_size': 10,
+    'max_lifetime': 1800.0,
+    'timeout': 30.0,
+}
+
+
+# settings of the pools created from now on
+def configure_pool(**settings):
+    _pool_settings.update(settings)
+
+
+# statistics of the pool of the running loop, None when it has no pool
+def pool_stats():
+    pool = _pools.get(asyncio.get_running_loop())
+    return pool.stats() if pool is not None else None
+
+
+async def close_pool():
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        pool.close()
+
+
+def _get_pool() -> 'AsyncConnectionPool':
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = AsyncConnectionPool(**_pool_settings)
+    return pool
+
+
+# waits until the pending operation of conn is done, errors of the operation are raised from poll()
+async def _wait(conn):
+    loop = asyncio.get_running_loop()
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        if state == extensions.POLL_READ:
+            add, remove = loop.add_reader, loop.remove_reader
+        elif state == extensions.POLL_WRITE:
+            add, remove = loop.add_writer, loop.remove_writer
+        else:
+            raise psycopg2.OperationalError(f"poll() returned {state}")
+        ready = loop.create_future()
+        fd = conn.fileno()
+        add(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            remove(fd)
+
+
+async def _connect() -> PooledConnection:
+    connection = psycopg2.connect(connection_factory=PooledConnection, async_=True,
+                                  **Connector.connection_params())
+    try:
+        await _wait(connection)
+    except BaseException:
+        connection.close()
+        raise
+    return connection
+
+
+class AsyncConnectionPool:
+    # pool of asynchronous connections, bound to the event loop that uses it
+    # max_size - upper bound on open connections (idle + checked out)
+    # max_lifetime - seconds after which a connection is closed instead of reused
+    # timeout - seconds getconn waits for a free connection before giving up
+    def __init__(self, max_size=10, max_lifetime=1800.0, timeout=30.0):
+        if max_size < 1:
+            raise ValueError("Invalid pool size")
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.__slots = asyncio.Semaphore(max_size)
+        self.__idle = []
+        self.__size = 0
+        self.__in_use = 0
+        self.__closed = False
+        self.__stats = {
+            'created': 0,
+            'checkouts': 0,
+            'timeouts': 0,
+            'recycled': 0,
+            'discarded': 0,
+        }
+
+    async def getconn(self, timeout=None):
+        if self.__closed:
+            raise DatabaseException.ConnectionInvalid("Connection pool is closed")
+        try:
+            await asyncio.wait_for(self.__slots.acquire(), self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self.__stats['timeouts'] += 1
+            raise DatabaseException.ConnectionInvalid("Connection pool exhausted")
+
+        try:
+            conn = None
+            while self.__idle and conn is None:
+                conn = self.__idle.pop()
+                if conn.closed or self.__expired(conn):
+                    self.__stats['discarded' if conn.closed else 'recycled'] += 1
+                    self.__close(conn)
+                    conn = None
+            if conn is None:
+                self.__size += 1
+                try:
+                    conn = await _connect()
+                except BaseException:
+                    self.__size -= 1
+                    raise
+                self.__stats['created'] += 1
+        except BaseException:
+            self.__slots.release()
+            raise
+
+        self.__in_use += 1
+        self.__stats['checkouts'] += 1
+        return conn
+
+    # a connection still busy (its coroutine was cancelled mid query) or broken is closed, not reused
+    def putconn(self, conn, discard=False):
+        self.__in_use -= 1
+        if discard or conn.closed or conn.isexecuting():
+            self.__stats['discarded'] += 1
+            self.__close(conn)
+        elif self.__expired(conn):
+            self.__stats['recycled'] += 1
+            self.__close(conn)
+        elif self.__closed:
+            self.__close(conn)
+        else:
+            conn.last_used = time.monotonic()
+            self.__idle.append(conn)
+        self.__slots.release()
+
+    # close every idle connection, checked out ones are closed when returned
+    def close(self):
+        self.__closed = True
+        while self.__idle:
+            self.__close(self.__idle.pop())
+
+    def stats(self) -> dict:
+        stats = dict(self.__stats)
+        stats.update({
+            'max_size': self.max_size,
+            'size': self.__size,
+            'idle': len(self.__idle),
+            'in_use': self.__in_use,
+            'closed': self.__closed,
+        })
+        return stats
+
+    def __expired(self, conn) -> bool:
+        return self.max_lifetime is not None and time.monotonic() - conn.created_at >= self.max_lifetime
+
+    def __close(self, conn):
+        self.__size -= 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+
+class AsyncDBConnector:
+    # borrows a connection from the pool of the running loop, use as "async with AsyncDBConnector() as conn:"
+    def __init__(self):
+        self.pool = None
+        self.connection = None
+
+    async def open(self):
+        try:
+            with Tracing.phase('connect'):
+                self.pool = _get_pool()
+                self.connection = await self.pool.getconn()
+        except DatabaseException.ConnectionInvalid:
+            raise
+        except psycopg2.Error:
+            raise DatabaseException.ConnectionInvalid("Could not connect to database")
+        return self
+
+    # returns the connection to the pool
+    def close(self):
+        if self.connection is not None:
+            self.pool.putconn(self.connection)
+            self.connection = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    # same contract as DBConnector.execute, except that every statement commits on its own
+    # returns the number of rows effected and a ResultSet (for SELECT)
+    async def execute(self, query: Union[str, sql.Composed, PreparedStatements.Statement], printSchema=False,
+                      params=None) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        cursor = self.connection.cursor()
+        try:
+            if isinstance(query, PreparedStatements.Statement):
+                with Tracing.phase('compose'):
+                    query, params = await self.__statement_query(cursor, query, params or ())
+            try:
+                with Tracing.phase('execute'):
+                    Tracing.statement()
+                    cursor.execute(query, params)
+                    await _wait(self.connection)
+            except Connector._VIOLATION_ERRORS as e:
+                raise Connector._VIOLATIONS[type(e)](Connector._VIOLATIONS[type(e)].__name__)
+            row_effected = max(cursor.rowcount, 0)
+
+            # get entries in case of SELECT
+            if cursor.description is not None:
+                with Tracing.phase('fetch'):
+                    rows = cursor.fetchall()
+                with Tracing.phase('materialize'):
+                    entries = ResultSet(cursor.description, rows)
+            else:
+                entries = ResultSet()
+        finally:
+            cursor.close()
+
+        # print SELECT entries
+        if printSchema:
+            print(entries)
+
+        return row_effected, entries
+
+    # PREPAREs the statement on this connection the first time it is used here
+    async def __statement_query(self, cursor, statement: PreparedStatements.Statement, params):
+        if not PreparedStatements.is_enabled():
+            return statement.literal_query, statement.literal_params(params)
+        if statement.name not in self.connection.prepared:
+            with Tracing.phase('prepare'):
+                Tracing.statement(prepare=True)
+                cursor.execute(statement.prepare_query)
+                await _wait(self.connection)
+            self.connection.prepared.add(statement.name)
+        return statement.execute_query, tuple(params)
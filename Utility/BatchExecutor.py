@@ -0,0 +1,164 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Sequence
+
+import psycopg2
+
+import Utility.DBConnector as Connector
+from Utility.Exceptions import DatabaseException
+from Utility.ReturnValue import ReturnValue
+
+# what a call may raise and still report timeout_result, anything else is a bug and is raised to the caller
+_DATABASE_ERRORS = (DatabaseException, DatabaseException.ConnectionInvalid, DatabaseException.NOT_NULL_VIOLATION,
+                    DatabaseException.FOREIGN_KEY_VIOLATION, DatabaseException.UNIQUE_VIOLATION,
+                    DatabaseException.CHECK_VIOLATION, DatabaseException.EXCLUSION_VIOLATION,
+                    DatabaseException.database_ini_ERROR, DatabaseException.UNKNOWN_ERROR, psycopg2.Error)
+
+
+class _Call:
+    # one call of a batch, remembers when a worker picked it up so its timeout counts from there
+    # and the thread running it so a timed out call can be cancelled on the server
+    # a worker picking it up after start_by drops it instead of running it
+    __slots__ = ('fn', 'args', 'start_by', 'future', 'dropped', 'started_at', 'started', 'thread', 'result',
+                 'error', 'done', 'lock')
+
+    def __init__(self, fn, args, start_by):
+        self.fn = fn
+        self.args = args
+        self.start_by = start_by
+        self.future = None
+        self.dropped = False
+        self.started_at = None
+        self.started = threading.Event()
+        self.thread = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+    def run(self):
+        with self.lock:
+            if self.dropped or time.monotonic() > self.start_by:
+                self.dropped = True
+                return
+            self.thread = threading.get_ident()
+            self.started_at = time.monotonic()
+            self.started.set()
+        try:
+            self.result = self.fn(*self.args)
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.lock:
+                self.done.set()
+
+    # gives up on a call no worker picked up yet, returns False when one already did
+    def drop(self) -> bool:
+        with self.lock:
+            if self.started.is_set():
+                return False
+            self.dropped = True
+        self.future.cancel()
+        return True
+
+    # cancels the statements of a call still running, the lock keeps its worker from moving on to another call
+    def cancel(self):
+        with self.lock:
+            if not self.done.is_set():
+                Connector.cancel_thread(self.thread)
+
+
+class BatchExecutor:
+    # runs independent calls (e.g. Solution read functions) on a pool of worker threads,
+    # each call borrowing its own connection from the shared DBConnector pool
+    # max_workers - calls in flight at once, defaults to the max_size of the connection pool so workers
+    #               never queue on it
+    # timeout - seconds a call may run, counted from when a worker starts it, None waits forever
+    # start_timeout - seconds a call may wait for a worker, counted from run(), defaults to the checkout timeout
+    #                 of the connection pool. a call not started by then is dropped and never runs
+    # timeout_result - what a call that timed out or failed on the database reports in the results,
+    #                  any other exception of a call is raised by run() and map()
+    # the statement of a call that timed out is cancelled on the server, its result is dropped
+    # worker threads don't see the transaction() of the caller, every call runs on its own
+    def __init__(self, max_workers: int = None, timeout: float = None, timeout_result=ReturnValue.ERROR,
+                 start_timeout: float = None):
+        settings = Connector.pool_settings()
+        if max_workers is None:
+            max_workers = settings['max_size']
+        if max_workers < 1:
+            raise ValueError("Invalid max_workers")
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.start_timeout = settings['timeout'] if start_timeout is None else start_timeout
+        self.timeout_result = timeout_result
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch')
+        self.__stats = {
+            'calls': 0,
+            'timeouts': 0,
+            'errors': 0,
+        }
+        self.__lock = threading.Lock()
+
+    # fn(*args) for every args tuple, the results are returned in input order
+    def map(self, fn: Callable, args: Iterable[Sequence]) -> List:
+        return self.run([(fn, tuple(a)) for a in args])
+
+    # calls are (fn, args) pairs, the results are returned in input order
+    def run(self, calls: Iterable[tuple]) -> List:
+        start_by = time.monotonic() + self.start_timeout
+        pending = [_Call(fn, args, start_by) for fn, args in calls]
+        for call in pending:
+            call.future = self.__executor.submit(call.run)
+        return [self.__result(call) for call in pending]
+
+    def stats(self) -> dict:
+        with self.__lock:
+            stats = dict(self.__stats)
+        stats['max_workers'] = self.max_workers
+        return stats
+
+    def shutdown(self, wait=True):
+        self.__executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def __result(self, call: _Call):
+        if not call.started.wait(max(call.start_by - time.monotonic(), 0)) and call.drop():
+            return self.__count('timeouts')
+        if self.timeout is None:
+            call.done.wait()
+        else:
+            call.done.wait(max(call.started_at + self.timeout - time.monotonic(), 0))
+
+        if not call.done.is_set():
+            call.cancel()
+            return self.__count('timeouts')
+        if call.error is not None:
+            if not isinstance(call.error, _DATABASE_ERRORS):
+                self.__count()
+                raise call.error
+            return self.__count('errors')
+        self.__count()
+        return call.result
+
+    def __count(self, outcome: str = None):
+        with self.__lock:
+            self.__stats['calls'] += 1
+            if outcome is not None:
+                self.__stats[outcome] += 1
+        return self.timeout_result
+
+
+# runs the calls on a short lived BatchExecutor, calls that timed out are not waited for
+def run_batch(fn: Callable, args: Iterable[Sequence], max_workers: int = None, timeout: float = None,
+              timeout_result=ReturnValue.ERROR, start_timeout: float = None) -> List:
+    executor = BatchExecutor(max_workers, timeout, timeout_result, start_timeout)
+    try:
+        return executor.map(fn, args)
+    finally:
+        executor.shutdown(wait=False)
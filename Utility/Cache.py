@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+# in-process caches of Solution results
+# a Snapshot holds the value its loader returned until it is older than ttl seconds or invalidated, the next get
+# after that loads it again. concurrent gets of a stale snapshot load it once, the others wait for that load
+# a loader that raises leaves the snapshot stale and the exception reaches the caller
+# an LRUCache holds up to maxsize entries by key, the least recently used is evicted to make room, and an entry
+# older than ttl seconds is loaded again. a loader that raises caches nothing
+
+
+class Snapshot:
+    # loader - called without arguments to build the value
+    # ttl - seconds a loaded value is served, None to keep it until invalidated
+    # clock - monotonic seconds, replaceable for tests
+    def __init__(self, loader: Callable[[], Any], ttl: float = None, clock: Callable[[], float] = time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self._clock = clock
+        # _lock guards the state below, _load_lock lets one thread at a time run the loader
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._value = None
+        self._loaded_at = None
+        # bumped by invalidate, a load that started before an invalidation is returned but not kept
+        self._version = 0
+        self._hits = 0
+        self._loads = 0
+        self._invalidations = 0
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and (self.ttl is None or self._clock() - self._loaded_at < self.ttl)
+
+    def get(self):
+        with self._lock:
+            if self._fresh():
+                self._hits += 1
+                return self._value
+        with self._load_lock:
+            with self._lock:
+                if self._fresh():
+                    self._hits += 1
+                    return self._value
+                version = self._version
+            value = self.loader()
+            with self._lock:
+                self._loads += 1
+                if version == self._version:
+                    self._value, self._loaded_at = value, self._clock()
+            return value
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._value, self._loaded_at = None, None
+            self._invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'loads': self._loads,
+                'invalidations': self._invalidations,
+                'fresh': self._fresh(),
+            }
+
+
+class LRUCache:
+    # maxsize - entries kept, the least recently used one is evicted first
+    # ttl - seconds an entry is served, None to keep it until evicted
+    # clock - monotonic seconds, replaceable for tests
+    def __init__(self, maxsize: int = 1024, ttl: float = None, clock: Callable[[], float] = time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (value, loaded_at), most recently used last
+        self._entries = OrderedDict()
+        # bumped by every discard, a load that started before one is returned but not kept
+        self._version = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    # the cached value of key, or what loader() returns, kept when keep(value) holds
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], keep: Callable[[Any], bool] = None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self.ttl is None or self._clock() - entry[1] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[0]
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            version = self._version
+        value = loader()
+        if keep is None or keep(value):
+            with self._lock:
+                if version == self._version:
+                    self._put(key, value)
+        return value
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._put(key, value)
+
+    def _put(self, key, value):
+        self._entries[key] = (value, self._clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def discard(self, *keys: Hashable):
+        with self._lock:
+            self._version += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._invalidations += 1
+
+    # drops the entries predicate(key, value) holds for
+    def discard_where(self, predicate: Callable[[Hashable, Any], bool]):
+        with self._lock:
+            self._version += 1
+            for key in [k for k, (v, _) in self._entries.items() if predicate(k, v)]:
+                del self._entries[key]
+                self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
@@ -0,0 +1,145 @@
+import itertools
+import json
+import select
+import threading
+import uuid
+from collections import namedtuple
+from typing import Callable, Optional
+
+import psycopg2
+
+import Utility.DBConnector as Connector
+
+# cross-process change feed
+# the triggers of the change_notify schema option of Solution NOTIFY CHANNEL for every row written to the base
+# tables, the payload is {"table": ..., "op": "INSERT" | "UPDATE" | "DELETE" | "TRUNCATE", "keys": {column: value}}
+# holding the primary key columns of the row (an UPDATE that changes them sends the old and the new keys, a TRUNCATE none)
+# a ChangeListener LISTENs on a connection of its own from a daemon thread and hands every Change to on_change
+# postgres delivers a notification when the writing transaction commits and keeps none for a session that
+# wasn't listening, so on every (re)connect the listener calls on_reset: anything cached may have missed changes
+
+CHANNEL = 'solution_changes'
+
+# op SYNC is sent by ChangeListener.sync, it isn't passed to on_change
+Change = namedtuple('Change', ['table', 'op', 'keys', 'pid'])
+
+
+def parse(payload: str, pid: int = None) -> Change:
+    data = json.loads(payload)
+    return Change(data['table'], data['op'], data['keys'] or {}, pid)
+
+
+class ChangeListener:
+    # on_change - called from the listener thread with each Change
+    # on_reset - called from the listener thread once it LISTENs, after every (re)connect
+    # poll_interval - seconds between checks of the stop flag while idle
+    # retry_interval - seconds to wait before reconnecting after the connection failed
+    def __init__(self, on_change: Callable[[Change], None], on_reset: Optional[Callable[[], None]] = None,
+                 poll_interval: float = 0.5, retry_interval: float = 1.0):
+        self.on_change = on_change
+        self.on_reset = on_reset
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self._stop = threading.Event()
+        self._listening = threading.Event()
+        self._thread = None
+        self._cond = threading.Condition()
+        # sync notifications of other listeners carry another id and are skipped
+        self._id = uuid.uuid4().hex
+        self._tokens = itertools.count(1)
+        self._synced = 0
+        self._stats = {
+            'connects': 0,
+            'received': 0,
+            'handler_errors': 0,
+            'connection_errors': 0,
+        }
+
+    # wait - block until the listener LISTENs, so changes committed after start returns are seen
+    def start(self, wait: bool = True, timeout: float = 10.0) -> 'ChangeListener':
+        if self._thread is not None:
+            raise RuntimeError("ChangeListener is already started")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ChangeListener', daemon=True)
+        self._thread.start()
+        if wait and not self._listening.wait(timeout):
+            self.stop()
+            raise TimeoutError("ChangeListener could not LISTEN")
+        return self
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._listening.clear()
+
+    def is_listening(self) -> bool:
+        return self._listening.is_set()
+
+    # blocks until every change committed before the call was handled, returns False on timeout
+    # notifications are delivered in commit order, so it sends one of its own and waits for it
+    def sync(self, timeout: float = 10.0) -> bool:
+        token = next(self._tokens)
+        conn = Connector.DBConnector()
+        try:
+            payload = {'table': None, 'op': 'SYNC', 'keys': {'listener': self._id, 'token': token}}
+            conn.execute("SELECT pg_notify(%s, %s)", params=(CHANNEL, json.dumps(payload)))
+        finally:
+            conn.close()
+        with self._cond:
+            return self._cond.wait_for(lambda: self._synced >= token, timeout)
+
+    def stats(self) -> dict:
+        return dict(self._stats, listening=self.is_listening())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except (psycopg2.Error, OSError):
+                self._stats['connection_errors'] += 1
+            self._listening.clear()
+            self._stop.wait(self.retry_interval)
+
+    def _listen(self):
+        conn = psycopg2.connect(**Connector.connection_params())
+        try:
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {CHANNEL}")
+            self._stats['connects'] += 1
+            if self.on_reset is not None:
+                self._call(self.on_reset)
+            self._listening.set()
+            while not self._stop.is_set():
+                if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self._stats['received'] += 1
+                    self._dispatch(notify)
+        finally:
+            conn.close()
+
+    def _dispatch(self, notify):
+        try:
+            change = parse(notify.payload, notify.pid)
+        except (ValueError, KeyError, TypeError):
+            self._stats['handler_errors'] += 1
+            return
+        if change.op == 'SYNC':
+            if change.keys.get('listener') != self._id:
+                return
+            with self._cond:
+                self._synced = max(self._synced, change.keys.get('token', 0))
+                self._cond.notify_all()
+            return
+        self._call(self.on_change, change)
+
+    # a failing handler must not stop the feed
+    def _call(self, handler, *args):
+        try:
+            handler(*args)
+        except Exception:
+            self._stats['handler_errors'] += 1
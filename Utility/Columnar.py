@@ -0,0 +1,63 @@
+from datetime import date
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# columnar export of fetched rows for analytics, used by ResultSet.to_columns and ResultSet.to_numpy
+# the rows are transposed once and every column is decoded by a single numpy conversion, typed by the postgres
+# type of the column:
+#   boolean -> bool, smallint / integer / bigint -> int16 / int32 / int64, real -> float32,
+#   double precision / numeric -> float64, date -> datetime64[D], timestamp -> datetime64[us], anything else -> object
+# a NULL makes an integer column float64 (NaN), a boolean column object (None) and is NaT in a date column
+# numpy is listed in requirements.txt, DBConnector imports this module on the first to_columns or to_numpy call so
+# the rest of the package loads without it
+
+_DTYPES = {
+    16: np.dtype('bool'),
+    20: np.dtype('int64'),
+    21: np.dtype('int16'),
+    23: np.dtype('int32'),
+    700: np.dtype('float32'),
+    701: np.dtype('float64'),
+    1700: np.dtype('float64'),
+    1082: np.dtype('datetime64[D]'),
+    1114: np.dtype('datetime64[us]'),
+}
+_OBJECT = np.dtype('object')
+
+
+def dtype_of(type_code: int, values: Sequence = ()) -> np.dtype:
+    dtype = _DTYPES.get(type_code)
+    if dtype is None:
+        # computed columns may come without a type code numpy can use, take the one of the values
+        if values and all(type(v) is date for v in values):
+            return np.dtype('datetime64[D]')
+        return _OBJECT
+    if dtype.kind in 'iub' and any(v is None for v in values):
+        return np.dtype('float64') if dtype.kind in 'iu' else _OBJECT
+    return dtype
+
+
+def decode(values: Sequence, type_code: int) -> np.ndarray:
+    dtype = dtype_of(type_code, values)
+    if dtype is _OBJECT:
+        # filled in place, so sequences in the cells stay cells instead of growing the array a dimension
+        column = np.empty(len(values), dtype=_OBJECT)
+        column[:] = values
+        return column
+    return np.array(values, dtype=dtype)
+
+
+# name -> decoded column, a repeated column name keeps its last column like the rows do
+def to_columns(description: List[Tuple[str, int]], rows: List[tuple]) -> Dict[str, np.ndarray]:
+    columns = list(zip(*rows)) if rows else [()] * len(description)
+    return {name: decode(values, type_code) for (name, type_code), values in zip(description, columns)}
+
+
+# one record per row, a field per column
+def to_numpy(description: List[Tuple[str, int]], rows: List[tuple]) -> np.ndarray:
+    columns = to_columns(description, rows)
+    records = np.empty(len(rows), dtype=[(name, column.dtype) for name, column in columns.items()])
+    for name, column in columns.items():
+        records[name] = column
+    return records
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+from Utility.Exceptions import DatabaseException
+
+
+class PooledConnection(extensions.connection):
+    # psycopg2 connection that remembers when it was opened and last handed back,
+    # so the pool can recycle old connections and ping idle ones before reuse
+    # prepared holds the names of the statements already PREPAREd on this session
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.prepared = set()
+
+
+class ConnectionPool:
+    # thread safe pool of psycopg2 connections
+    # connect - callable returning a new PooledConnection
+    # min_size - connections opened when the pool starts
+    # max_size - upper bound on open connections (idle + checked out)
+    # max_lifetime - seconds after which a connection is closed instead of reused
+    # health_check_interval - idle seconds after which a connection is pinged on checkout
+    # timeout - seconds getconn waits for a free connection before giving up
+    def __init__(self, connect, min_size=1, max_size=10, max_lifetime=1800.0, health_check_interval=30.0,
+                 timeout=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+        self.__connect = connect
+        self.__idle = deque()
+        self.__cond = threading.Condition()
+        self.__size = 0
+        self.__in_use = 0
+        self.__closed = False
+        self.__stats = {
+            'created': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'recycled': 0,
+            'discarded': 0,
+        }
+        for _ in range(min_size):
+            self.putconn(self.__open())
+
+    # borrow a connection, blocks up to timeout seconds when the pool is exhausted
+    def getconn(self, timeout=None):
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            conn = None
+            with self.__cond:
+                waited = False
+                while not self.__closed and not self.__idle and self.__size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.__stats['timeouts'] += 1
+                        raise DatabaseException.ConnectionInvalid("Connection pool exhausted")
+                    if not waited:
+                        self.__stats['waits'] += 1
+                        waited = True
+                    self.__cond.wait(remaining)
+                if self.__closed:
+                    raise DatabaseException.ConnectionInvalid("Connection pool is closed")
+                if self.__idle:
+                    conn = self.__idle.pop()
+                else:
+                    self.__size += 1
+
+            if conn is None:
+                conn = self.__open(reserved=True)
+            elif not self.__healthy(conn):
+                continue
+
+            with self.__cond:
+                self.__in_use += 1
+                self.__stats['checkouts'] += 1
+            return conn
+
+    # give a connection back, anything left uncommitted is rolled back
+    def putconn(self, conn, discard=False):
+        with self.__cond:
+            if conn in self.__idle:
+                return
+        reason = 'discarded' if discard or conn.closed else None
+        if reason is None:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                reason = 'discarded'
+        if reason is None and self.__expired(conn):
+            reason = 'recycled'
+
+        with self.__cond:
+            self.__in_use = max(self.__in_use - 1, 0)
+            if reason is not None:
+                self.__stats[reason] += 1
+            if reason is not None or self.__closed:
+                self.__close(conn)
+            else:
+                conn.last_used = time.monotonic()
+                self.__idle.append(conn)
+            self.__cond.notify()
+
+    # close every idle connection, checked out ones are closed when returned
+    def close(self):
+        with self.__cond:
+            self.__closed = True
+            while self.__idle:
+                self.__close(self.__idle.pop())
+            self.__cond.notify_all()
+
+    def stats(self) -> dict:
+        with self.__cond:
+            stats = dict(self.__stats)
+            stats.update({
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self.__size,
+                'idle': len(self.__idle),
+                'in_use': self.__in_use,
+                'closed': self.__closed,
+            })
+        return stats
+
+    def __open(self, reserved=False):
+        if not reserved:
+            with self.__cond:
+                self.__size += 1
+                self.__in_use += 1
+        try:
+            conn = self.__connect()
+        except Exception:
+            with self.__cond:
+                self.__size -= 1
+                if not reserved:
+                    self.__in_use -= 1
+                self.__cond.notify()
+            raise
+        with self.__cond:
+            self.__stats['created'] += 1
+        return conn
+
+    def __expired(self, conn) -> bool:
+        return self.max_lifetime is not None and time.monotonic() - conn.created_at >= self.max_lifetime
+
+    # called without the lock held, a failed check releases the slot of the connection
+    def __healthy(self, conn) -> bool:
+        if conn.closed:
+            reason = 'discarded'
+        elif self.__expired(conn):
+            reason = 'recycled'
+        elif self.health_check_interval is not None and \
+                time.monotonic() - conn.last_used >= self.health_check_interval:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+                return True
+            except psycopg2.Error:
+                reason = 'discarded'
+        else:
+            return True
+
+        with self.__cond:
+            self.__stats[reason] += 1
+            self.__close(conn)
+            self.__cond.notify()
+        return False
+
+    # must be called with the lock held
+    def __close(self, conn):
+        self.__size -= 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
@@ -1,10 +1,135 @@
 import psycopg2
-from psycopg2 import errors, sql
+from psycopg2 import errors, extras, sql
 from configparser import ConfigParser
 from Utility.Exceptions import DatabaseException
+from Utility.ConnectionPool import ConnectionPool, PooledConnection
+import Utility.PreparedStatements as PreparedStatements
+import Utility.Tracing as Tracing
+import itertools
 import os
+import threading
 from typing import Union
 
+# connection pool shared by every DBConnector, created on first use
+# pooling is on by default, disable_pool() goes back to a connection per DBConnector
+_pool = None
+_pool_enabled = True
+_pool_settings = {
+    'min_size': 1,
+    'max_size': 10,
+    'max_lifetime': 1800.0,
+    'health_check_interval': 30.0,
+    'timeout': 30.0,
+}
+_pool_lock = threading.Lock()
+_params = None
+# database connections go to instead of the one of database.ini, see use_database
+_database = None
+# thread ident -> the connections of the DBConnectors it opened and didn't close yet, see cancel_thread
+# changed by every thread that opens or closes a DBConnector, only under _borrowed_lock
+_borrowed = {}
+_borrowed_lock = threading.Lock()
+
+# sqlstate of the constraint violations execute reports as DatabaseException
+_VIOLATIONS = {
+    errors.lookup("23502"): DatabaseException.NOT_NULL_VIOLATION,
+    errors.lookup("23503"): DatabaseException.FOREIGN_KEY_VIOLATION,
+    errors.lookup("23505"): DatabaseException.UNIQUE_VIOLATION,
+    errors.lookup("23514"): DatabaseException.CHECK_VIOLATION,
+    errors.lookup("23P01"): DatabaseException.EXCLUSION_VIOLATION,
+}
+_VIOLATION_ERRORS = tuple(_VIOLATIONS)
+
+# rows per INSERT statement sent by execute_values
+DEFAULT_PAGE_SIZE = 1000
+
+# rows fetched per round trip by execute_stream
+DEFAULT_ITERSIZE = 2000
+_cursor_names = itertools.count()
+
+
+def enable_pool(**settings):
+    global _pool_enabled
+    with _pool_lock:
+        _close_pool()
+        _pool_settings.update(settings)
+        _pool_enabled = True
+
+
+def disable_pool():
+    global _pool_enabled
+    with _pool_lock:
+        _close_pool()
+        _pool_enabled = False
+
+
+# statistics of the shared pool, None when no pool is open
+def pool_stats():
+    pool = _pool
+    return pool.stats() if pool is not None else None
+
+
+# the settings the shared pool is (or will be) opened with, a copy
+def pool_settings() -> dict:
+    with _pool_lock:
+        return dict(_pool_settings)
+
+
+# asks the server to cancel the statements running on the connections the thread borrowed, the thread gets
+# the QueryCanceled error of each. a connection that runs nothing isn't affected
+def cancel_thread(thread_id: int):
+    with _borrowed_lock:
+        connections = list(_borrowed.get(thread_id, ()))
+    for connection in connections:
+        try:
+            connection.cancel()
+        except psycopg2.Error:
+            pass
+
+
+def _close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+def _get_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(_connect, **_pool_settings)
+        return _pool
+
+
+# connection parameters from database.ini, read once per process
+# configured=True leaves the database of database.ini in place of the one of use_database
+def connection_params(configured=False) -> dict:
+    global _params
+    if _params is None:
+        with Tracing.phase('config'):
+            _params = DBConnector._DBConnector__config()
+    params = dict(_params)
+    if _database is not None and not configured:
+        params['database'] = _database
+    return params
+
+
+# points the new connections at database, None goes back to the one of database.ini
+# the pool is closed so no connection stays on the previous database, returns the database that was in use
+def use_database(database):
+    global _database
+    with _pool_lock:
+        _close_pool()
+        previous, _database = _database, database
+    return previous
+
+
+def _connect() -> PooledConnection:
+    connection = psycopg2.connect(connection_factory=PooledConnection, **connection_params())
+    connection.autocommit = False
+    return connection
+
 
 class ResultSetDict(dict):
     def __getitem__(self, item):
@@ -13,17 +138,96 @@ class ResultSetDict(dict):
         return super().__getitem__(item.lower())
 
 
+class _ColumnIndex(dict):
+    # column name -> position, resolved once per ResultSet and shared by all of its rows
+    # a lookup with a different case is lowered once and remembered, so later rows hit the dict directly
+    def __missing__(self, item):
+        lower = item.lower()
+        if lower == item or lower not in self:
+            raise KeyError(item)
+        index = self[item] = dict.__getitem__(self, lower)
+        return index
+
+    # a repeated column name resolves to its last position, like the dict rows used to
+    @staticmethod
+    def build(cols_header) -> ('_ColumnIndex', list):
+        index = _ColumnIndex()
+        for position, col in enumerate(cols_header):
+            index[col.lower()] = position
+        return index, list(index)
+
+
+class ResultSetRow:
+    # read only view of a fetched row, nothing is copied
+    # supports row['col'] (case insensitive, None for a non str key) and the read methods of a dict
+    __slots__ = ('__row', '__index', '__names')
+
+    def __init__(self, row: tuple, index: _ColumnIndex, names: list):
+        self.__row = row
+        self.__index = index
+        self.__names = names
+
+    def __getitem__(self, item):
+        if type(item) is not str:
+            return None
+        return self.__row[self.__index[item]]
+
+    def get(self, item, default=None):
+        try:
+            return self[item]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self.__names)
+
+    def values(self):
+        return [self.__row[self.__index[name]] for name in self.__names]
+
+    def items(self):
+        return [(name, self.__row[self.__index[name]]) for name in self.__names]
+
+    def raw(self) -> tuple:
+        return self.__row
+
+    def __contains__(self, item):
+        return type(item) is str and item.lower() in self.__names
+
+    def __iter__(self):
+        return iter(self.__names)
+
+    def __len__(self):
+        return len(self.__names)
+
+    def __eq__(self, other):
+        if isinstance(other, ResultSetRow):
+            return self.items() == other.items()
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    def __str__(self):
+        return str(dict(self.items()))
+
+    __repr__ = __str__
+
+
 class ResultSet:
-    # constructor
+    # constructor, the fetched rows are kept as they are and column positions are resolved once
     def __init__(self, description=None, results=None):
         self.rows = []
         self.cols_header = []
         self.cols = ResultSetDict()
+        self.__index = _ColumnIndex()
+        self.__names = []
+        # (name, postgres type code) of every column, kept for an empty result too
+        self.__description = [(d.name, getattr(d, 'type_code', None)) for d in description] if description else []
         self.__fromQuery(description, results)
 
     def __getitem__(self, idx):
         if type(idx) == str:
-            return [x[self.cols[idx]] for x in self.rows]
+            col = self.__index[idx]
+            return [x[col] for x in self.rows]
         return self.__getRow(idx)
 
     # so you can use print(ResultSet)
@@ -39,8 +243,9 @@ class ResultSet:
         return string
 
     def __iter__(self):
-        for row in range(len(self.rows)):
-            yield self.__getRow(row)
+        index, names = self.__index, self.__names
+        for row in self.rows:
+            yield ResultSetRow(row, index, names)
 
     # what is the size of the ResultSet?
     def size(self):
@@ -50,50 +255,97 @@ class ResultSet:
     def isEmpty(self):
         return self.size() == 0
 
+    # name -> numpy array of the column, typed by the column (see Utility.Columnar), needs numpy
+    def to_columns(self) -> dict:
+        import Utility.Columnar as Columnar
+        return Columnar.to_columns(self.__description, self.rows)
+
+    # numpy structured array of the rows, a field per column, needs numpy
+    def to_numpy(self):
+        import Utility.Columnar as Columnar
+        return Columnar.to_numpy(self.__description, self.rows)
+
     def __getRow(self, row: int):
         if len(self.rows) <= row:
             print('Invalid row ' + str(row))
             return ResultSetDict()
-        row_to_return = ResultSetDict()
-        for val, col in zip(self.rows[row], self.cols_header):
-            row_to_return[col] = val
-        return row_to_return
+        return ResultSetRow(self.rows[row], self.__index, self.__names)
 
     def __fromQuery(self, description, results: list):
         if results is None or len(results) == 0:  # no results
             self.cols = ResultSetDict()
         else:
-            self.rows = results.copy()
+            self.rows = results
             self.cols_header = [d.name for d in description]
             self.cols = ResultSetDict()
             for col, index in zip(self.cols_header, range(len(results[0]))):
                 self.cols[col] = index
+            self.__index, self.__names = _ColumnIndex.build(self.cols_header)
 
 
 class DBConnector:
-    # constructor
-    def __init__(self):
+    # constructor, borrows a connection from the shared pool unless pooled=False or pooling is disabled
+    def __init__(self, pooled=None):
+        self.pool = None
+        self.in_transaction = False
+        self.connection = None
+        self.cursor = None
+        self.thread = threading.get_ident()
         try:
-            # Obtain the configuration parameters
-            params = DBConnector.__config()
-            self.connection = psycopg2.connect(**params)
-            self.connection.autocommit = False
-            self.cursor = self.connection.cursor()
+            if pooled is None:
+                pooled = _pool_enabled
+            with Tracing.phase('connect'):
+                if pooled:
+                    self.pool = _get_pool()
+                    self.connection = self.pool.getconn()
+                else:
+                    self.connection = _connect()
+                self.cursor = self.connection.cursor()
+            with _borrowed_lock:
+                _borrowed.setdefault(self.thread, []).append(self.connection)
         except Exception as e:
+            if self.connection is not None:
+                self.__release()
             self.connection = None
             self.cursor = None
             raise DatabaseException.ConnectionInvalid("Could not connect to database")
 
-    # close connection
+    # close connection, a pooled connection is rolled back and returned to the pool
     def close(self):
         if self.cursor is not None:
             self.cursor.close()
+            self.cursor = None
         if self.connection is not None:
+            self.__release()
+            self.connection = None
+
+    def __release(self):
+        with _borrowed_lock:
+            borrowed = _borrowed.get(self.thread)
+            if borrowed is not None and self.connection in borrowed:
+                borrowed.remove(self.connection)
+                if not borrowed:
+                    _borrowed.pop(self.thread, None)
+        if self.pool is not None:
+            self.pool.putconn(self.connection)
+        else:
             self.connection.close()
 
+    # from begin() until end() the statements of this connector form one transaction:
+    # execute and commit() no longer commit, end() commits or rolls back the whole unit
+    def begin(self):
+        self.in_transaction = True
+
+    def end(self, commit=True):
+        self.in_transaction = False
+        if commit:
+            self.commit()
+        else:
+            self.rollback()
+
     # commit connection's changes
     def commit(self):
-        if self.connection is not None:
+        if self.connection is not None and not self.in_transaction:
             try:
                 self.connection.commit()
             except Exception:
@@ -107,29 +359,46 @@ class DBConnector:
             except Exception:
                 raise DatabaseException.ConnectionInvalid("Could not rollback changes")
 
+    # savepoints let a caller undo one statement without losing the rest of the transaction
+    def savepoint(self, name: str):
+        self.execute(f"SAVEPOINT {name}", commit=False)
+
+    def rollback_to_savepoint(self, name: str):
+        self.execute(f"ROLLBACK TO SAVEPOINT {name}", commit=False)
+
+    def release_savepoint(self, name: str):
+        self.execute(f"RELEASE SAVEPOINT {name}", commit=False)
+
     # executes the query, if it is SELECT you may ask to print the results with printSchema
+    # query may be a registered PreparedStatements.Statement, params are then bound to its placeholders
+    # commit=False leaves the statement in the open transaction
     # returns the number of rows effected and a ResultSet (for SELECT)
-    def execute(self, query: Union[str, sql.Composed], printSchema=False) -> (int, ResultSet):
+    def execute(self, query: Union[str, sql.Composed, PreparedStatements.Statement], printSchema=False,
+                params=None, commit=True) -> (int, ResultSet):
         if self.connection is None:
             raise DatabaseException.ConnectionInvalid("Connection Invalid")
 
+        if isinstance(query, PreparedStatements.Statement):
+            with Tracing.phase('compose'):
+                query, params = self.__statement_query(query, params or ())
+
         # try execute the query
         try:
-            self.cursor.execute(query)
-            row_effected = max(self.cursor.rowcount, 0)
-            self.commit()
-        except errors.lookup("23502"):
-            raise DatabaseException.NOT_NULL_VIOLATION("NOT_NULL_VIOLATION")
-        except errors.lookup("23503"):
-            raise DatabaseException.FOREIGN_KEY_VIOLATION("FOREIGN_KEY_VIOLATION")
-        except errors.lookup("23505"):
-            raise DatabaseException.UNIQUE_VIOLATION("UNIQUE_VIOLATION")
-        except errors.lookup("23514"):
-            raise DatabaseException.CHECK_VIOLATION("CHECK_VIOLATION")
+            with Tracing.phase('execute'):
+                Tracing.statement()
+                self.cursor.execute(query, params)
+                row_effected = max(self.cursor.rowcount, 0)
+                if commit:
+                    self.commit()
+        except _VIOLATION_ERRORS as e:
+            raise _VIOLATIONS[type(e)](_VIOLATIONS[type(e)].__name__)
 
         # get entries in case of SELECT
         if self.cursor.description is not None:
-            entries = ResultSet(self.cursor.description, self.cursor.fetchall())
+            with Tracing.phase('fetch'):
+                rows = self.cursor.fetchall()
+            with Tracing.phase('materialize'):
+                entries = ResultSet(self.cursor.description, rows)
         else:
             entries = ResultSet()
 
@@ -139,6 +408,78 @@ class DBConnector:
 
         return row_effected, entries
 
+    # multi-row insert, query holds a single %s that is expanded to a VALUES list of page_size rows
+    # template is the row pattern, e.g. "(%s::INTEGER, %s::TEXT)"
+    # returns the number of rows effected over all pages
+    def execute_values(self, query: Union[str, sql.Composed], rows: list, template=None,
+                       page_size: int = DEFAULT_PAGE_SIZE, commit=True) -> int:
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        row_effected = 0
+        try:
+            # one statement per page so rowcount can be summed
+            for start in range(0, len(rows), page_size):
+                page = rows[start:start + page_size]
+                with Tracing.phase('execute'):
+                    Tracing.statement()
+                    extras.execute_values(self.cursor, query, page, template=template, page_size=len(page))
+                row_effected += max(self.cursor.rowcount, 0)
+            if commit:
+                with Tracing.phase('execute'):
+                    self.commit()
+        except _VIOLATION_ERRORS as e:
+            raise _VIOLATIONS[type(e)](_VIOLATIONS[type(e)].__name__)
+        return row_effected
+
+    # runs a SELECT on a named (server side) cursor and yields its rows lazily as ResultSetRow views,
+    # only itersize rows are held in memory at a time
+    # the cursor is closed and the read transaction ended when iteration finishes or stops early
+    def execute_stream(self, query: Union[str, sql.Composed, PreparedStatements.Statement], params=None,
+                       itersize: int = DEFAULT_ITERSIZE):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        if isinstance(query, PreparedStatements.Statement):
+            # DECLARE cannot wrap an EXECUTE, stream the statement text instead
+            query, params = query.literal_query, query.literal_params(params or ())
+
+        cursor = self.connection.cursor(name=f"stream_{next(_cursor_names)}")
+        cursor.itersize = itersize
+        completed = False
+        try:
+            cursor.execute(query, params)
+            index = names = None
+            for row in cursor:
+                if index is None:
+                    index, names = _ColumnIndex.build([d.name for d in cursor.description])
+                yield ResultSetRow(row, index, names)
+            completed = True
+        finally:
+            try:
+                cursor.close()
+            except psycopg2.Error:
+                pass
+            if self.in_transaction:
+                pass
+            elif completed:
+                self.commit()
+            else:
+                self.rollback()
+
+    # PREPAREs the statement on this connection the first time it is used here
+    def __statement_query(self, statement: PreparedStatements.Statement, params):
+        if not PreparedStatements.is_enabled():
+            return statement.literal_query, statement.literal_params(params)
+        prepared = getattr(self.connection, 'prepared', None)
+        if prepared is None or statement.name not in prepared:
+            with Tracing.phase('prepare'):
+                Tracing.statement(prepare=True)
+                self.cursor.execute(statement.prepare_query)
+            if prepared is not None:
+                prepared.add(statement.name)
+        return statement.execute_query, tuple(params)
+
     # grant credentials
     @staticmethod
     def __config(filename=os.path.join(os.path.join(os.getcwd(), "Utility"), 'database.ini'),
@@ -23,6 +23,9 @@ class DatabaseException(_Exceptions):
     class CHECK_VIOLATION(_Exceptions):
         pass
 
+    class EXCLUSION_VIOLATION(_Exceptions):
+        pass
+
     class database_ini_ERROR(_Exceptions):
         pass
 
@@ -0,0 +1,121 @@
+import hashlib
+from collections import namedtuple
+from typing import List, Optional, Sequence, Tuple
+
+import Utility.DBConnector as Connector
+
+# versioned schema migrations
+# a Migration is a numbered list of DDL statements. Migrator.migrate() applies the migrations the database
+# hasn't recorded yet, in version order, all of them in one transaction on one connection, and records each in
+# the version table with a checksum of its statements. a failing statement rolls back the whole run, so the
+# schema is either fully at the new version or untouched
+# an up-to-date database costs one short transaction that changes nothing, so it is cheap to call on every start
+# concurrent migrate() calls are serialized by an advisory lock, the later one finds nothing left to apply
+# a recorded migration must not change: migrate() raises MigrationError when its checksum differs, a schema
+# change goes in a new version
+# a database built before the migrator has the tables of the early versions but no version table. a baseline
+# (version, table) records the migrations up to version as applied, without running them, when the version table
+# is missing and table exists
+
+Migration = namedtuple('Migration', ['version', 'name', 'statements'])
+
+DEFAULT_TABLE = 'SchemaVersion'
+
+# key of the advisory lock held while migrating
+_LOCK_KEY = 20240217
+
+
+class MigrationError(Exception):
+    pass
+
+
+def checksum(migration: Migration) -> str:
+    return hashlib.md5('\n'.join(migration.statements).encode()).hexdigest()
+
+
+class Migrator:
+    # migrations - the migrations of the schema, with distinct versions
+    # table - the table that records the applied migrations
+    # baseline - (version, table) of a schema built before the migrator, None when there is none
+    def __init__(self, migrations: Sequence[Migration], table: str = DEFAULT_TABLE,
+                 baseline: Optional[Tuple[int, str]] = None):
+        versions = [m.version for m in migrations]
+        if len(set(versions)) != len(versions):
+            raise ValueError("Migration versions must be distinct")
+        self.migrations = sorted(migrations, key=lambda m: m.version)
+        self.table = table
+        self.baseline = baseline
+
+    def __exists(self, conn: Connector.DBConnector, table: str) -> bool:
+        _, result = conn.execute("SELECT to_regclass(%s) IS NOT NULL", params=(table,), commit=False)
+        return result.rows[0][0]
+
+    def __record(self, conn: Connector.DBConnector, m: Migration):
+        conn.execute(f"INSERT INTO {self.table}(version, name, checksum) VALUES (%s, %s, %s)",
+                     params=(m.version, m.name, checksum(m)), commit=False)
+
+    # version -> checksum of the applied migrations, read on conn
+    def __applied(self, conn: Connector.DBConnector) -> dict:
+        _, result = conn.execute(f"SELECT version, checksum FROM {self.table}", commit=False)
+        return dict(result.rows)
+
+    # the recorded versions, empty when nothing was applied
+    def applied_versions(self) -> List[int]:
+        conn = Connector.DBConnector()
+        try:
+            _, result = conn.execute(f"SELECT version FROM {self.table} ORDER BY version")
+            return [row[0] for row in result.rows]
+        except Exception:
+            return []
+        finally:
+            conn.close()
+
+    # applies the pending migrations, returns them (empty when the database was up to date)
+    def migrate(self) -> List[Migration]:
+        conn = Connector.DBConnector()
+        try:
+            conn.begin()
+            conn.execute(f"SELECT pg_advisory_xact_lock({_LOCK_KEY})", commit=False)
+            baselined = self.baseline is not None and not self.__exists(conn, self.table) \
+                and self.__exists(conn, self.baseline[1])
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table}("
+                         f" version INTEGER PRIMARY KEY,"
+                         f" name TEXT NOT NULL,"
+                         f" checksum TEXT NOT NULL,"
+                         f" applied_at TIMESTAMP NOT NULL DEFAULT now())", commit=False)
+            if baselined:
+                for m in self.migrations:
+                    if m.version <= self.baseline[0]:
+                        self.__record(conn, m)
+            applied = self.__applied(conn)
+            for m in self.migrations:
+                if m.version in applied and applied[m.version] != checksum(m):
+                    raise MigrationError(f"Migration {m.version} ({m.name}) changed after it was applied")
+            pending = [m for m in self.migrations if m.version not in applied]
+            for m in pending:
+                for statement in m.statements:
+                    conn.execute(statement, commit=False)
+                self.__record(conn, m)
+            # nothing to keep when nothing was applied
+            conn.end(commit=bool(pending) or baselined)
+            return pending
+        except BaseException:
+            conn.end(commit=False)
+            raise
+        finally:
+            conn.close()
+
+    # runs the drop statements and drops the version table, in one transaction
+    def drop(self, statements: Sequence[str]):
+        conn = Connector.DBConnector()
+        try:
+            conn.begin()
+            conn.execute(f"SELECT pg_advisory_xact_lock({_LOCK_KEY})", commit=False)
+            for statement in list(statements) + [f"DROP TABLE IF EXISTS {self.table}"]:
+                conn.execute(statement, commit=False)
+            conn.end()
+        except BaseException:
+            conn.end(commit=False)
+            raise
+        finally:
+            conn.close()
@@ -0,0 +1,60 @@
+import re
+from typing import Dict, Sequence
+
+# registry of named, parameterized statements
+# a statement is PREPAREd once per connection (see DBConnector.execute) and then EXECUTEd with bound
+# parameters, so postgres parses and plans it only once per connection
+# set_enabled(False) falls back to sending the query with the parameters interpolated client side,
+# which is handy to compare latency between the two paths
+
+_registry: Dict[str, 'Statement'] = {}
+_enabled = True
+
+_PLACEHOLDER = re.compile(r'\$(\d+)')
+
+
+class Statement:
+    # name - identifier used for PREPARE/EXECUTE, unique across the registry
+    # query - sql text using $1..$n placeholders, a placeholder may appear more than once
+    # types - postgres type of each placeholder, in order
+    def __init__(self, name: str, query: str, types: Sequence[str]):
+        self.name = name
+        self.query = query
+        self.types = tuple(types)
+        self.prepare_query = f"PREPARE {name} ({', '.join(self.types)}) AS {query}" if self.types \
+            else f"PREPARE {name} AS {query}"
+        self.execute_query = f"EXECUTE {name} ({', '.join(['%s'] * len(self.types))})" if self.types \
+            else f"EXECUTE {name}"
+        # a % of the query is literal to postgres, psycopg2 would read it as a placeholder
+        self.literal_query = _PLACEHOLDER.sub(r'%(\1)s', query.replace('%', '%%'))
+
+    # parameters for literal_query
+    def literal_params(self, params: Sequence) -> dict:
+        return {str(i): v for i, v in enumerate(params, start=1)}
+
+    def __str__(self):
+        return self.prepare_query
+
+
+def register(name: str, query: str, types: Sequence[str] = ()) -> Statement:
+    if name in _registry and _registry[name].query != query:
+        raise ValueError(f"Statement {name} is already registered with a different query")
+    _registry[name] = Statement(name, query, types)
+    return _registry[name]
+
+
+def get(name: str) -> Statement:
+    return _registry[name]
+
+
+def statements() -> Dict[str, Statement]:
+    return dict(_registry)
+
+
+def set_enabled(enabled: bool):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
@@ -0,0 +1,250 @@
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from typing import List
+
+# optional per-call tracing of the Solution API
+# every traced call records a Span, the time it spent in each phase and how many statements it ran (prepares of
+# them were PREPAREs, which depend on what the pooled connection it got had already prepared):
+#   config      - reading database.ini
+#   connect     - borrowing (or opening) a connection
+#   compose     - turning a query and its parameters into the statement sent
+#   prepare     - PREPAREing the statement on a connection that hadn't yet
+#   execute     - running the statement on the server, commit included
+#   fetch       - pulling the result rows to the client
+#   materialize - building the ResultSet over the fetched rows
+#   build       - building Business objects from the rows
+#   other       - the rest of the call (python code of the API function itself)
+# phases are exclusive, a phase running inside another is not counted twice
+# finished spans go to the sink given to enable(), e.g. a RingBufferSink or a JsonlSink
+# while tracing is disabled traced() and phase() only check a flag
+
+_enabled = False
+_sink = None
+_current = contextvars.ContextVar('span', default=None)
+
+
+class Span:
+    __slots__ = ('name', 'start', 'duration', 'phases', 'statements', 'prepares', 'error', 'thread',
+                 '__stack', '__clock')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.time()
+        self.duration = None
+        self.phases = {}
+        self.statements = 0
+        self.prepares = 0
+        self.error = None
+        self.thread = threading.current_thread().name
+        self.__stack = []
+        self.__clock = time.perf_counter()
+
+    def enter(self, phase: str):
+        self.__stack.append([phase, time.perf_counter(), 0.0])
+
+    def exit(self):
+        phase, start, nested = self.__stack.pop()
+        elapsed = time.perf_counter() - start
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed - nested
+        if self.__stack:
+            self.__stack[-1][2] += elapsed
+
+    def finish(self, error: BaseException = None):
+        self.duration = time.perf_counter() - self.__clock
+        self.phases['other'] = max(self.duration - sum(self.phases.values()), 0.0)
+        if error is not None:
+            self.error = type(error).__name__
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'start': self.start,
+            'duration': self.duration,
+            'phases': dict(self.phases),
+            'statements': self.statements,
+            'prepares': self.prepares,
+            'error': self.error,
+            'thread': self.thread,
+        }
+
+    def __str__(self):
+        return json.dumps(self.to_dict())
+
+    __repr__ = __str__
+
+
+class RingBufferSink:
+    # keeps the last capacity spans in memory
+    def __init__(self, capacity: int = 1000):
+        self.__spans = deque(maxlen=capacity)
+        self.__lock = threading.Lock()
+
+    def emit(self, span: Span):
+        with self.__lock:
+            self.__spans.append(span)
+
+    def spans(self) -> List[Span]:
+        with self.__lock:
+            return list(self.__spans)
+
+    def clear(self):
+        with self.__lock:
+            self.__spans.clear()
+
+
+class JsonlSink:
+    # appends every span as one json line to the file at path
+    def __init__(self, path: str):
+        self.path = path
+        self.__file = open(path, 'a')
+        self.__lock = threading.Lock()
+
+    def emit(self, span: Span):
+        line = json.dumps(span.to_dict()) + '\n'
+        with self.__lock:
+            self.__file.write(line)
+            self.__file.flush()
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
+
+
+# starts sending spans to sink, a new RingBufferSink when not given, returns the sink
+def enable(sink=None):
+    global _enabled, _sink
+    _sink = sink if sink is not None else RingBufferSink()
+    _enabled = True
+    return _sink
+
+
+def disable():
+    global _enabled, _sink
+    _enabled = False
+    _sink = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+# span of the traced call running in this thread / task, None outside of one
+def current_span():
+    return _current.get() if _enabled else None
+
+
+class _Phase:
+    __slots__ = ('span',)
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self):
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.exit()
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+# "with phase('fetch'):" times the block as a phase of the current span
+def phase(name: str):
+    if not _enabled:
+        return _NO_PHASE
+    span = _current.get()
+    if span is None:
+        return _NO_PHASE
+    span.enter(name)
+    return _Phase(span)
+
+
+# counts a statement sent to the server in the current span, prepare=True for a PREPARE
+def statement(prepare: bool = False):
+    if _enabled:
+        span = _current.get()
+        if span is not None:
+            span.statements += 1
+            if prepare:
+                span.prepares += 1
+
+
+def _emit(span: Span, error: BaseException = None):
+    span.finish(error)
+    sink = _sink
+    if sink is not None:
+        sink.emit(span)
+
+
+# decorator opening a span around each call of fn (a function or a coroutine function)
+# a traced call made from inside another one is part of the outer span
+def traced(fn):
+    name = fn.__name__
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            if not _enabled or _current.get() is not None:
+                return await fn(*args, **kwargs)
+            span = Span(name)
+            token = _current.set(span)
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException as e:
+                _emit(span, e)
+                raise
+            finally:
+                _current.reset(token)
+            _emit(span)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _enabled or _current.get() is not None:
+            return fn(*args, **kwargs)
+        span = Span(name)
+        token = _current.set(span)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            _emit(span, e)
+            raise
+        finally:
+            _current.reset(token)
+        _emit(span)
+        return result
+
+    return wrapper
+
+
+# decorator timing every call of fn as the given phase of the current span
+def phased(name: str):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with phase(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator